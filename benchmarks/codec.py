@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""compares the compiled codec with dataclasses_json for the CCS wire types
+
+PYTHONPATH=src python benchmarks/codec.py [-n 20000]
+"""
+
+import timeit
+from argparse import ArgumentParser
+from typing import Any, Callable
+
+from tams.ccs.codec import from_json, to_json
+from tams.ccs.types import CCSCraneDetails, CCSFeature, CCSJob, CCSJobState
+
+
+def bench(
+    name: str, number: int, old: Callable[[], Any], new: Callable[[], Any]
+) -> None:
+    old_time = timeit.timeit(old, number=number) / number * 1e6
+    new_time = timeit.timeit(new, number=number) / number * 1e6
+    print(
+        f"{name:<28} dataclasses_json {old_time:8.2f} us   "
+        f"codec {new_time:8.2f} us   x{old_time / new_time:5.1f}"
+    )
+
+
+def run() -> None:
+    parser = ArgumentParser(description="codec micro benchmark")
+    parser.add_argument("-n", "--number", type=int, default=20000)
+    number = parser.parse_args().number
+
+    samples: list[Any] = [
+        CCSJob(),
+        CCSJobState(),
+        CCSCraneDetails(features=[CCSFeature(), CCSFeature()]),
+    ]
+    for sample in samples:
+        cls = type(sample)
+        text = sample.to_json()
+        assert to_json(sample) == text
+        bench(
+            f"{cls.__name__}.to_json",
+            number,
+            sample.to_json,
+            lambda s=sample: to_json(s),
+        )
+        bench(
+            f"{cls.__name__}.from_json",
+            number,
+            lambda c=cls, t=text: c.from_json(t),
+            lambda c=cls, t=text: from_json(c, t),
+        )
+
+
+if __name__ == "__main__":
+    run()
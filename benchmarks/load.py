@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""load test of a tams server against simulated cranes
+
+Starts tams in a subprocess supervising --cranes simulated cranes, posts move
+jobs to their web apps at --rate jobs/s for --duration seconds and reports
+throughput, dispatch latency (web post -> crane received the job), done
+latency (web post -> crane finished it) and the cpu and memory of the server.
+
+PYTHONPATH=src python benchmarks/load.py [--cranes 4] [--rate 20] [--json]
+"""
+
+import json
+import logging
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import requests
+
+from tams.ccs.codec import to_json
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.metric.series import percentile
+from tams.sim.sim import CraneSimulator, SimConfig
+from tams.state.queue import job_id
+
+SRC_PATH = Path(__file__).resolve().parent.parent.joinpath("src")
+
+
+def get_args() -> Any:
+    parser = ArgumentParser(description="tams load test with simulated cranes")
+    parser.add_argument("--cranes", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=20.0, help="jobs/s, all cranes")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument(
+        "--drain", type=float, default=60.0, help="max seconds to wait for the rest"
+    )
+    parser.add_argument(
+        "--speed", type=float, default=100.0, help="time lapse of the cranes"
+    )
+    parser.add_argument("--handling-time", type=float, default=5.0)
+    parser.add_argument("--alarm-probability", type=float, default=0.01)
+    parser.add_argument("--server", choices=("dev", "waitress"), default="dev")
+    parser.add_argument("--scheduler", choices=("fifo", "nearest"), default="fifo")
+    parser.add_argument("--sim-port", type=int, default=10000)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    parser.add_argument("-v", "--verbose", action="store_true", help="server output")
+    return parser.parse_args()
+
+
+def process_usage(pid: int) -> tuple[float, float, float]:
+    """cpu seconds, rss and peak rss in MiB of a process (linux /proc)"""
+    fields = Path(f"/proc/{pid}/stat").read_text().rpartition(")")[2].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    status = dict(
+        line.split(":", 1)
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines()
+    )
+    return (
+        cpu,
+        int(status["VmRSS"].split()[0]) / 1024,
+        int(status["VmHWM"].split()[0]) / 1024,
+    )
+
+
+def wait_for(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{url} not up after {timeout}s")
+        time.sleep(0.1)
+
+
+def latencies(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {
+        "p50": percentile(ordered, 50),
+        "p90": percentile(ordered, 90),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1],
+    }
+
+
+def drive(args: Any, session: requests.Session) -> tuple[dict[str, float], int]:
+    """posts the jobs at the configured rate, returns post times by job id"""
+    posted: dict[str, float] = {}
+    total = int(args.rate * args.duration)
+    start = time.monotonic()
+
+    def post(index: int) -> bool:
+        job = CCSJob(
+            type=CCSJobType.MOVE,
+            target=CCSCoordinates(
+                random.randrange(0, 20000, 100), random.randrange(0, 10000, 100), 0
+            ),
+            unit=CCSUnit(number=f"BENCH{index:07}"),
+        )
+        posted[job_id(job)] = time.time()
+        ret = session.post(
+            f"http://127.0.0.1:{7000 + index % args.cranes}/job",
+            data=to_json(job),
+            headers={"Content-Type": "application/json"},
+            timeout=10,
+        )
+        return ret.status_code == 200
+
+    with ThreadPoolExecutor(8) as executor:
+        futures = []
+        for index in range(total):
+            delay = start + index / args.rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(post, index))
+        accepted = sum(future.result() for future in futures)
+    return posted, accepted
+
+
+def run() -> None:  # pylint: disable=too-many-locals
+    args = get_args()
+    if not args.verbose:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    sims = [
+        CraneSimulator(
+            SimConfig(
+                f"http://127.0.0.1:9998/crane/sim{index}",
+                args.sim_port + index,
+                name=f"sim{index}",
+                speed=args.speed,
+                handling_time=args.handling_time,
+                alarm_probability=args.alarm_probability,
+            )
+        )
+        for index in range(args.cranes)
+    ]
+    for sim in sims:
+        sim.start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        command = [sys.executable, "-m", "tams.main", "--timings"]
+        command += ["--server", args.server, "--scheduler", args.scheduler]
+        for index, sim in enumerate(sims):
+            command += ["--crane", f"sim{index}=127.0.0.1:{sim.config.port}"]
+        output = None if args.verbose else subprocess.DEVNULL
+        server = subprocess.Popen(  # pylint: disable=consider-using-with
+            command,
+            cwd=workdir,
+            env={**os.environ, "PYTHONPATH": str(SRC_PATH)},
+            stdout=output,
+            stderr=output,
+        )
+        try:
+            for index in range(args.cranes):
+                wait_for(f"http://127.0.0.1:{7000 + index}/state")
+            cpu_start, _, _ = process_usage(server.pid)
+            measure_start = time.monotonic()
+            session = requests.Session()
+            posted, accepted = drive(args, session)
+
+            deadline = time.monotonic() + args.drain
+            while time.monotonic() < deadline:
+                if sum(sim.state.jobs_done for sim in sims) >= accepted:
+                    break
+                time.sleep(0.1)
+            cpu_end, rss, peak_rss = process_usage(server.pid)
+            measured = time.monotonic() - measure_start
+            server_timings = session.get("http://127.0.0.1:7000/debug/timings").json()
+        finally:
+            server.send_signal(signal.SIGINT)
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            for sim in sims:
+                sim.shutdown()
+
+    log = {key: value for sim in sims for key, value in sim.state.log.items()}
+    done = [entry for key, entry in log.items() if "done" in entry and key in posted]
+    first_post = min(posted.values())
+    last_done = max((entry["done"] for entry in done), default=first_post)
+    results = {
+        "cranes": args.cranes,
+        "rate": args.rate,
+        "server": args.server,
+        "scheduler": args.scheduler,
+        "posted": len(posted),
+        "accepted": accepted,
+        "done": len(done),
+        "throughput": len(done) / max(last_done - first_post, 1e-9),
+        "dispatch_latency": latencies(
+            [log[key]["received"] - posted[key] for key in posted if key in log]
+        ),
+        "done_latency": latencies(
+            [
+                log[key]["done"] - posted[key]
+                for key in posted
+                if "done" in log.get(key, {})
+            ]
+        ),
+        # share of one core
+        "server_cpu": (cpu_end - cpu_start) / measured,
+        "server_rss_mib": rss,
+        "server_peak_rss_mib": peak_rss,
+        "server_timings": server_timings["histograms"],
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"cranes {args.cranes}  rate {args.rate}/s  duration {args.duration}s  "
+        f"server {args.server}  scheduler {args.scheduler}"
+    )
+    print(f"jobs        posted {len(posted)}  accepted {accepted}  done {len(done)}")
+    print(f"throughput  {results['throughput']:.1f} jobs/s")
+    for name in ("dispatch_latency", "done_latency"):
+        values = results[name]
+        print(
+            f"{name:<18}"
+            + "  ".join(
+                f"{key} {value * 1000:8.1f} ms" for key, value in values.items()
+            )
+        )
+    print(
+        f"server      cpu {results['server_cpu'] * 100:.1f} %  "
+        f"rss {rss:.1f} MiB  peak {peak_rss:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""memory and serialization cost of the yard model
+
+Builds a yard of `--units` units in stacks of three through import_json and
+compares it with the previous model: dataclasses with a __dict__, a
+separate copy of every unit in its stack (as import_json used to build it)
+and asdict for the json views.
+
+PYTHONPATH=src python benchmarks/memory.py [--units 50000] [--json]
+"""
+
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from tams.ccs.types import CCSCoordinates, CCSUnit, guid
+from tams.storage.storage import ContainerStack, TamsStorage
+
+
+@dataclass
+class LegacyUnit:
+    unitId: str = field(default_factory=guid)  # pylint: disable=invalid-name
+    height: int = 0
+    width: int = 0
+    length: int = 0
+    weight: int = 0
+    type: str = "0000"
+    number: str = "00000000000"
+    piggyBack: bool = False  # pylint: disable=invalid-name
+
+
+@dataclass
+class LegacyCoordinates:
+    x: int = 1  # pylint: disable=invalid-name
+    y: int = 2  # pylint: disable=invalid-name
+    z: int = 3  # pylint: disable=invalid-name
+
+
+@dataclass
+class LegacyStack:
+    name: str
+    coordinates: LegacyCoordinates = field(default_factory=LegacyCoordinates)
+    container: list[LegacyUnit] = field(default_factory=list)
+    height: int = 3
+
+
+def export(units: int, path: Path) -> None:
+    storage = TamsStorage()
+    container = [
+        CCSUnit(number=f"UNIT{index:07}", type="22G1", height=2591, weight=12000)
+        for index in range(units)
+    ]
+    stacks = [
+        ContainerStack(
+            f"{chr(65 + index % 26)}{index}",
+            CCSCoordinates(index * 2000, 0, 0),
+            container[index * 3 : index * 3 + 3],
+        )
+        for index in range((units + 2) // 3)
+    ]
+    storage.set_yard(stacks, container, None)
+    storage.export_json(path)
+
+
+def load_legacy(path: Path) -> tuple[list[LegacyStack], list[LegacyUnit]]:
+    data = json.loads(path.read_text())
+    stacks = [
+        LegacyStack(
+            stack["name"],
+            LegacyCoordinates(**stack["coordinates"]),
+            [LegacyUnit(**unit) for unit in stack["container"]],
+            stack["height"],
+        )
+        for stack in data["stacks"]
+    ]
+    return stacks, [LegacyUnit(**unit) for unit in data["container"]]
+
+
+def legacy_views(stacks: list[LegacyStack]) -> tuple[str, str]:
+    units = []
+    for stack in stacks:
+        for unit in stack.container:
+            unit_dict = asdict(unit)
+            unit_dict["stack"] = stack.name
+            units.append(unit_dict)
+    return json.dumps([asdict(stack) for stack in stacks]), json.dumps(units)
+
+
+def storage_views(storage: TamsStorage) -> tuple[str, str]:
+    # bypass the per version cache, measure the serialization
+    storage.version += 1
+    return storage.get_stacks_as_json(), storage.get_container_as_json()
+
+
+def measure(build: Callable[[], Any]) -> tuple[Any, int, int]:
+    """the built model, its retained bytes and gc tracked objects"""
+    gc.collect()
+    objects = len(gc.get_objects())
+    tracemalloc.start()
+    model = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return model, size, len(gc.get_objects()) - objects
+
+
+def timed(call: Callable[[], Any], number: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        call()
+    return (time.perf_counter() - start) / number
+
+
+def run() -> None:
+    parser = ArgumentParser(description="yard model memory benchmark")
+    parser.add_argument("--units", type=int, default=50000)
+    parser.add_argument("--json", action="store_true", help="print results as json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "export.json")
+        export(args.units, path)
+        legacy, legacy_size, legacy_objects = measure(lambda: load_legacy(path))
+
+        def load() -> TamsStorage:
+            storage = TamsStorage()
+            storage.import_json(path)
+            return storage
+
+        storage, size, objects = measure(load)
+    # the stacks view of the storage has an additional free count
+    assert legacy_views(legacy[0])[1] == storage_views(storage)[1]
+    results = {
+        "units": args.units,
+        "legacy": {
+            "bytes": legacy_size,
+            "objects": legacy_objects,
+            "views_s": timed(lambda: legacy_views(legacy[0])),
+        },
+        "compact": {
+            "bytes": size,
+            "objects": objects,
+            "views_s": timed(lambda: storage_views(storage)),
+        },
+    }
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f"{args.units} units")
+    for name in ("legacy", "compact"):
+        result = results[name]
+        print(
+            f"{name:<8} {result['bytes'] / 2**20:8.1f} MiB "
+            f"{result['objects']:9} gc objects   "
+            f"json views {result['views_s'] * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    run()
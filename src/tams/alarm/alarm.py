@@ -0,0 +1,138 @@
+import json
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from threading import Lock
+from typing import Any
+
+
+@dataclass
+class Alarm:
+    code: str
+    source: str
+    severity: str = "error"
+    text: str = ""
+    # first and last occurrence within the dedup window
+    first: float = 0.0
+    last: float = 0.0
+    count: int = 1
+
+
+def _first_of(data: dict[str, Any], *keys: str) -> str | None:
+    for key in keys:
+        value = data.get(key)
+        if value is not None and value != "":
+            return str(value)
+    return None
+
+
+def parse_alarm(data: str | bytes, source: str, now: float | None = None) -> Alarm:
+    """alarm of a CCS /alarm body, json or plain text
+
+    The crane decides the field names, the usual spellings are accepted and
+    anything else ends up as text with the code "unknown".
+    """
+    now = time.time() if now is None else now
+    text = data.decode("utf-8", "replace") if isinstance(data, bytes) else data
+    try:
+        body = json.loads(text)
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        return Alarm("unknown", source, text=text.strip(), first=now, last=now)
+    return Alarm(
+        code=_first_of(body, "code", "alarmCode", "id", "type") or "unknown",
+        source=_first_of(body, "source", "component", "producer") or source,
+        severity=_first_of(body, "severity", "level") or "error",
+        text=_first_of(body, "text", "message", "description", "alarm") or text,
+        first=now,
+        last=now,
+    )
+
+
+class RateLimiter:
+    """token bucket, `rate` events per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float = 1.0, burst: int = 10) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated: float | None = None
+
+    def allow(self, now: float) -> bool:
+        if self.updated is not None:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class AlarmStore:
+    """latest alarms, de-duplicated by source and code
+
+    A repeat of an alarm within `window` seconds of its last occurrence only
+    counts up, a crane in a fault loop is one entry. New alarms pass a rate
+    limiter before they are forwarded (see `add`), the store keeps them all.
+    Holds at most `capacity` alarms, the least recently seen are dropped.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1000,
+        window: float = 60.0,
+        limiter: RateLimiter | None = None,
+    ) -> None:
+        self.capacity = capacity
+        self.window = window
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.lock = Lock()
+        self._alarms: OrderedDict[tuple[str, str], Alarm] = OrderedDict()
+        # new alarms the rate limiter kept from being forwarded
+        self.suppressed = 0
+
+    def add(self, alarm: Alarm) -> bool:
+        """stores the alarm, True if it is new and should be shown"""
+        key = (alarm.source, alarm.code)
+        with self.lock:
+            known = self._alarms.get(key)
+            if known is not None and alarm.last - known.last <= self.window:
+                known.count += 1
+                known.last = alarm.last
+                known.text = alarm.text
+                known.severity = alarm.severity
+                self._alarms.move_to_end(key)
+                return False
+            self._alarms[key] = alarm
+            self._alarms.move_to_end(key)
+            if len(self._alarms) > self.capacity:
+                self._alarms.popitem(last=False)
+            if self.limiter.allow(alarm.last):
+                return True
+            self.suppressed += 1
+            return False
+
+    def query(
+        self,
+        source: str | None = None,
+        code: str | None = None,
+        since: float | None = None,
+        limit: int = 100,
+    ) -> list[dict[str, Any]]:
+        """alarms seen last first, optionally filtered"""
+        result: list[dict[str, Any]] = []
+        with self.lock:
+            for alarm in reversed(self._alarms.values()):
+                if since is not None and alarm.last < since:
+                    break
+                if source is not None and alarm.source != source:
+                    continue
+                if code is not None and alarm.code != code:
+                    continue
+                result.append(asdict(alarm))
+                if len(result) >= limit:
+                    break
+        return result
@@ -1,20 +1,41 @@
 import time
+from dataclasses import dataclass, field
 from json import JSONDecodeError
 from os import getcwd
 from threading import Event, Thread
 from typing import Any
 
-import requests
 from flask import Flask, request
 from marshmallow import ValidationError
 from requests import ConnectionError  # pylint: disable=redefined-builtin
+from requests import Timeout
 from requests.adapters import MaxRetryError
 from urllib3.exceptions import NewConnectionError
 
+from tams.alarm.alarm import AlarmStore, parse_alarm
+from tams.ccs.client import Backoff, CCSClient
+from tams.ccs.codec import from_json, to_json
 from tams.ccs.types import CCSCraneDetails
 from tams.metric.metric import Metric
+from tams.state.queue import job_id
 from tams.state.state import TamsJobState
 from tams.web.msg import Messages
+from tams.web.server import ServerConfig, serve
+
+
+@dataclass
+class Dispatch:
+    """connection to the crane and when `CCS.tick` talks to it next"""
+
+    client: CCSClient
+    details_interval: float = 1.0
+    backoff: Backoff = field(default_factory=Backoff)
+    # monotonic times of the next details poll and of the retry after a failure
+    details_due: float = 0.0
+    retry_at: float = 0.0
+    shutdown_event: Event = field(default_factory=Event)
+    # set by the job state when there is something to dispatch
+    wake_event: Event = field(default_factory=Event)
 
 
 class CCS:
@@ -29,19 +50,30 @@ class CCS:
         metric: Metric,
         ccs_url: str = "http://localhost:9999",
         verbose: bool = False,
+        name: str | None = None,
+        app: Flask | None = None,
+        details_interval: float = 1.0,
+        server: ServerConfig | None = None,
+        alarms: AlarmStore | None = None,
     ):  # pylint: disable=too-many-arguments
+        if name is not None:
+            self.name = name
+        self.alarms = alarms if alarms is not None else AlarmStore()
         self.metric = metric
         self.state = state
         self.messages = messages
-        self.ccs_url = ccs_url
+        self.dispatch = Dispatch(CCSClient(ccs_url), details_interval)
         self.verbose = verbose
-        self.shutdown_event = Event()
-        self.app = Flask("tams ccs", root_path=getcwd())
-        self.add_endpoints()
+        self.state.observers.add_listener(self.dispatch.wake_event.set)
+        self.app = Flask("tams ccs", root_path=getcwd()) if app is None else app
+        # with a shared app (see CCSSupervisor) the callbacks live under /crane/<name>
+        self.add_endpoints("" if app is None else f"/crane/{self.name}")
+        if app is None:
+            self.metric.timings.instrument(self.app, "ccs")
         # self.get_job() # deaktivated because polo don't implemented the get
         self.worker_rest_thread = Thread(
-            target=self.worker_rest,
-            args=(),
+            target=serve,
+            args=(self.app, 9998, server),
             name="CCS Worker Rest",
             daemon=True,
         )
@@ -56,45 +88,75 @@ class CCS:
         self.worker_rest_thread.start()
         self.worker_state_thread.start()
 
-    def add_endpoints(self) -> None:
-        self.app.add_url_rule("/metric", "metric", self.metric_post, methods=["POST"])
-        self.app.add_url_rule("/state", "status", self.state_post, methods=["POST"])
-        self.app.add_url_rule("/alarm", "alarm", self.alarm_post, methods=["POST"])
+    def add_endpoints(self, url_prefix: str = "") -> None:
+        self.add_endpoint(url_prefix, "/metric", "metric", self.metric_post)
+        self.add_endpoint(url_prefix, "/state", "status", self.state_post)
+        self.add_endpoint(url_prefix, "/alarm", "alarm", self.alarm_post)
+        self.add_endpoint(url_prefix, "/details", "details", self.details_post)
+
+    def add_endpoint(
+        self, url_prefix: str, rule: str, endpoint: str, view_func: Any
+    ) -> None:
+        if url_prefix:
+            endpoint = f"{self.name}_{endpoint}"
         self.app.add_url_rule(
-            "/details", "details", self.details_post, methods=["POST"]
+            f"{url_prefix}{rule}", endpoint, view_func, methods=["POST"]
         )
 
-    def worker_rest(self) -> None:
-        self.app.run(host="0.0.0.0", port=9998)
-
     def worker_state(self) -> None:
-        while not self.shutdown_event.is_set():
+        while not self.dispatch.shutdown_event.is_set():
+            self.dispatch.wake_event.clear()
+            self.dispatch.wake_event.wait(self.tick())
+
+    def tick(self) -> float:
+        """dispatch cancel/jobs right away and poll details when due
+
+        Called whenever the job state changes and at the latest after the
+        returned delay (details cadence or backoff).
+        """
+        dispatch = self.dispatch
+        now = time.monotonic()
+        if now < dispatch.retry_at:
+            return dispatch.retry_at - now
+        try:
             if self.state.cancel_job:
                 if self.send_cancel():
                     self.state.cancel_job = False
-            try:
-                self.get_details()
-                if not self.state.has_job() and self.state.has_pending_jobs():
-                    print(
-                        f"[CCS][worker_state] has_job={self.state.has_job()}, has_new_job={self.state.has_pending_jobs()}"
-                    )
-                    self.send_job()
-            except (
-                ConnectionError,
-                MaxRetryError,
-                ConnectionRefusedError,
-                NewConnectionError,
-            ):
+            if not self.state.has_job() and self.state.has_pending_jobs():
                 print(
-                    "[CCS][worker_state] exception (one off ConnectionError,"
-                    "MaxRetryError,ConnectionRefusedError,NewConnectionError)"
+                    f"[CCS][tick] {self.name} has_job={self.state.has_job()}, has_new_job={self.state.has_pending_jobs()}"
                 )
-            time.sleep(1)
+                self.send_job()
+            if now >= dispatch.details_due:
+                self.get_details()
+                dispatch.details_due = now + dispatch.details_interval
+            dispatch.backoff.success()
+            return max(0.0, dispatch.details_due - time.monotonic())
+        except (
+            ConnectionError,
+            MaxRetryError,
+            ConnectionRefusedError,
+            NewConnectionError,
+            Timeout,
+        ):
+            delay = dispatch.backoff.failure()
+            dispatch.retry_at = now + delay
+            print(
+                f"[CCS][tick] {self.name} exception (one off ConnectionError,"
+                "MaxRetryError,ConnectionRefusedError,NewConnectionError,"
+                f"Timeout), retry in {delay:.1f}s"
+            )
+            return delay
 
     def alarm_post(self) -> Any:
         if self.verbose:
-            print(f"[CCS][alarm_post] {request.data}")
-        self.messages.add_error_msg(title="CCS alarm", text=str(request.data))
+            print(f"[CCS][alarm_post] {request.data!r}")
+        alarm = parse_alarm(request.data, self.name)
+        # repeats and floods only count up in the alarm store
+        if self.alarms.add(alarm):
+            self.messages.add_error_msg(
+                title=f"CCS alarm {alarm.source} {alarm.code}", text=alarm.text
+            )
         return "OK"
 
     def metric_post(self) -> Any:
@@ -107,7 +169,7 @@ class CCS:
         if self.verbose:
             print(f"[CCS][details_post] {request.data=}")
         try:
-            self.state.details = CCSCraneDetails.from_json(request.data.decode("utf-8"))  # type: ignore[attr-defined]
+            self.state.details = from_json(CCSCraneDetails, request.data)
         except ValidationError:
             return "Invalid input", 405
         except (JSONDecodeError, MaxRetryError, ConnectionError) as error:
@@ -132,27 +194,28 @@ class CCS:
         return "unknown error", 500
 
     def send_job(self) -> None:
-        data = self.state.get_new_job_as_json()
-        if data == "{}":
+        job = self.state.peek_new_job()
+        if job is None:
             if self.verbose:
                 print(f"[CCS][send_job] {self.state=}")
             # self.state.reject_new_job()
             self.messages.add_error_msg(title="CCS send_job", text="job is empty")
             return
+        data = to_json(job)
+        self.metric.timings.job_stage(job_id(job), "dispatch")
         print(data)
-        ret = requests.post(f"{self.ccs_url}/job", data=data)
-        if self.verbose:
-            print(f"[CCS][send_job]: {self.state.get_new_job_as_json()=}")
+        ret = self.dispatch.client.post("/job", data=data)
         print(f"[CCS][send_job]: {ret=}")
 
         if ret.text == "OK" or ret.status_code == 200:
-            self.state.ack_new_job()
+            # ack exactly the job that was sent, even if the queue changed meanwhile
+            self.state.ack_new_job(job)
             self.messages.add_msg(title="CCS send_job", text="thing acked job")
         else:
             self.messages.add_error_msg(title="CCS send_job", text="thing rejected job")
 
     def send_cancel(self) -> bool:
-        ret = requests.post(f"{self.ccs_url}/job_cancel")
+        ret = self.dispatch.client.post("/job_cancel")
         print(f"[CCS][send_cancel]: {ret=}")
 
         if ret.text == "OK" or ret.status_code == 200:
@@ -167,8 +230,8 @@ class CCS:
 
     def get_job(self) -> None:
         try:
-            job_json = requests.get(f"{self.ccs_url}/job")
-        except ConnectionError:
+            job_json = self.dispatch.client.get("/job")
+        except (ConnectionError, Timeout):
             return
         try:
             self.state.set_new_job(str(job_json.text))
@@ -181,13 +244,11 @@ class CCS:
         return
 
     def get_details(self) -> None:
+        # connection errors are handled (with backoff) by worker_state
+        ret = self.dispatch.client.get("/details")
+        # print(f"details: {ret.text=}")
         try:
-            ret = requests.get(f"{self.ccs_url}/details")
-            # print(f"details: {ret.text=}")
-        except ConnectionError:
-            return
-        try:
-            self.state.details = CCSCraneDetails.from_json(ret.text)  # type: ignore[attr-defined]
+            self.state.details = from_json(CCSCraneDetails, ret.text)
             # print(f"{self.state.details=}")
         except ValidationError:
             return
@@ -197,4 +258,6 @@ class CCS:
         return
 
     def shutdown(self) -> None:
-        self.shutdown_event.set()
+        self.dispatch.shutdown_event.set()
+        self.dispatch.wake_event.set()
+        self.dispatch.client.close()
@@ -0,0 +1,52 @@
+import random
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Backoff:
+    """exponential backoff with jitter, the delay doubles with every failure"""
+
+    def __init__(self, base: float = 1.0, cap: float = 30.0) -> None:
+        self.base = base
+        self.cap = cap
+        self.failures = 0
+
+    def success(self) -> float:
+        self.failures = 0
+        return self.base
+
+    def failure(self) -> float:
+        self.failures += 1
+        delay = min(self.cap, self.base * 2.0**self.failures)
+        # equal jitter: never below half the delay, so a crane reboot doesn't
+        # get hammered, but reconnects of several clients are spread out
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CCSClient:
+    """keep-alive http connection pool to one crane with explicit timeouts"""
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 5.0,
+        pool_size: int = 4,
+    ) -> None:
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path: str) -> requests.Response:
+        return self.session.get(f"{self.url}{path}", timeout=self.timeout)
+
+    def post(self, path: str, data: Any = None) -> requests.Response:
+        return self.session.post(f"{self.url}{path}", data=data, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,176 @@
+"""fast json codec for the CCS wire types
+
+dataclasses_json builds every object through its generic (de)serialization
+machinery on every call. Here each type gets a decoder and an encoder
+compiled once from its dataclass fields. The output of `to_json` is byte
+identical to `<type>.to_json()`. `from_json` validates like the marshmallow
+schema of the type (wrong types, null or non-object values raise
+ValidationError) but ignores unknown fields as `<type>.from_json()` does.
+"""
+
+import json
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, TypeVar, get_args, get_origin, get_type_hints
+
+from marshmallow import ValidationError
+from marshmallow.fields import Boolean
+
+from tams.ccs.types import (
+    CCSCoordinates,
+    CCSCraneDetails,
+    CCSEvent,
+    CCSFeature,
+    CCSJob,
+    CCSJobState,
+    CCSUnit,
+)
+
+T = TypeVar("T")
+
+Decoder = Callable[[Any], Any]
+Encoder = Callable[[Any], Any]
+
+
+def _decode_str(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValidationError("Not a valid string.")
+    return value
+
+
+def _decode_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValidationError("Not a valid integer.")
+    if isinstance(value, int):
+        return value
+    try:
+        number = float(value) if isinstance(value, (float, str)) else None
+    except ValueError:
+        number = None
+    if number is None or not number.is_integer():
+        raise ValidationError("Not a valid integer.")
+    return int(number)
+
+
+def _decode_bool(value: Any) -> bool:
+    try:
+        if value in Boolean.truthy:
+            return True
+        if value in Boolean.falsy:
+            return False
+    except TypeError:
+        pass
+    raise ValidationError("Not a valid boolean.")
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class _Codec:
+    def __init__(self, cls: type) -> None:
+        self.cls = cls
+        self.decoders: list[tuple[str, Decoder]] = []
+        self.encoders: list[tuple[str, Encoder]] = []
+        hints = get_type_hints(cls)
+        for field in fields(cls):
+            decoder, encoder = _compile(hints[field.name])
+            self.decoders.append((field.name, decoder))
+            self.encoders.append((field.name, encoder))
+
+    def decode(self, data: Any) -> Any:
+        if not isinstance(data, dict):
+            raise ValidationError({"_schema": ["Invalid input type."]})
+        kwargs: dict[str, Any] = {}
+        errors: dict[str, Any] = {}
+        for name, decoder in self.decoders:
+            if name not in data:
+                continue
+            value = data[name]
+            if value is None:
+                errors[name] = ["Field may not be null."]
+                continue
+            try:
+                kwargs[name] = decoder(value)
+            except ValidationError as error:
+                errors[name] = error.messages
+        if errors:
+            raise ValidationError(errors)
+        return self.cls(**kwargs)
+
+    def encode(self, obj: Any) -> dict[str, Any]:
+        return {name: encoder(getattr(obj, name)) for name, encoder in self.encoders}
+
+
+def _compile(hint: Any) -> tuple[Decoder, Encoder]:
+    if hint is str:
+        return _decode_str, _identity
+    if hint is bool:
+        return _decode_bool, _identity
+    if hint is int:
+        return _decode_int, _identity
+    if is_dataclass(hint):
+        codec = _codec(hint)  # type: ignore[arg-type]
+        return codec.decode, codec.encode
+    if get_origin(hint) is list:
+        item_decoder, item_encoder = _compile(get_args(hint)[0])
+
+        def decode_list(value: Any) -> list[Any]:
+            if not isinstance(value, list):
+                raise ValidationError("Not a valid list.")
+            items = []
+            errors = {}
+            for index, item in enumerate(value):
+                try:
+                    items.append(item_decoder(item))
+                except ValidationError as error:
+                    errors[index] = error.messages
+            if errors:
+                raise ValidationError(errors)
+            return items
+
+        def encode_list(value: list[Any]) -> list[Any]:
+            return [item_encoder(item) for item in value]
+
+        return decode_list, encode_list
+    raise TypeError(f"no codec for {hint}")
+
+
+_codecs: dict[type, _Codec] = {}
+
+
+def _codec(cls: type) -> _Codec:
+    codec = _codecs.get(cls)
+    if codec is None:
+        codec = _codecs[cls] = _Codec(cls)
+    return codec
+
+
+def from_json(cls: type[T], text: str | bytes) -> T:
+    """decodes `text` into `cls`, raises ValidationError or JSONDecodeError"""
+    return _codec(cls).decode(json.loads(text))  # type: ignore[no-any-return]
+
+
+def from_dict(cls: type[T], data: Any) -> T:
+    """decodes already parsed json into `cls`, raises ValidationError"""
+    return _codec(cls).decode(data)  # type: ignore[no-any-return]
+
+
+def to_json(obj: Any) -> str:
+    return json.dumps(_codec(type(obj)).encode(obj))
+
+
+def to_dict(obj: Any) -> dict[str, Any]:
+    return _codec(type(obj)).encode(obj)
+
+
+# compile the wire types up front instead of on the first message
+for _cls in (
+    CCSEvent,
+    CCSUnit,
+    CCSCoordinates,
+    CCSJob,
+    CCSFeature,
+    CCSJobState,
+    CCSCraneDetails,
+):
+    _codec(_cls)
@@ -0,0 +1,109 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from os import getcwd
+from threading import Thread
+
+from flask import Flask
+
+from tams.ccs.ccs import CCS
+from tams.metric.timing import Timings
+from tams.web.server import ServerConfig, serve
+
+
+class CCSSupervisor:
+    """drives any number of cranes from a single asyncio event loop
+
+    Every crane is a CCS sharing one callback app (cranes post to
+    /crane/<name>/state etc.). The loop runs one task per crane that ticks it
+    whenever its job state changes and otherwise on its details cadence.
+    requests is blocking, so the http calls of a tick run on an executor with
+    a thread per crane while scheduling, backoff and shutdown stay on the
+    loop. A crane waiting for its connect and read timeouts never delays the
+    ticks of the others. A tick that fails is logged and retried with the
+    backoff of its crane, the other cranes keep running.
+    """
+
+    def __init__(
+        self,
+        port: int = 9998,
+        timings: Timings | None = None,
+        server: ServerConfig | None = None,
+    ) -> None:
+        self.port = port
+        self.server = server
+        self.app = Flask("tams ccs", root_path=getcwd())
+        if timings is not None:
+            timings.instrument(self.app, "ccs")
+        self.cranes: dict[str, CCS] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wake_events: dict[str, asyncio.Event] = {}
+        self.worker_rest_thread = Thread(
+            target=self.worker_rest,
+            args=(),
+            name="CCS Supervisor Rest",
+            daemon=True,
+        )
+        self.worker_loop_thread = Thread(
+            target=self.worker_loop,
+            args=(),
+            name="CCS Supervisor Loop",
+            daemon=True,
+        )
+
+    def add_crane(self, crane: CCS) -> None:
+        if crane.app is not self.app:
+            raise ValueError(f"crane {crane.name} must use the supervisor app")
+        if crane.name in self.cranes:
+            raise ValueError(f"crane {crane.name} already supervised")
+        self.cranes[crane.name] = crane
+
+    def start(self) -> None:
+        self.worker_rest_thread.start()
+        self.worker_loop_thread.start()
+
+    def worker_rest(self) -> None:
+        serve(self.app, self.port, self.server)
+
+    def worker_loop(self) -> None:
+        asyncio.run(self.supervise())
+
+    async def supervise(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        # a crane runs one tick at a time, so one thread per crane suffices
+        with ThreadPoolExecutor(max(1, len(self.cranes)), "CCS Supervisor") as executor:
+            await asyncio.gather(
+                *(self.run_crane(crane, executor) for crane in self.cranes.values()),
+                return_exceptions=True,
+            )
+
+    async def run_crane(self, crane: CCS, executor: ThreadPoolExecutor) -> None:
+        assert self.loop is not None
+        loop = self.loop
+        print(f"[SUPERVISOR][run_crane] {crane.name} {crane.dispatch.client.url}")
+        wake = self.wake_events[crane.name] = asyncio.Event()
+
+        def notify() -> None:
+            loop.call_soon_threadsafe(wake.set)
+
+        crane.state.observers.add_listener(notify)
+        while not crane.dispatch.shutdown_event.is_set():
+            wake.clear()
+            try:
+                delay = await loop.run_in_executor(executor, crane.tick)
+            except Exception as error:  # pylint: disable=broad-except
+                delay = crane.dispatch.backoff.failure()
+                print(
+                    f"[SUPERVISOR][run_crane] {crane.name} tick failed {error!r}, "
+                    f"retry in {delay:.1f}s"
+                )
+            try:
+                await asyncio.wait_for(wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def shutdown(self) -> None:
+        for crane in self.cranes.values():
+            crane.shutdown()
+        if self.loop is not None:
+            for wake in self.wake_events.values():
+                self.loop.call_soon_threadsafe(wake.set)
@@ -28,8 +28,9 @@ class CCSEvent:
     eventId: str = field(default_factory=guid)  # pylint: disable=invalid-name
 
 
+# slots: the storage holds one per unit of the yard
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class CCSUnit:
     unitId: str = field(default_factory=guid)  # pylint: disable=invalid-name
     height: int = 0
@@ -42,7 +43,7 @@ class CCSUnit:
 
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class CCSCoordinates:
     # in mm
     x: int = 1  # pylint: disable=invalid-name
@@ -0,0 +1,62 @@
+import json
+from dataclasses import dataclass
+from queue import Full, Queue
+from threading import Lock
+from typing import Any
+
+
+@dataclass
+class ServerEvent:
+    type: str
+    data: str
+
+    def encode(self) -> str:
+        # one server-sent events frame, multi line data is split into data fields
+        data = "".join(f"data: {line}\n" for line in self.data.splitlines() or [""])
+        return f"event: {self.type}\n{data}\n"
+
+
+class EventBus:
+    """fan-out of state changes to any number of subscribers (e.g. SSE streams)"""
+
+    def __init__(self, queue_size: int = 1000) -> None:
+        self.queue_size = queue_size
+        self.lock = Lock()
+        self.subscribers: list[Queue[ServerEvent]] = []
+
+    def subscribe(self) -> "Queue[ServerEvent]":
+        queue: Queue[ServerEvent] = Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: "Queue[ServerEvent]") -> None:
+        with self.lock:
+            try:
+                self.subscribers.remove(queue)
+            except ValueError:
+                pass
+
+    def has_subscribers(self) -> bool:
+        return len(self.subscribers) > 0
+
+    def publish(self, event_type: str, data: Any) -> None:
+        if not self.subscribers:
+            return
+        event = ServerEvent(
+            event_type, data if isinstance(data, str) else json.dumps(data)
+        )
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for queue in subscribers:
+            try:
+                queue.put_nowait(event)
+            except Full:
+                # slow client, it gets a reset and reloads the full state
+                self._reset(queue)
+
+    @staticmethod
+    def _reset(queue: "Queue[ServerEvent]") -> None:
+        with queue.mutex:
+            queue.queue.clear()
+        queue.put_nowait(ServerEvent("reset", "{}"))
@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterable
+
+from tams.ccs.codec import to_dict
+from tams.ccs.types import CCSJob, CCSJobState
+from tams.state.queue import job_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    crane TEXT NOT NULL,
+    event TEXT NOT NULL,
+    job_id TEXT,
+    unit TEXT,
+    job_type TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_unit ON history (unit, seq);
+CREATE INDEX IF NOT EXISTS history_crane ON history (crane, seq);
+CREATE INDEX IF NOT EXISTS history_time ON history (time);
+CREATE INDEX IF NOT EXISTS history_job ON history (job_id, seq);
+"""
+
+MAX_PAGE = 1000
+
+INSERT = (
+    "INSERT INTO history"
+    " (time, crane, event, job_id, unit, job_type, status, data)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class JobHistory:
+    """append-only log of every job and job state transition of all cranes
+
+    One row per transition (enqueue, dispatch, state, done, cancel, ...)
+    with the job or crane state as compact json. Rows are only ever
+    inserted, `query` pages through them newest first by sequence number
+    using the indexes, so a page never loads more than `limit` rows.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row(
+        crane: str, event: str, job: CCSJob | None, state: CCSJobState | None
+    ) -> tuple[Any, ...]:
+        data: dict[str, Any] = {}
+        if job is not None:
+            data["job"] = to_dict(job)
+        if state is not None:
+            data["state"] = to_dict(state)
+        unit = job.unit if job is not None else state.unit if state else None
+        return (
+            time.time(),
+            crane,
+            event,
+            None if job is None else job_id(job),
+            None if unit is None else unit.number,
+            None if job is None else job.type,
+            None if state is None else state.jobStatus,
+            json.dumps(data, separators=(",", ":")),
+        )
+
+    def record(
+        self,
+        crane: str,
+        event: str,
+        job: CCSJob | None = None,
+        state: CCSJobState | None = None,
+    ) -> None:
+        row = self._row(crane, event, job, state)
+        with self.lock, self.conn:
+            self.conn.execute(INSERT, row)
+
+    def record_many(self, crane: str, event: str, jobs: Iterable[CCSJob]) -> None:
+        """one row per job in a single transaction, e.g. a bulk enqueue"""
+        rows = [self._row(crane, event, job, None) for job in jobs]
+        if not rows:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(INSERT, rows)
+
+    def query(  # pylint: disable=too-many-arguments
+        self,
+        unit: str | None = None,
+        crane: str | None = None,
+        job: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        before: int | None = None,
+        limit: int = 100,
+    ) -> dict[str, Any]:
+        """one page of rows, newest first
+
+        Pass the returned `next` as `before` to get the following page, it is
+        None on the last page.
+        """
+        filters = {
+            "unit = ?": unit,
+            "crane = ?": crane,
+            "job_id = ?": job,
+            "time >= ?": since,
+            "time < ?": until,
+            "seq < ?": before,
+        }
+        where = [clause for clause, value in filters.items() if value is not None]
+        limit = max(1, min(limit, MAX_PAGE))
+        sql = (
+            "SELECT seq, time, crane, event, job_id, unit, job_type, status, data"
+            " FROM history"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY seq DESC LIMIT ?"
+        )
+        args = [value for value in filters.values() if value is not None]
+        with self.lock:
+            rows = self.conn.execute(sql, (*args, limit + 1)).fetchall()
+        items = [
+            {
+                "seq": row[0],
+                "time": row[1],
+                "crane": row[2],
+                "event": row[3],
+                "job_id": row[4],
+                "unit": row[5],
+                "type": row[6],
+                "status": row[7],
+                **json.loads(row[8]),
+            }
+            for row in rows[:limit]
+        ]
+        return {
+            "items": items,
+            "next": items[-1]["seq"] if len(rows) > limit else None,
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
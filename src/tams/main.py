@@ -1,44 +1,343 @@
 #!/usr/bin/env python
+# pylint: disable=import-outside-toplevel
+"""tams entry point
+
+Flask, requests and the rest of tams are imported where they are first
+needed, so argument errors and --help return at once. On start the web
+apps serve /health (and the ui) first, the yards are restored and the
+cranes connected after that, /ready answers 200 once everything runs.
+"""
+
 import time
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from tams.web.server import SERVER_MODES, ServerConfig
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+    from tams.ccs.ccs import CCS
+    from tams.ccs.supervisor import CCSSupervisor
+    from tams.event.event import EventBus
+    from tams.history.history import JobHistory
+    from tams.metric.metric import Metric
+    from tams.metric.timing import Timings
+    from tams.state.state import TamsJobState
+    from tams.storage.journal import StorageJournal
+    from tams.storage.snapshot import SnapshotPublisher
+    from tams.storage.sqlite import SqliteStore
+    from tams.storage.storage import TamsStorage
+    from tams.web.web import Web
 
-from tams.ccs.ccs import CCS
-from tams.metric.metric import Metric
-from tams.state.state import TamsJobState
-from tams.storage.storage import TamsStorage
-from tams.web.web import Web
+
+def crane_arg(value: str) -> tuple[str, str, int]:
+    name, _, address = value.partition("=")
+    host, _, port = address.partition(":")
+    if not name or not host or (port and not port.isdigit()):
+        raise ArgumentTypeError(f"expected NAME=IP[:PORT], got {value!r}")
+    return name, host, int(port) if port else 9999
+
+
+def tolerance_arg(value: str) -> int:
+    if not value.isdigit():
+        raise ArgumentTypeError(f"expected a distance in mm >= 0, got {value!r}")
+    return int(value)
 
 
 def get_args() -> Any:
+    from tams.state.scheduler import schedulers
+
     parser = ArgumentParser(description="yolo")
     parser.add_argument("-c", "--ccs", type=str, default="127.0.0.1", help="IP of CCS")
+    parser.add_argument(
+        "--crane",
+        type=crane_arg,
+        action="append",
+        default=[],
+        metavar="NAME=IP[:PORT]",
+        help="supervise this crane (CCS port defaults to 9999), repeatable. "
+        "Each crane gets its own yard "
+        "(export-NAME.json) and web ui (port 7000 + n), "
+        "its callbacks are /crane/NAME/... on port 9998",
+    )
+    parser.add_argument(
+        "--scheduler",
+        choices=sorted(schedulers),
+        default="fifo",
+        help="order in which pending jobs are dispatched, "
+        "nearest minimizes crane travel",
+    )
+    parser.add_argument(
+        "--store",
+        choices=("journal", "sqlite"),
+        default="journal",
+        help="persist the yard as export.json plus a journal or in a sqlite "
+        "database (export.db, created from export.json if there is one)",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        default="history.db",
+        help="sqlite file of the job history of all cranes, empty to disable",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=tolerance_arg,
+        default=500,
+        help="max deviation in mm of a crane target from a stack position",
+    )
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="verbose log output"
     )
     parser.add_argument("--logwebcalls", action="store_true", help="log web calls")
+    parser.add_argument(
+        "--server",
+        choices=SERVER_MODES,
+        default="dev",
+        help="http server for the web and ccs apps, "
+        "waitress is a multi-threaded production server (pip install waitress)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=ServerConfig.threads,
+        help="request threads per app (waitress), each open dashboard needs one",
+    )
+    parser.add_argument(
+        "--connection-limit",
+        type=int,
+        default=ServerConfig.connection_limit,
+        help="max open connections per app (waitress)",
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=int,
+        default=ServerConfig.keepalive_timeout,
+        help="seconds an idle keep-alive connection stays open (waitress)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="publish the yard to a memory mapped file (export.snap) "
+        "for read replicas (tams-replica)",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="record job lifecycle and endpoint latencies "
+        "(/metrics and /debug/timings)",
+    )
     return parser.parse_args()
 
 
 json_path = Path("export.json")
 
 
-def run() -> None:
-    args = get_args()
-    storage = TamsStorage()
-    if json_path.is_file():
-        storage.import_json(json_path)
-    state = TamsJobState(storage, verbose=args.verbose)
-    metrics = Metric()
-    web = Web(state, storage, metrics, verbose=args.verbose)
-    ccs = CCS(
+# the events, storage and store of a crane
+Yard = tuple["EventBus", "TamsStorage", "StorageJournal | SqliteStore"]
+
+
+class Shared(NamedTuple):
+    """created once in run and used by every crane"""
+
+    timings: "Timings"
+    server: ServerConfig
+    history: "JobHistory | None"
+    # the ccs app of the supervisor, None for a single crane
+    app: "Flask | None" = None
+
+
+class CraneSpec(NamedTuple):
+    host: str
+    ccs_port: int = 9999
+    web_port: int = 7000
+    name: str | None = None
+    # the journal is next to it, export.journal for export.json
+    yard_path: Path = json_path
+
+
+class Crane(NamedTuple):
+    storage: "TamsStorage"
+    journal: "StorageJournal | SqliteStore"
+    web: "Web"
+    ccs: "CCS"
+    yard_path: Path
+
+
+def open_yard(args: Any, yard_path: Path) -> Yard:
+    """empty yard with its store, restore it with `journal.restore(storage)`"""
+    from tams.event.event import EventBus
+    from tams.storage.journal import StorageJournal
+    from tams.storage.sqlite import SqliteStore
+    from tams.storage.storage import TamsStorage
+
+    events = EventBus()
+    storage = TamsStorage(events=events, tolerance=args.tolerance)
+    if args.store == "sqlite":
+        return events, storage, SqliteStore(yard_path.with_suffix(".db"), yard_path)
+    return (
+        events,
+        storage,
+        StorageJournal(yard_path.with_suffix(".journal"), yard_path),
+    )
+
+
+def build_state(
+    args: Any, shared: Shared, spec: CraneSpec, metrics: "Metric", yard: Yard
+) -> "TamsJobState":
+    from tams.ccs.ccs import CCS
+    from tams.state.scheduler import schedulers
+    from tams.state.state import TamsJobState
+
+    events, storage, _ = yard
+    return TamsJobState(
+        storage,
+        verbose=args.verbose,
+        events=events,
+        scheduler=schedulers[args.scheduler](),
+        timings=metrics.timings,
+        history=shared.history,
+        name=CCS.name if spec.name is None else spec.name,
+    )
+
+
+def build_crane(args: Any, shared: Shared, spec: CraneSpec) -> Crane:
+    """crane with its yard, not restored and the web not ready yet
+
+    Restore later with `crane.journal.restore(crane.storage)` and set
+    `crane.web.health.ready`.
+    """
+    from tams.alarm.alarm import AlarmStore
+    from tams.ccs.ccs import CCS
+    from tams.metric.metric import Metric
+    from tams.web.web import Web
+
+    yard = open_yard(args, spec.yard_path)
+    events, storage, journal = yard
+    metrics = Metric(events=events, timings=shared.timings)
+    alarms = AlarmStore()
+    state = build_state(args, shared, spec, metrics, yard)
+    web = Web(
         state,
-        web.msgs,
+        storage,
         metrics,
-        ccs_url=f"http://{args.ccs}:9999",
         verbose=args.verbose,
+        events=events,
+        port=spec.web_port,
+        server=shared.server,
+        alarms=alarms,
+        ready=False,
+    )
+    return Crane(
+        storage,
+        journal,
+        web,
+        CCS(
+            state,
+            web.msgs,
+            metrics,
+            ccs_url=f"http://{spec.host}:{spec.ccs_port}",
+            verbose=args.verbose,
+            name=spec.name,
+            app=shared.app,
+            server=shared.server,
+            alarms=alarms,
+        ),
+        spec.yard_path,
+    )
+
+
+def crane_specs(args: Any) -> list[CraneSpec]:
+    """the --crane cranes, or the single crane at --ccs"""
+    if not args.crane:
+        return [CraneSpec(args.ccs)]
+    return [
+        CraneSpec(host, ccs_port, 7000 + index, name, Path(f"export-{name}.json"))
+        for index, (name, host, ccs_port) in enumerate(args.crane)
+    ]
+
+
+def start(
+    args: Any,
+    cranes: list[Crane],
+    supervisor: "CCSSupervisor | None",
+    publishers: list["SnapshotPublisher"],
+) -> None:
+    """web apps first, then the yards, snapshots and the cranes"""
+    for crane in cranes:
+        crane.web.start()
+    for crane in cranes:
+        crane.journal.restore(crane.storage)
+    if args.snapshot:
+        from tams.storage.snapshot import SnapshotPublisher, SnapshotWriter
+
+        for crane in cranes:
+            writer = SnapshotWriter(
+                crane.yard_path.with_suffix(".snap"),
+                generation=int(crane.web.etag_prefix, 16),
+            )
+            publishers.append(SnapshotPublisher(crane.storage, writer))
+            publishers[-1].start()
+    if supervisor is not None:
+        supervisor.start()
+    for crane in cranes:
+        if supervisor is None:
+            crane.ccs.start()
+        crane.web.health.ready.set()
+
+
+def persist_loop(cranes: list[Crane]) -> None:
+    while True:
+        time.sleep(1)
+        for crane in cranes:
+            crane.journal.sync()
+            if crane.journal.needs_compaction():
+                crane.journal.compact(crane.storage)
+
+
+def shutdown(
+    cranes: list[Crane],
+    supervisor: "CCSSupervisor | None",
+    publishers: list["SnapshotPublisher"],
+    history: "JobHistory | None",
+) -> None:
+    for publisher in publishers:
+        publisher.close()
+    for crane in cranes:
+        crane.journal.compact(crane.storage)
+        crane.journal.close()
+        crane.ccs.shutdown()
+        crane.web.shutdown()
+    if supervisor is not None:
+        supervisor.shutdown()
+    if history is not None:
+        history.close()
+
+
+def run() -> None:
+    args = get_args()
+    from tams.ccs.supervisor import CCSSupervisor
+    from tams.history.history import JobHistory
+    from tams.metric.timing import Timings
+
+    server = ServerConfig(
+        args.server, args.threads, args.connection_limit, args.keepalive_timeout
+    )
+    shared = Shared(
+        Timings(enabled=args.timings),
+        server,
+        JobHistory(Path(args.history)) if args.history else None,
     )
+    supervisor: CCSSupervisor | None = None
+    if args.crane:
+        supervisor = CCSSupervisor(timings=shared.timings, server=server)
+        shared = shared._replace(app=supervisor.app)
+    cranes = [build_crane(args, shared, spec) for spec in crane_specs(args)]
+    if supervisor is not None:
+        for crane in cranes:
+            supervisor.add_crane(crane.ccs)
 
     if not args.logwebcalls:
         import logging  # pylint: disable=import-outside-toplevel
@@ -46,15 +345,12 @@ def run() -> None:
         log = logging.getLogger("werkzeug")
         log.setLevel(logging.ERROR)
 
+    publishers: list["SnapshotPublisher"] = []
     try:
-        ccs.start()
-        web.start()
-        while True:
-            time.sleep(1)
+        start(args, cranes, supervisor, publishers)
+        persist_loop(cranes)
     except KeyboardInterrupt:
-        storage.export_json(json_path)
-        ccs.shutdown()
-        web.shutdown()
+        shutdown(cranes, supervisor, publishers, shared.history)
 
 
 if __name__ == "__main__":
@@ -1,14 +1,153 @@
+import json
+import math
+import time
+from threading import Lock
 from typing import Any
 
+from tams.event.event import EventBus
+from tams.metric.series import Aggregate, MetricSeries
+from tams.metric.timing import Timings
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(value: float) -> str:
+    # prometheus spells it NaN, python nan
+    return "NaN" if math.isnan(value) else str(value)
+
 
 class Metric:
     __metrics: Any = {}
 
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        events: EventBus | None = None,
+        capacity: int = 3600,
+        windows: tuple[int, ...] = (60, 300),
+        timings: Timings | None = None,
+    ) -> None:
+        self.events = events
+        self.timings = timings if timings is not None else Timings()
+        self.version = 0
+        # samples kept per metric and the windows (in s) exported to prometheus
+        self.capacity = capacity
+        self.windows = windows
+        self.lock = Lock()
+        self.series: dict[str, MetricSeries] = {}
+        self._prometheus: tuple[tuple[int, int, int], str] = ((-1, -1, -1), "")
 
     def get_metrics(self) -> Any:
         return self.__metrics
 
     def set_metrics(self, met: Any) -> None:
         self.__metrics = met
+        self.version += 1
+        self.record(met)
+        if self.events is not None:
+            data = met.decode("utf-8") if isinstance(met, bytes) else met
+            self.events.publish("metric", data)
+
+    def record(self, met: Any, timestamp: float | None = None) -> None:
+        """adds the numeric values of a crane metric blob to their series"""
+        try:
+            data = json.loads(met) if isinstance(met, (str, bytes)) else met
+            entries = data["metrics"]
+        except (ValueError, TypeError, KeyError) as error:
+            print(f"[METRIC][record] invalid metrics {error}")
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            for entry in entries:
+                try:
+                    name, value = str(entry["name"]), float(entry["value"])
+                except (ValueError, TypeError, KeyError):
+                    continue
+                series = self.series.get(name)
+                if series is None:
+                    series = self.series[name] = MetricSeries(self.capacity)
+                series.append(timestamp, value)
+
+    def aggregate(self, name: str, window: float) -> Aggregate | None:
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                return None
+            return series.aggregate(time.time() - window)
+
+    def get_prometheus(self) -> str:
+        now = time.time()
+        # scrapes within the same second and without new samples are free
+        key = (self.version, self.timings.version, int(now))
+        if self._prometheus[0] == key:
+            return self._prometheus[1]
+        # last, summary, min and max lines, each type is written in one block
+        sections: tuple[list[str], ...] = ([], [], [], [])
+        with self.lock:
+            for name, series in sorted(self.series.items()):
+                self._series_prometheus(name, series, now, sections)
+        last, summary, minimum, maximum = sections
+        lines = [
+            "# TYPE tams_metric gauge",
+            *last,
+            "# TYPE tams_metric_window summary",
+            *summary,
+            "# TYPE tams_metric_window_min gauge",
+            *minimum,
+            "# TYPE tams_metric_window_max gauge",
+            *maximum,
+            *self._get_latency_prometheus(),
+        ]
+        text = "\n".join(lines) + "\n"
+        self._prometheus = (key, text)
+        return text
+
+    def _series_prometheus(
+        self,
+        name: str,
+        series: MetricSeries,
+        now: float,
+        sections: tuple[list[str], ...],
+    ) -> None:
+        last, summary, minimum, maximum = sections
+        label = f'metric="{_escape_label(name)}"'
+        last.append(f"tams_metric{{{label}}} {series.last()}")
+        for window in self.windows:
+            aggregate = series.aggregate(now - window)
+            labels = f'{label},window="{window}s"'
+            for quantile, value in (
+                ("0.5", aggregate.p50),
+                ("0.9", aggregate.p90),
+                ("0.99", aggregate.p99),
+            ):
+                summary.append(
+                    f'tams_metric_window{{{labels},quantile="{quantile}"}} '
+                    f"{_sample(value)}"
+                )
+            summary.append(f"tams_metric_window_sum{{{labels}}} {aggregate.total}")
+            summary.append(f"tams_metric_window_count{{{labels}}} {aggregate.count}")
+            minimum.append(
+                f"tams_metric_window_min{{{labels}}} {_sample(aggregate.min)}"
+            )
+            maximum.append(
+                f"tams_metric_window_max{{{labels}}} {_sample(aggregate.max)}"
+            )
+
+    def _get_latency_prometheus(self) -> list[str]:
+        lines = ["# TYPE tams_latency_seconds histogram"]
+        with self.timings.lock:
+            for name, histogram in sorted(self.timings.histograms.items()):
+                label = f'name="{_escape_label(name)}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'tams_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'tams_latency_seconds_bucket{{{label},le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f"tams_latency_seconds_sum{{{label}}} {histogram.sum}")
+                lines.append(f"tams_latency_seconds_count{{{label}}} {histogram.count}")
+        return lines
@@ -0,0 +1,76 @@
+from array import array
+from dataclasses import dataclass
+from math import nan
+
+
+@dataclass
+class Aggregate:
+    # NaN for an empty window, no samples is not a value of 0.0
+    count: int = 0
+    min: float = nan
+    max: float = nan
+    avg: float = nan
+    p50: float = nan
+    p90: float = nan
+    p99: float = nan
+
+    @property
+    def total(self) -> float:
+        """sum of the window, 0.0 if it is empty"""
+        return self.avg * self.count if self.count else 0.0
+
+
+class MetricSeries:
+    """fixed size ring buffer of (timestamp, value) samples"""
+
+    def __init__(self, capacity: int = 3600) -> None:
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, timestamp: float, value: float) -> None:
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def last(self) -> float | None:
+        if self.count == 0:
+            return None
+        return self.values[self.head - 1]
+
+    def window(self, since: float) -> list[float]:
+        """values with a timestamp >= since, oldest first"""
+        values: list[float] = []
+        # walk back from the newest sample, samples are appended in time order
+        index = self.head
+        for _ in range(self.count):
+            index = (index - 1) % self.capacity
+            if self.times[index] < since:
+                break
+            values.append(self.values[index])
+        values.reverse()
+        return values
+
+    def aggregate(self, since: float) -> Aggregate:
+        values = self.window(since)
+        if not values:
+            return Aggregate()
+        ordered = sorted(values)
+        return Aggregate(
+            count=len(values),
+            min=ordered[0],
+            max=ordered[-1],
+            avg=sum(values) / len(values),
+            p50=percentile(ordered, 50),
+            p90=percentile(ordered, 90),
+            p99=percentile(ordered, 99),
+        )
+
+
+def percentile(ordered: list[float], percent: float) -> float:
+    """nearest rank percentile of an already sorted list"""
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(rank)]
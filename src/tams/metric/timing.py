@@ -0,0 +1,131 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+# upper bounds in seconds, like the prometheus client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# job lifecycle stages in order, a span is measured between neighbours
+JOB_STAGES = ("enqueue", "dispatch", "ack", "done")
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        # the last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, percent: float) -> float:
+        """upper bound of the bucket holding the given percentile"""
+        rank = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return (
+                    self.buckets[index] if index < len(self.buckets) else float("inf")
+                )
+        return 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(50),
+            "p90": self.quantile(90),
+            "p99": self.quantile(99),
+        }
+
+
+class Timings:
+    """latency histograms for http endpoints and the job lifecycle
+
+    Disabled timings cost one attribute check per call and register no
+    request hooks.
+    """
+
+    def __init__(self, enabled: bool = False, max_open_jobs: int = 10000) -> None:
+        self.enabled = enabled
+        self.max_open_jobs = max_open_jobs
+        self.lock = Lock()
+        self.version = 0
+        self.histograms: dict[str, LatencyHistogram] = {}
+        # job id -> stage -> monotonic time
+        self.jobs: OrderedDict[str, dict[str, float]] = OrderedDict()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+            self.version += 1
+
+    def job_stage(self, job_id: str, stage: str) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        spans: list[tuple[str, float]] = []
+        with self.lock:
+            stages = self.jobs.get(job_id)
+            if stages is None:
+                if stage != JOB_STAGES[0]:
+                    return
+                stages = self.jobs[job_id] = {}
+                if len(self.jobs) > self.max_open_jobs:
+                    # cancelled or cleared jobs never finish
+                    self.jobs.popitem(last=False)
+            stages[stage] = now
+            index = JOB_STAGES.index(stage)
+            if index > 0 and JOB_STAGES[index - 1] in stages:
+                previous = JOB_STAGES[index - 1]
+                spans.append((f"job {previous}->{stage}", now - stages[previous]))
+            if stage == JOB_STAGES[-1]:
+                spans.append(("job enqueue->done", now - stages[JOB_STAGES[0]]))
+                del self.jobs[job_id]
+        for name, seconds in spans:
+            self.observe(name, seconds)
+
+    def instrument(self, app: "Flask", prefix: str) -> None:
+        """records the latency of every endpoint of the app as '<prefix> <endpoint>'"""
+        if not self.enabled:
+            return
+        from flask import g, request  # pylint: disable=import-outside-toplevel
+
+        def before() -> None:
+            g.tams_request_start = time.perf_counter()
+
+        def after(response: Any) -> Any:
+            start = g.pop("tams_request_start", None)
+            if start is not None:
+                self.observe(
+                    f"{prefix} {request.endpoint}", time.perf_counter() - start
+                )
+            return response
+
+        app.before_request(before)
+        app.after_request(after)
+
+    def as_dict(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "open_jobs": len(self.jobs),
+                "histograms": {
+                    name: histogram.as_dict()
+                    for name, histogram in sorted(self.histograms.items())
+                },
+            }
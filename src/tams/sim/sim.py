@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+import json
+import random
+import time
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from json import JSONDecodeError
+from os import getcwd
+from threading import Event, Lock, Thread
+from typing import Any
+
+from flask import Flask, request
+from marshmallow import ValidationError
+from requests import ConnectionError  # pylint: disable=redefined-builtin
+from requests import Timeout
+
+from tams.ccs.client import CCSClient
+from tams.ccs.codec import from_json, to_json
+from tams.ccs.enums import CCSJobStatus
+from tams.ccs.types import (
+    CCSCoordinates,
+    CCSCraneDetails,
+    CCSEvent,
+    CCSFeature,
+    CCSJob,
+    CCSJobState,
+)
+from tams.state.queue import job_id
+from tams.state.scheduler import TravelModel
+from tams.web.server import ServerConfig, serve
+
+
+@dataclass
+class SimConfig:
+    # tams ccs callback url, http://HOST:9998/crane/NAME for --crane
+    callback_url: str = "http://localhost:9998"
+    port: int = 9999
+    name: str = "sim"
+    # time lapse factor for job runs
+    speed: float = 1.0
+    # seconds to pick or drop a unit, on top of the travel time
+    handling_time: float = 5.0
+    metric_interval: float = 1.0
+    # chance to post an alarm with every metric
+    alarm_probability: float = 0.0
+    server: ServerConfig | None = None
+    travel: TravelModel = field(default_factory=TravelModel)
+
+
+@dataclass
+class SimState:
+    position: CCSCoordinates = field(default_factory=lambda: CCSCoordinates(0, 0, 0))
+    # the running job, None while idle
+    job: CCSJob | None = None
+    jobs_done: int = 0
+    # job id -> {"received": t, "done": t}, cancelled jobs are dropped
+    log: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+class CraneSimulator:
+    """stand-in for the crane control system, the CCS side of the api
+
+    Serves /job, /job_cancel and /details and calls tams back on /state,
+    /metric and /alarm. A job takes the travel time of the crane plus a fixed
+    handling time, both divided by `speed` to run faster than real time.
+    `state.log` keeps the receive and finish time (time.time()) of every job.
+    """
+
+    def __init__(self, config: SimConfig | None = None) -> None:
+        self.config = config if config is not None else SimConfig()
+        # guarded by the lock
+        self.state = SimState()
+        self.client = CCSClient(self.config.callback_url)
+        self.lock = Lock()
+        self.job_event = Event()
+        self.cancel_event = Event()
+        self.shutdown_event = Event()
+        self.app = Flask("tams sim", root_path=getcwd())
+        self.app.add_url_rule("/job", "job", self.job_post, methods=["POST"])
+        self.app.add_url_rule(
+            "/job_cancel", "job_cancel", self.job_cancel_post, methods=["POST"]
+        )
+        self.app.add_url_rule("/details", "details", self.details_get, methods=["GET"])
+        self.threads = [
+            Thread(target=self.worker_rest, name="Sim Rest", daemon=True),
+            Thread(target=self.worker_job, name="Sim Job", daemon=True),
+            Thread(target=self.worker_metric, name="Sim Metric", daemon=True),
+        ]
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    def shutdown(self) -> None:
+        self.shutdown_event.set()
+        self.job_event.set()
+        self.cancel_event.set()
+
+    def worker_rest(self) -> None:
+        serve(self.app, self.config.port, self.config.server)
+
+    def job_post(self) -> Any:
+        try:
+            job = from_json(CCSJob, request.data)
+        except (ValidationError, JSONDecodeError):
+            return "Invalid input", 405
+        with self.lock:
+            if self.state.job is not None:
+                return "busy", 409
+            self.state.job = job
+            self.state.log[job_id(job)] = {"received": time.time()}
+            self.cancel_event.clear()
+        self.job_event.set()
+        return "OK", 200
+
+    def job_cancel_post(self) -> Any:
+        with self.lock:
+            if self.state.job is not None:
+                self.cancel_event.set()
+        return "OK", 200
+
+    def details_get(self) -> Any:
+        details = CCSCraneDetails(
+            event=CCSEvent(type="net.contargo.logistics.tams.details"),
+            features=[CCSFeature()],
+        )
+        return to_json(details), 200
+
+    def worker_job(self) -> None:
+        while not self.shutdown_event.is_set():
+            self.job_event.wait()
+            self.job_event.clear()
+            with self.lock:
+                job = self.state.job
+            if job is not None:
+                self.run_job(job)
+
+    def run_job(self, job: CCSJob) -> None:
+        self.post_state(job, CCSJobStatus.INPROGRESS)
+        config, state = self.config, self.state
+        duration = config.travel.cost(state.position, job.target) + config.handling_time
+        stopped = self.cancel_event.wait(duration / config.speed)
+        with self.lock:
+            state.job = None
+            if stopped:
+                state.log.pop(job_id(job), None)
+            else:
+                state.position = job.target
+                state.jobs_done += 1
+                state.log[job_id(job)]["done"] = time.time()
+        self.post_state(job, CCSJobStatus.STOPPED if stopped else CCSJobStatus.DONE)
+
+    def post_state(self, job: CCSJob, status: str) -> None:
+        state = CCSJobState(jobType=job.type, jobStatus=status, unit=job.unit)
+        self.post("/state", to_json(state))
+
+    def worker_metric(self) -> None:
+        state = self.state
+        while not self.shutdown_event.wait(self.config.metric_interval):
+            with self.lock:
+                metrics = {
+                    "metrics": [
+                        {"name": "CraneCoordinatesX", "value": state.position.x},
+                        {"name": "CraneCoordinatesY", "value": state.position.y},
+                        {"name": "CraneCoordinatesZ", "value": state.position.z},
+                        {"name": "jobs_done", "value": state.jobs_done},
+                        {"name": "busy", "value": int(state.job is not None)},
+                    ]
+                }
+            self.post("/metric", json.dumps(metrics))
+            if random.random() < self.config.alarm_probability:
+                self.post("/alarm", json.dumps({"alarm": "simulated", "code": 42}))
+
+    def post(self, path: str, data: str) -> None:
+        try:
+            self.client.post(path, data=data)
+        except (ConnectionError, Timeout) as error:
+            print(f"[SIM][post] {self.config.name} {path} {error}")
+
+
+def run() -> None:
+    parser = ArgumentParser(description="simulated crane (CCS) for local tests")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument(
+        "--callback",
+        type=str,
+        default="http://localhost:9998",
+        help="tams ccs callback url, http://HOST:9998/crane/NAME for --crane",
+    )
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="time lapse factor for job runs"
+    )
+    parser.add_argument(
+        "--handling-time",
+        type=float,
+        default=5.0,
+        help="seconds to pick or drop a unit, on top of the travel time",
+    )
+    parser.add_argument("--metric-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--alarm-probability",
+        type=float,
+        default=0.0,
+        help="chance to post an alarm with every metric",
+    )
+    args = parser.parse_args()
+    sim = CraneSimulator(
+        SimConfig(
+            args.callback,
+            args.port,
+            speed=args.speed,
+            handling_time=args.handling_time,
+            metric_interval=args.metric_interval,
+            alarm_probability=args.alarm_probability,
+        )
+    )
+    sim.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sim.shutdown()
+
+
+if __name__ == "__main__":
+    run()
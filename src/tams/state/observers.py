@@ -0,0 +1,50 @@
+from typing import Any, Callable, Iterable
+
+from tams.ccs.types import CCSJob, CCSJobState
+from tams.event.event import EventBus
+from tams.history.history import JobHistory
+from tams.metric.timing import Timings
+from tams.state.queue import job_id
+
+
+class JobObservers:
+    """everything told about job changes: listeners, events, history, timings"""
+
+    def __init__(
+        self,
+        name: str = "PSKran",
+        events: EventBus | None = None,
+        history: JobHistory | None = None,
+        timings: Timings | None = None,
+    ) -> None:
+        # crane name in the job history
+        self.name = name
+        self.events = events
+        self.history = history
+        self.timings = timings if timings is not None else Timings()
+        # called when there is something to dispatch (new job, job done, cancel)
+        self.listeners: list[Callable[[], None]] = []
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        self.listeners.append(listener)
+
+    def notify(self) -> None:
+        for listener in self.listeners:
+            listener()
+
+    def publish(self, event_type: str, data: Any) -> None:
+        if self.events is not None:
+            self.events.publish(event_type, data)
+
+    def record(
+        self, event: str, job: CCSJob | None = None, state: CCSJobState | None = None
+    ) -> None:
+        if self.history is not None:
+            self.history.record(self.name, event, job, state)
+
+    def record_many(self, event: str, jobs: Iterable[CCSJob]) -> None:
+        if self.history is not None:
+            self.history.record_many(self.name, event, jobs)
+
+    def stage(self, job: CCSJob, stage: str) -> None:
+        self.timings.job_stage(job_id(job), stage)
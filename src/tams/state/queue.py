@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from typing import Iterator
+
+from tams.ccs.types import CCSJob
+
+
+def job_id(job: CCSJob) -> str:
+    return job.metadata.eventId
+
+
+class JobQueue:
+    """pending jobs by priority (highest first), fifo within one priority
+
+    Every priority is an insertion ordered dict keyed by job id, so enqueue,
+    dequeue and removal/reprioritization by id are O(1). Not thread-safe on
+    its own, TamsJobState guards it with its lock.
+    """
+
+    def __init__(self) -> None:
+        self._queues: dict[int, OrderedDict[str, CCSJob]] = {}
+        self._priorities: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._priorities)
+
+    def __contains__(self, id_: str) -> bool:
+        return id_ in self._priorities
+
+    def __iter__(self) -> Iterator[CCSJob]:
+        for priority in sorted(self._queues, reverse=True):
+            yield from self._queues[priority].values()
+
+    def push(self, job: CCSJob, priority: int = 0) -> bool:
+        id_ = job_id(job)
+        if id_ in self._priorities:
+            return False
+        self._queues.setdefault(priority, OrderedDict())[id_] = job
+        self._priorities[id_] = priority
+        return True
+
+    def top(self) -> Iterator[CCSJob]:
+        """jobs of the highest priority in fifo order"""
+        if self._queues:
+            yield from self._queues[max(self._queues)].values()
+
+    def peek(self) -> CCSJob | None:
+        if not self._queues:
+            return None
+        queue = self._queues[max(self._queues)]
+        return next(iter(queue.values()))
+
+    def pop(self) -> CCSJob:
+        job = self.peek()
+        if job is None:
+            raise IndexError("pop from empty job queue")
+        return self.remove(job_id(job))  # type: ignore[return-value]
+
+    def get(self, id_: str) -> CCSJob | None:
+        priority = self._priorities.get(id_)
+        if priority is None:
+            return None
+        return self._queues[priority][id_]
+
+    def remove(self, id_: str) -> CCSJob | None:
+        priority = self._priorities.pop(id_, None)
+        if priority is None:
+            return None
+        queue = self._queues[priority]
+        job = queue.pop(id_)
+        if not queue:
+            del self._queues[priority]
+        return job
+
+    def set_priority(self, id_: str, priority: int) -> bool:
+        """moves the job to the end of the given priority"""
+        job = self.remove(id_)
+        if job is None:
+            return False
+        self.push(job, priority)
+        return True
+
+    def clear(self) -> None:
+        self._queues.clear()
+        self._priorities.clear()
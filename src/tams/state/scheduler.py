@@ -0,0 +1,151 @@
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable
+
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.state.queue import JobQueue, job_id
+
+
+@dataclass
+class ScheduleContext:
+    # where the crane will be when the next job starts, None if unknown
+    position: CCSCoordinates | None
+    # unit hanging on the spreader, None if the crane is empty
+    crane_unit: CCSUnit | None
+
+
+@dataclass
+class TravelModel:
+    # in mm/s, gantry (x) and trolley (y) move at the same time, hoist (z) after
+    gantry_speed: float = 1000.0
+    trolley_speed: float = 700.0
+    hoist_speed: float = 500.0
+
+    def cost(self, start: CCSCoordinates, target: CCSCoordinates) -> float:
+        """estimated travel time in seconds"""
+        return (
+            max(
+                abs(target.x - start.x) / self.gantry_speed,
+                abs(target.y - start.y) / self.trolley_speed,
+            )
+            + abs(target.z - start.z) / self.hoist_speed
+        )
+
+
+class JobScheduler:
+    """picks the next job to dispatch out of the pending jobs (fifo order)"""
+
+    name = "fifo"
+
+    def select(
+        self, jobs: Iterable[CCSJob], _context: ScheduleContext
+    ) -> CCSJob | None:
+        # fifo ignores where the crane is and what it carries
+        return next(iter(jobs), None)
+
+    def dispatched(self, job: CCSJob, head: CCSJob | None) -> None:
+        """`job` was sent to the crane, `head` was the oldest pending job"""
+
+
+class NearestJobScheduler(JobScheduler):
+    """greedy shortest crane travel, keeping pick -> drop pairs together
+
+    An empty crane only takes picks (and moves), a loaded crane only the drop
+    of its unit (and moves), so a pick is always followed by its drop. A pick
+    is rated with the travel to it plus the travel to its pending drop. Only
+    the first `window` jobs are looked at, and a job skipped `max_skips` times
+    is dispatched next regardless of its cost, so nothing starves, as soon as
+    it fits the crane load.
+    """
+
+    name = "nearest"
+
+    def __init__(
+        self, travel: TravelModel | None = None, window: int = 20, max_skips: int = 5
+    ) -> None:
+        self.travel = travel if travel is not None else TravelModel()
+        self.window = window
+        self.max_skips = max_skips
+        # how often the oldest job was passed over
+        self.head_id = ""
+        self.head_skips = 0
+
+    def select(self, jobs: Iterable[CCSJob], context: ScheduleContext) -> CCSJob | None:
+        candidates = list(islice(jobs, self.window))
+        if not candidates:
+            return None
+        head = candidates[0]
+        if context.position is None:
+            return head
+        # only read here, peeking at the next job doesn't count as a skip
+        skips = self.head_skips if job_id(head) == self.head_id else 0
+        if skips >= self.max_skips and self._is_eligible(head, context):
+            return head
+        drops = {
+            job.unit.number: job for job in candidates if job.type == CCSJobType.DROP
+        }
+        best: CCSJob | None = None
+        best_cost = 0.0
+        for job in candidates:
+            if not self._is_eligible(job, context):
+                continue
+            cost = self.travel.cost(context.position, job.target)
+            if job.type == CCSJobType.PICK and job.unit.number in drops:
+                cost += self.travel.cost(job.target, drops[job.unit.number].target)
+            if best is None or cost < best_cost:
+                best, best_cost = job, cost
+        if best is None:
+            # nothing fits the crane load, let the crane reject the head as before
+            return head
+        return best
+
+    def dispatched(self, job: CCSJob, head: CCSJob | None) -> None:
+        if head is None or job_id(head) == job_id(job):
+            self.head_id, self.head_skips = "", 0
+            return
+        if job_id(head) != self.head_id:
+            self.head_id, self.head_skips = job_id(head), 0
+        self.head_skips += 1
+
+    @staticmethod
+    def _is_eligible(job: CCSJob, context: ScheduleContext) -> bool:
+        if job.type == CCSJobType.PICK:
+            return context.crane_unit is None
+        if job.type == CCSJobType.DROP:
+            return (
+                context.crane_unit is not None
+                and context.crane_unit.number == job.unit.number
+            )
+        return True
+
+
+class PendingJobs:
+    """the pending jobs, the scheduler ordering them and where the crane heads
+
+    Not thread-safe on its own, TamsJobState guards it with its lock.
+    """
+
+    def __init__(self, scheduler: JobScheduler | None = None) -> None:
+        self.queue = JobQueue()
+        self.scheduler = scheduler if scheduler is not None else JobScheduler()
+        # target of the last dispatched job, where the crane is heading
+        self.position: CCSCoordinates | None = None
+
+    def next(self, crane_unit: CCSUnit | None) -> CCSJob | None:
+        """the job the scheduler wants to dispatch next"""
+        return self.scheduler.select(
+            self.queue.top(), ScheduleContext(self.position, crane_unit)
+        )
+
+    def dispatched(self, job: CCSJob) -> None:
+        head = self.queue.peek()
+        self.queue.remove(job_id(job))
+        self.scheduler.dispatched(job, head)
+        self.position = job.target
+
+
+schedulers: dict[str, type[JobScheduler]] = {
+    JobScheduler.name: JobScheduler,
+    NearestJobScheduler.name: NearestJobScheduler,
+}
@@ -1,116 +1,325 @@
 from json import JSONDecodeError
+from threading import RLock
+from typing import Any, Iterable
 
 from marshmallow import ValidationError
 
+from tams.ccs.codec import from_dict, from_json, to_json
 from tams.ccs.enums import CCSJobStatus, CCSJobType
 from tams.ccs.types import CCSCraneDetails, CCSJob, CCSJobState
+from tams.event.event import EventBus
+from tams.history.history import JobHistory
+from tams.metric.timing import Timings
+from tams.state.observers import JobObservers
+from tams.state.queue import job_id
+from tams.state.scheduler import JobScheduler, PendingJobs
 from tams.storage.storage import TamsStorage
 
 
+class BatchCheck:
+    """the yard as the accepted jobs of one batch will leave it
+
+    Validates the picks and drops of a bulk submission against the storage
+    plus the changes of the jobs accepted before them: the crane load, the
+    free slots per stack and the stack of every moved unit.
+    """
+
+    def __init__(self, storage: TamsStorage) -> None:
+        self.storage = storage
+        self.crane_loaded = storage.crane is not None
+        self.free: dict[str, int] = {}
+        # unit -> stack, None while on the crane
+        self.stacks: dict[str, str | None] = {}
+
+    def _free(self, stack: str) -> int:
+        return self.free.get(stack, self.storage.free_slots(stack) or 0)
+
+    def error(self, job: CCSJob) -> str | None:
+        """why the job can't run after the accepted jobs, None if it can"""
+        if job.type not in (CCSJobType.PICK, CCSJobType.DROP):
+            return None
+        if not self.storage.has_unit(job.unit.number):
+            return f"unknown unit {job.unit.number}"
+        if job.type == CCSJobType.PICK:
+            return None
+        stack = self.storage.stack_at(job.target)
+        if stack is None:
+            return f"no stack at {job.target.x}/{job.target.y}"
+        if self._free(stack.name) <= 0:
+            return f"stack {stack.name} is full"
+        return None
+
+    def accept(self, job: CCSJob) -> None:
+        number = job.unit.number
+        if job.type == CCSJobType.PICK:
+            self.crane_loaded = True
+            if number in self.stacks:
+                stack = self.stacks[number]
+            else:
+                slot = self.storage.unit_slot(number)
+                stack = None if slot is None else slot.stack
+            if stack is not None:
+                self.free[stack] = self._free(stack) + 1
+            self.stacks[number] = None
+        elif job.type == CCSJobType.DROP:
+            self.crane_loaded = False
+            target = self.storage.stack_at(job.target)
+            if target is not None:
+                self.free[target.name] = self._free(target.name) - 1
+                self.stacks[number] = target.name
+
+
 class TamsJobState:
-    __pending_jobs: list[CCSJob] = []
+    __pending_jobs: PendingJobs = PendingJobs()
     __running_job: CCSJob | None = None
     __state: CCSJobState | None = None
     cancel_job: bool = False
     details: CCSCraneDetails = CCSCraneDetails()
 
-    def __init__(self, storage: TamsStorage, verbose: bool = False) -> None:
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        storage: TamsStorage,
+        verbose: bool = False,
+        events: EventBus | None = None,
+        scheduler: JobScheduler | None = None,
+        timings: Timings | None = None,
+        history: JobHistory | None = None,
+        name: str = "PSKran",
+    ) -> None:
         self.verbose = verbose
+        self.observers = JobObservers(name, events, history, timings)
+        # guards every job transition, the web, ccs and worker threads share it
+        self.lock = RLock()
+        # bumped on every change of the pending/running job or the job state
+        self.version = 0
+        self._job_json: tuple[int, str] = (-1, "{}")
         self.storage = storage
-        self.__pending_jobs = []
+        self.__pending_jobs = PendingJobs(scheduler)
         self.__running_job = None
         self.__state = None
 
-    def clear_pending_jobs(self):
-        self.__pending_jobs = []
+    def request_cancel(self) -> None:
+        self.cancel_job = True
+        self.observers.notify()
 
-    def clear_running_job(self):
-        self.__running_job = None
+    def clear_pending_jobs(self) -> None:
+        with self.lock:
+            for job in self.__pending_jobs.queue:
+                self.observers.record("clear_pending", job)
+            self.__pending_jobs.queue.clear()
+            self.version += 1
+
+    def clear_running_job(self) -> None:
+        with self.lock:
+            if self.__running_job is not None:
+                self.observers.record("clear_running", self.__running_job)
+            self.__running_job = None
+            self._publish_job()
+        self.observers.notify()
 
     def get_pending_jobs(self) -> list[CCSJob]:
-        return self.__pending_jobs
+        with self.lock:
+            return list(self.__pending_jobs.queue)
+
+    def get_pending_job(self, id_: str) -> CCSJob | None:
+        with self.lock:
+            return self.__pending_jobs.queue.get(id_)
+
+    def cancel_pending_job(self, id_: str) -> bool:
+        with self.lock:
+            job = self.__pending_jobs.queue.remove(id_)
+            if job is None:
+                return False
+            self.observers.record("cancel_pending", job)
+            self.version += 1
+            return True
+
+    def set_pending_job_priority(self, id_: str, priority: int) -> bool:
+        with self.lock:
+            if not self.__pending_jobs.queue.set_priority(id_, priority):
+                return False
+            self.version += 1
+        self.observers.notify()
+        return True
 
     def has_pending_jobs(self) -> bool:
-        return len(self.__pending_jobs) > 0
+        return len(self.__pending_jobs.queue) > 0
 
     def has_job(self) -> bool:
         return self.__running_job is not None
 
-    def ack_new_job(self) -> None:
-        self.__running_job = self.__pending_jobs.pop(0)
+    def peek_new_job(self) -> CCSJob | None:
+        """the job the scheduler wants to dispatch next"""
+        with self.lock:
+            return self.__pending_jobs.next(self.storage.crane)
+
+    def ack_new_job(self, job: CCSJob | None = None) -> None:
+        """makes the given (default: next) pending job the running job
+
+        The crane acked the job, so it becomes the running job even if it was
+        cleared or cancelled from the pending jobs meanwhile.
+        """
+        with self.lock:
+            if job is None:
+                job = self.peek_new_job()
+                if job is None:
+                    raise IndexError("no pending job to ack")
+            self.__pending_jobs.dispatched(job)
+            self.observers.stage(job, "ack")
+            self.observers.record("dispatch", job)
+            self.__running_job = job
+            self._publish_job()
+
+    def _publish_job(self) -> None:
+        self.version += 1
+        self.observers.publish("job", self.get_job_as_json())
 
     def get_job_as_json(self) -> str:
-        if self.has_job():
-            return str(self.__running_job.to_json())  # type: ignore[union-attr]
-        return "{}"
+        with self.lock:
+            version, job_json = self._job_json
+            if version == self.version:
+                return job_json
+            version = self.version
+            job_json = "{}"
+            if self.__running_job is not None:
+                job_json = to_json(self.__running_job)
+            self._job_json = (version, job_json)
+            return job_json
 
     def get_new_job_as_json(self) -> str:
-        if self.has_pending_jobs():
-            return str(self.__pending_jobs[0].to_json())  # type: ignore[union-attr]
+        job = self.peek_new_job()
+        if job is not None:
+            return to_json(job)
         return "{}"
 
     def get_pending_jobs_as_json(self) -> str:
-        if self.has_pending_jobs():
-            json = "["
-            for job in self.__pending_jobs:
-                json += job.to_json()
-                json += ","
-            json += "]"
-            return json  # type: ignore[union-attr]
+        jobs = self.get_pending_jobs()
+        if jobs:
+            return "[" + ",".join(to_json(job) for job in jobs) + "]"
         return "{}"
 
     def get_state_as_json(self) -> str:
         if self.__state is not None:
-            return str(self.__state.to_json())  # type: ignore[attr-defined]
+            return to_json(self.__state)
         return "{}"
 
-    def set_new_job(self, job_json: str) -> str:
+    def _push_job(self, job: CCSJob, priority: int, crane_loaded: bool) -> str:
+        if crane_loaded and job.type == CCSJobType.PICK:
+            return "invalid"
+        if not crane_loaded and job.type == CCSJobType.DROP:
+            return "invalid"
+        if not self.__pending_jobs.queue.push(job, priority):
+            return "has job"
+        self.version += 1
+        self.observers.stage(job, "enqueue")
+        return "OK"
+
+    def set_new_job(self, job_json: str | bytes, priority: int = 0) -> str:
         try:
-            # pylint: disable=no-member
-            job: CCSJob = CCSJob.from_json(job_json)  # type: ignore[attr-defined]
-            if self.storage.crane is not None and job.type == CCSJobType.PICK:
-                return "invalid"
-            if self.storage.crane is None and job.type == CCSJobType.DROP:
-                return "invalid"
-            self.__pending_jobs.append(job)
-            if self.verbose:
-                print(f"[STATE][set_new_job] {job}")
-            else:
-                print(
-                    f"[STATE][set_new_job] type={job.type}, x/y/z={job.target.x}/{job.target.y}/{job.target.z}, unit.number={job.unit.number}, "
-                )
+            job = from_json(CCSJob, job_json)
         except ValidationError:
             return "invalid"
         except JSONDecodeError as error:
             print(error)
             return "invalid"
+        with self.lock:
+            ret = self._push_job(job, priority, self.storage.crane is not None)
+            if ret == "OK":
+                self.observers.record("enqueue", job)
+        if ret != "OK":
+            return ret
+        if self.verbose:
+            print(f"[STATE][set_new_job] {job}")
+        else:
+            print(
+                f"[STATE][set_new_job] type={job.type}, x/y/z={job.target.x}/{job.target.y}/{job.target.z}, unit.number={job.unit.number}, "
+            )
+        self.observers.notify()
         return "OK"
 
-    def set_new_state(self, state_json: str) -> str:
+    def set_new_jobs(
+        self, entries: Iterable[Any], priority: int = 0
+    ) -> list[dict[str, Any]]:
+        """validates and enqueues parsed json jobs under one lock
+
+        The pick/drop rules of set_new_job apply in order: an accepted pick
+        loads the crane for the jobs after it, an accepted drop unloads it.
+        Picks and drops are checked against the storage as the accepted jobs
+        leave it (see BatchCheck): the unit must exist and a drop needs a
+        stack with a free slot at its target. Returns one result per entry
+        ("OK", "invalid" or "has job"), a rejected entry has an "error".
+        The accepted jobs go to the history in one transaction.
+        """
+        results: list[dict[str, Any]] = []
+        accepted: list[CCSJob] = []
+        with self.lock:
+            # same lock order as set_new_state (state -> storage)
+            with self.storage.lock:
+                check = BatchCheck(self.storage)
+                for entry in entries:
+                    try:
+                        job = from_dict(CCSJob, entry)
+                    except ValidationError as error:
+                        results.append({"result": "invalid", "error": error.messages})
+                        continue
+                    reason = check.error(job)
+                    if reason is not None:
+                        results.append(
+                            {"id": job_id(job), "result": "invalid", "error": reason}
+                        )
+                        continue
+                    ret = self._push_job(job, priority, check.crane_loaded)
+                    if ret == "OK":
+                        accepted.append(job)
+                        check.accept(job)
+                    results.append({"id": job_id(job), "result": ret})
+            # under the state lock, so a dispatch can't be logged before its enqueue
+            self.observers.record_many("enqueue", accepted)
+        print(f"[STATE][set_new_jobs] accepted {len(accepted)} of {len(results)} jobs")
+        if accepted:
+            self.observers.notify()
+        return results
+
+    def set_new_state(self, state_json: str | bytes) -> str:
         try:
-            # pylint: disable=no-member
-            self.__state = CCSJobState.from_json(state_json)  # type: ignore[attr-defined]
+            new_state = from_json(CCSJobState, state_json)
         except ValidationError:
             return "invalid"
-        if (
-            self.__state
-            and self.__state.jobStatus == CCSJobStatus.DONE
-            and self.has_job()
-        ):
-            if self.__running_job:
-                if self.storage.container_moved(self.__running_job):
-                    self.__running_job = None
-                    return "DONE"
+        with self.lock:
+            self.__state = new_state
+            self.version += 1
+            self.observers.record("state", self.__running_job, new_state)
+            self.observers.publish("state", self.get_state_as_json())
+            if not (
+                self.__state
+                and self.__state.jobStatus == CCSJobStatus.DONE
+                and self.has_job()
+            ):
+                return "OK"
+            if self.__running_job is None:
+                return "self.__running_job is None"
+            if not self.storage.container_moved(self.__running_job):
                 return "error in storage"
-            return "self.__running_job is None"
-        return "OK"
+            self.observers.stage(self.__running_job, "done")
+            self.observers.record("done", self.__running_job)
+            self.__running_job = None
+            self._publish_job()
+        self.observers.notify()
+        return "DONE"
 
     def set_job_done(self) -> None:
-        if self.__state:
-            self.__state.jobStatus = CCSJobStatus.DONE
+        with self.lock:
+            if self.__state:
+                self.__state.jobStatus = CCSJobStatus.DONE
+                self.version += 1
 
     def set_job_none(self) -> None:
-        self.__running_job = None
+        with self.lock:
+            if self.__running_job is not None:
+                self.observers.record("cancel", self.__running_job)
+            self.__running_job = None
+            self._publish_job()
+        self.observers.notify()
 
     def __repr__(self) -> str:
         return str(self.__running_job)
@@ -0,0 +1,146 @@
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import IO, TYPE_CHECKING, Any
+
+from tams.ccs.types import CCSCoordinates
+
+if TYPE_CHECKING:
+    from tams.storage.storage import TamsStorage
+
+
+class StorageJournal:
+    """append-only log of storage mutations on top of a json snapshot
+
+    Every mutation of the yard is appended as one json line. The lines are
+    flushed to the os right away and fsynced in batches by `sync`, so the
+    durability cost depends on the change rate and not on the yard size.
+    `compact` writes a new snapshot and truncates the journal. Entries are
+    numbered and the snapshot stores the number of the last entry it
+    contains, a replay skips those, so a crash between snapshot and
+    truncation doesn't apply them twice. Entries without a number (journals
+    of older versions) are always replayed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        snapshot_path: Path,
+        sync_every: int = 100,
+        compact_after: int = 10000,
+    ) -> None:
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.sync_every = sync_every
+        self.compact_after = compact_after
+        self.lock = Lock()
+        self.entries = 0
+        self.unsynced = 0
+        # number of the last entry, continues over compactions
+        self.seq = 0
+        self.file: IO[str] | None = None
+
+    def restore(self, storage: "TamsStorage") -> None:
+        if self.snapshot_path.is_file():
+            self.seq = storage.import_json(self.snapshot_path)
+        self.entries = self._replay(storage)
+        self.file = self.path.open("a", encoding="utf-8")
+        if self._ends_with_torn_entry():
+            self.file.write("\n")
+        storage.journal = self
+        print(f"[JOURNAL][restore]: replayed {self.entries} entries from {self.path}")
+
+    def _replay(self, storage: "TamsStorage") -> int:
+        if not self.path.is_file():
+            return 0
+        entries = 0
+        with self.path.open(encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # torn write of the last entry before a crash
+                    print(f"[JOURNAL][_replay]: skip invalid entry {line=}")
+                    continue
+                seq = entry.get("seq")
+                if seq is not None and seq <= self.seq:
+                    # already in the snapshot, compact crashed before truncating
+                    continue
+                self._apply(storage, entry)
+                self.seq = self.seq if seq is None else seq
+                entries += 1
+        return entries
+
+    def _ends_with_torn_entry(self) -> bool:
+        with self.path.open("rb") as file:
+            if file.seek(0, os.SEEK_END) == 0:
+                return False
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) != b"\n"
+
+    @staticmethod
+    def _apply(storage: "TamsStorage", entry: dict[str, Any]) -> None:
+        # pylint: disable=protected-access
+        if entry["op"] == "add_to_stack":
+            storage._add_container_to_stack(entry["unit"], entry["stack"])
+        elif entry["op"] == "add_to_crane":
+            storage._add_container_to_crane(entry["unit"])
+        elif entry["op"] == "set_stack_pos":
+            storage.set_stack_pos(
+                entry["stack"], CCSCoordinates(**entry["coordinates"])
+            )
+        else:
+            print(f"[JOURNAL][_apply]: unknown entry {entry=}")
+
+    def record(self, operation: str, **payload: Any) -> None:
+        if self.file is None:
+            return
+        payload["op"] = operation
+        payload["time"] = time.time()
+        with self.lock:
+            self.seq += 1
+            payload["seq"] = self.seq
+            self.file.write(json.dumps(payload) + "\n")
+            self.file.flush()
+            self.entries += 1
+            self.unsynced += 1
+            if self.unsynced >= self.sync_every:
+                self._sync()
+
+    def sync(self) -> None:
+        with self.lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self.file is not None and self.unsynced > 0:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_after
+
+    def compact(self, storage: "TamsStorage") -> None:
+        # same lock order as a mutation (storage -> journal), no entry slips
+        # in between the snapshot and the truncation
+        with storage.lock, self.lock:
+            tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+            storage.export_json(tmp_path, self.seq)
+            with tmp_path.open("rb") as tmp_file:
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            if self.file is not None:
+                self.file.truncate(0)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            self.entries = 0
+            self.unsynced = 0
+        print(f"[JOURNAL][compact]: wrote snapshot {self.snapshot_path}")
+
+    def close(self) -> None:
+        with self.lock:
+            self._sync()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
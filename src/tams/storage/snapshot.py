@@ -0,0 +1,231 @@
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from threading import Event, Thread
+from typing import IO, NamedTuple
+
+from tams.storage.storage import TamsStorage
+
+MAGIC = b"TAMS"
+LAYOUT = 1
+# magic, layout, generation, slot capacity, active slot, retired
+HEADER = struct.Struct("<4sIQQQQ")
+# seq (odd while written), storage version, stacks length, container length
+SLOT = struct.Struct("<QQQQ")
+ACTIVE_OFFSET = 24
+RETIRED_OFFSET = 32
+
+
+class Snapshot(NamedTuple):
+    version: int
+    # same json as TamsStorage.get_stacks_as_json / get_container_as_json
+    stacks: bytes
+    container: bytes
+
+
+def _slot_offset(capacity: int, slot: int) -> int:
+    return HEADER.size + slot * (SLOT.size + capacity)
+
+
+class SnapshotWriter:
+    """publishes yard snapshots into a memory mapped file for other processes
+
+    The file holds two slots. A snapshot is written into the inactive slot,
+    which is then made the active one, so readers never wait for the writer.
+    Every slot has a sequence number that is odd while the slot is written,
+    a reader retries if it changed during its copy (seqlock). A snapshot
+    larger than a slot goes into a new, bigger file that replaces the old
+    one, which is marked retired so readers map the new file.
+    """
+
+    def __init__(
+        self, path: Path, capacity: int = 1 << 20, generation: int | None = None
+    ) -> None:
+        self.path = path
+        # part of the etags, tams passes the etag prefix of its web app
+        self.generation = time.time_ns() if generation is None else generation
+        self.capacity = capacity
+        self.version = -1
+        # created with the first snapshot
+        self.file: IO[bytes] | None = None
+        self.map: mmap.mmap | None = None
+
+    def publish(self, version: int, stacks: bytes, container: bytes) -> None:
+        size = len(stacks) + len(container)
+        if self.map is None or size > self.capacity:
+            self._create(max(self.capacity, 2 * size), version, stacks, container)
+            return
+        slot = 1 - HEADER.unpack_from(self.map, 0)[4]
+        self._write_slot(self.map, self.capacity, slot, version, stacks, container)
+        struct.pack_into("<Q", self.map, ACTIVE_OFFSET, slot)
+        self.version = version
+
+    def _write_slot(  # pylint: disable=too-many-arguments
+        self,
+        snapshot_map: mmap.mmap,
+        capacity: int,
+        slot: int,
+        version: int,
+        stacks: bytes,
+        container: bytes,
+    ) -> None:
+        offset = _slot_offset(capacity, slot)
+        seq = SLOT.unpack_from(snapshot_map, offset)[0]
+        SLOT.pack_into(snapshot_map, offset, seq + 1, 0, 0, 0)
+        start = offset + SLOT.size
+        snapshot_map[start : start + len(stacks)] = stacks
+        start += len(stacks)
+        snapshot_map[start : start + len(container)] = container
+        SLOT.pack_into(
+            snapshot_map, offset, seq + 2, version, len(stacks), len(container)
+        )
+
+    def _create(
+        self, capacity: int, version: int, stacks: bytes, container: bytes
+    ) -> None:
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        size = _slot_offset(capacity, 2)
+        file = temp_path.open("w+b")
+        file.truncate(size)
+        new_map = mmap.mmap(file.fileno(), size)
+        HEADER.pack_into(new_map, 0, MAGIC, LAYOUT, self.generation, capacity, 0, 0)
+        self._write_slot(new_map, capacity, 0, version, stacks, container)
+        old_map = self.map if self.map is not None else _map_existing(self.path)
+        os.replace(temp_path, self.path)
+        if old_map is not None:
+            # readers of the old file switch over with their next read
+            struct.pack_into("<Q", old_map, RETIRED_OFFSET, 1)
+            if old_map is not self.map:
+                old_map.close()
+        self.close()
+        self.file, self.map, self.capacity = file, new_map, capacity
+        self.version = version
+        print(f"[SNAPSHOT][_create]: {self.path} with {capacity} bytes per slot")
+
+    def publish_storage(self, storage: TamsStorage) -> bool:
+        """publishes the yard if it changed since the last call"""
+        with storage.lock:
+            if storage.version == self.version:
+                return False
+            version = storage.version
+            stacks = storage.get_stacks_as_json()
+            container = storage.get_container_as_json()
+        self.publish(version, stacks.encode(), container.encode())
+        return True
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _map_existing(path: Path) -> mmap.mmap | None:
+    """snapshot file left by an earlier writer"""
+    try:
+        with path.open("r+b") as file:
+            old_map = mmap.mmap(file.fileno(), 0)
+    except (FileNotFoundError, ValueError):
+        # no file or an empty one
+        return None
+    if len(old_map) < HEADER.size or old_map[:4] != MAGIC:
+        old_map.close()
+        return None
+    return old_map
+
+
+class SnapshotReader:
+    """reads the latest snapshot of a SnapshotWriter, in any process
+
+    Never takes a lock, a read copies the active slot once and returns the
+    copy again until the writer publishes a new version.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.map: mmap.mmap | None = None
+        self.generation = 0
+        self.capacity = 0
+        # (slot, seq) of the cached snapshot
+        self._cached: tuple[tuple[int, int], Snapshot] | None = None
+
+    def _open(self) -> mmap.mmap:
+        if self.map is not None and not self.map[RETIRED_OFFSET]:
+            return self.map
+        self.close()
+        with self.path.open("rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, layout, self.generation, self.capacity, _, _ = HEADER.unpack_from(
+            self.map, 0
+        )
+        if magic != MAGIC or layout != LAYOUT:
+            self.close()
+            raise ValueError(f"not a tams snapshot {self.path}")
+        self._cached = None
+        return self.map
+
+    def read(self) -> Snapshot:
+        """latest snapshot, raises FileNotFoundError if there is none yet"""
+        while True:
+            for _ in range(100):
+                snapshot = self._try_read(self._open())
+                if snapshot is not None:
+                    return snapshot
+            # the writer is slower than us, let it finish
+            time.sleep(0.001)
+
+    def _try_read(self, snapshot_map: mmap.mmap) -> Snapshot | None:
+        slot = struct.unpack_from("<Q", snapshot_map, ACTIVE_OFFSET)[0]
+        offset = _slot_offset(self.capacity, slot)
+        seq, version, stacks_len, container_len = SLOT.unpack_from(snapshot_map, offset)
+        if seq % 2 or seq == 0:
+            # being written, or a slot of a new file not written yet
+            return None
+        if self._cached is not None and self._cached[0] == (slot, seq):
+            return self._cached[1]
+        start = offset + SLOT.size
+        snapshot = Snapshot(
+            version,
+            snapshot_map[start : start + stacks_len],
+            snapshot_map[start + stacks_len : start + stacks_len + container_len],
+        )
+        if SLOT.unpack_from(snapshot_map, offset)[0] != seq:
+            return None
+        self._cached = ((slot, seq), snapshot)
+        return snapshot
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+class SnapshotPublisher:
+    """publishes the storage every `interval` seconds if it changed"""
+
+    def __init__(
+        self, storage: TamsStorage, writer: SnapshotWriter, interval: float = 0.05
+    ) -> None:
+        self.storage = storage
+        self.writer = writer
+        self.interval = interval
+        self.stop = Event()
+        self.thread = Thread(target=self.run, name="Snapshot", daemon=True)
+
+    def start(self) -> None:
+        self.writer.publish_storage(self.storage)
+        self.thread.start()
+
+    def run(self) -> None:
+        while not self.stop.wait(self.interval):
+            self.writer.publish_storage(self.storage)
+
+    def close(self) -> None:
+        self.stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        self.writer.close()
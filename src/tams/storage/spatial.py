@@ -0,0 +1,82 @@
+from itertools import count
+from typing import Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class GridIndex(Generic[T]):
+    """uniform grid over x/y (mm) for nearest neighbour queries within a radius
+
+    Items are bucketed into square cells of `cell_size`. A query only visits
+    the cells overlapping its radius, with radius <= cell_size that are at
+    most 3x3 cells, so a lookup costs the items near the point instead of all
+    items. On equal distance the item inserted first wins.
+    """
+
+    def __init__(self, cell_size: int = 500) -> None:
+        self.cell_size = max(1, cell_size)
+        # cell -> key -> (x, y, insertion order, item)
+        self._cells: dict[tuple[int, int], dict[str, tuple[int, int, int, T]]] = {}
+        self._keys: dict[str, tuple[int, int]] = {}
+        self._order = count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _cell(self, pos_x: int, pos_y: int) -> tuple[int, int]:
+        return pos_x // self.cell_size, pos_y // self.cell_size
+
+    def insert(self, key: str, pos_x: int, pos_y: int, item: T) -> None:
+        """adds the item or moves it to pos_x/pos_y, keeping its insertion order"""
+        order = None
+        if key in self._keys:
+            order = self._cells[self._keys[key]][key][2]
+            self.remove(key)
+        cell = self._cell(pos_x, pos_y)
+        self._cells.setdefault(cell, {})[key] = (
+            pos_x,
+            pos_y,
+            next(self._order) if order is None else order,
+            item,
+        )
+        self._keys[key] = cell
+
+    def remove(self, key: str) -> None:
+        cell = self._keys.pop(key, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._keys = {}
+
+    def _cells_around(
+        self, pos_x: int, pos_y: int, radius: int
+    ) -> Iterator[dict[str, tuple[int, int, int, T]]]:
+        """the non-empty cells overlapping the square around pos_x/pos_y"""
+        min_x, min_y = self._cell(pos_x - radius, pos_y - radius)
+        max_x, max_y = self._cell(pos_x + radius, pos_y + radius)
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = self._cells.get((cell_x, cell_y))
+                if bucket is not None:
+                    yield bucket
+
+    def nearest(self, pos_x: int, pos_y: int, radius: int) -> T | None:
+        """closest item within `radius` (euclidean), None if there is none"""
+        # (distance, insertion order) of the closest item so far
+        best_rank: tuple[int, int] | None = None
+        best: T | None = None
+        limit = radius * radius
+        for bucket in self._cells_around(pos_x, pos_y, radius):
+            for item_x, item_y, order, item in bucket.values():
+                distance = (item_x - pos_x) ** 2 + (item_y - pos_y) ** 2
+                if distance <= limit and (
+                    best_rank is None or (distance, order) < best_rank
+                ):
+                    best_rank, best = (distance, order), item
+        return best
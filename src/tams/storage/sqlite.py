@@ -0,0 +1,293 @@
+import sqlite3
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any
+
+from tams.ccs.types import CCSCoordinates, CCSUnit
+from tams.storage.storage import ContainerStack
+
+if TYPE_CHECKING:
+    from tams.storage.storage import TamsStorage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stacks (
+    name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    z INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stacks_position ON stacks (x, y);
+CREATE TABLE IF NOT EXISTS units (
+    number TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    unit_id TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    weight INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    piggy_back INTEGER NOT NULL,
+    -- slot of the unit, both NULL if it is on the crane or nowhere
+    stack TEXT REFERENCES stacks (name),
+    tier INTEGER,
+    on_crane INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS units_slot ON units (stack, tier);
+"""
+
+
+def connect_readonly(path: Path) -> sqlite3.Connection:
+    """connection for another process reading the yard of a running tams"""
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def unit_location(conn: sqlite3.Connection, number: str) -> tuple[str, int] | None:
+    """(stack, tier) of the unit, ("crane", 0) if on the crane"""
+    row = conn.execute(
+        "SELECT stack, tier, on_crane FROM units WHERE number = ?", (number,)
+    ).fetchone()
+    if row is None:
+        return None
+    if row[2]:
+        return "crane", 0
+    if row[0] is None:
+        return None
+    return row[0], row[1]
+
+
+def free_slots_near(
+    conn: sqlite3.Connection, pos_x: int, pos_y: int, radius: int, limit: int = 10
+) -> list[tuple[str, int]]:
+    """(stack, free slots) of the stacks within radius, closest first"""
+    rows = conn.execute(
+        """
+        SELECT stacks.name, stacks.height - COUNT(units.number) AS free
+        FROM stacks LEFT JOIN units ON units.stack = stacks.name
+        WHERE stacks.x BETWEEN ? AND ? AND stacks.y BETWEEN ? AND ?
+            AND (stacks.x - ?) * (stacks.x - ?) + (stacks.y - ?) * (stacks.y - ?)
+                <= ? * ?
+        GROUP BY stacks.name
+        HAVING free > 0
+        ORDER BY (stacks.x - ?) * (stacks.x - ?) + (stacks.y - ?) * (stacks.y - ?),
+            stacks.seq
+        LIMIT ?
+        """,
+        (
+            pos_x - radius,
+            pos_x + radius,
+            pos_y - radius,
+            pos_y + radius,
+            *(pos_x, pos_x, pos_y, pos_y, radius, radius),
+            *(pos_x, pos_x, pos_y, pos_y),
+            limit,
+        ),
+    )
+    return list(rows)
+
+
+class SqliteStore:
+    """keeps the yard in a local sqlite database instead of export.json
+
+    Drop-in for StorageJournal: every storage mutation is applied to the
+    units/stacks tables in its own transaction, so there is no snapshot to
+    write and nothing to compact. The database runs in WAL mode, other
+    processes can read it while tams writes (see connect_readonly) and look
+    up units and free slots through the indexes (unit_location,
+    free_slots_near).
+
+    tams itself still serves the yard from memory, `restore` builds the
+    storage from the tables once. The stacks and container views, the yard
+    page and the position matching walk the whole yard on every request, so
+    reading it lazily would cost a query per request instead of one load.
+    The load reads typed rows, no json is parsed, and runs after the web
+    apps already answer /health (see tams.main).
+    """
+
+    def __init__(self, path: Path, snapshot_path: Path | None = None) -> None:
+        self.path = path
+        # export.json a new database is seeded from
+        self.snapshot_path = snapshot_path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # commits are durable at the next checkpoint, like the journal batches
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def restore(
+        self, storage: "TamsStorage", snapshot_path: Path | None = None
+    ) -> None:
+        """loads the yard, a new database is seeded from the snapshot or storage"""
+        snapshot_path = (
+            snapshot_path if snapshot_path is not None else self.snapshot_path
+        )
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM stacks LIMIT 1").fetchone()
+        if row is None:
+            if snapshot_path is not None and snapshot_path.is_file():
+                storage.import_json(snapshot_path)
+            with storage.lock:
+                self._insert_yard(storage)
+            print(f"[SQLITE][restore]: created {self.path}")
+        else:
+            storage.set_yard(*self._load_yard())
+            print(f"[SQLITE][restore]: loaded {self.path}")
+        storage.journal = self
+
+    def _insert_yard(self, storage: "TamsStorage") -> None:
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO stacks VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        stack.name,
+                        seq,
+                        stack.coordinates.x,
+                        stack.coordinates.y,
+                        stack.coordinates.z,
+                        stack.height,
+                    )
+                    for seq, stack in enumerate(storage.stacks)
+                ],
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO units VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, 0)",
+                [
+                    (
+                        unit.number,
+                        seq,
+                        unit.unitId,
+                        unit.height,
+                        unit.width,
+                        unit.length,
+                        unit.weight,
+                        unit.type,
+                        unit.piggyBack,
+                    )
+                    for seq, unit in enumerate(storage.container)
+                ],
+            )
+            for stack in storage.stacks:
+                self.conn.executemany(
+                    "UPDATE units SET stack = ?, tier = ? WHERE number = ?",
+                    [
+                        (stack.name, tier, unit.number)
+                        for tier, unit in enumerate(stack.container)
+                    ],
+                )
+            if storage.crane is not None:
+                self.conn.execute(
+                    "UPDATE units SET on_crane = 1 WHERE number = ?",
+                    (storage.crane.number,),
+                )
+
+    def _load_yard(
+        self,
+    ) -> tuple[list[ContainerStack], list[CCSUnit], CCSUnit | None]:
+        with self.lock:
+            stacks = {
+                name: ContainerStack(name, CCSCoordinates(x, y, z), [], height)
+                for name, x, y, z, height in self.conn.execute(
+                    "SELECT name, x, y, z, height FROM stacks ORDER BY seq"
+                )
+            }
+            units: dict[str, CCSUnit] = {}
+            crane = None
+            for row in self.conn.execute(
+                "SELECT number, unit_id, height, width, length, weight, type,"
+                " piggy_back, on_crane FROM units ORDER BY seq"
+            ):
+                unit = CCSUnit(
+                    unitId=row[1],
+                    height=row[2],
+                    width=row[3],
+                    length=row[4],
+                    weight=row[5],
+                    type=row[6],
+                    number=row[0],
+                    piggyBack=bool(row[7]),
+                )
+                units[unit.number] = unit
+                if row[8]:
+                    crane = unit
+            for number, stack in self.conn.execute(
+                "SELECT number, stack FROM units WHERE stack IS NOT NULL"
+                " ORDER BY stack, tier"
+            ):
+                stacks[stack].container.append(units[number])
+        return list(stacks.values()), list(units.values()), crane
+
+    def _remove_from_stack(self, number: str) -> None:
+        row = self.conn.execute(
+            "SELECT stack, tier FROM units WHERE number = ?", (number,)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return
+        self.conn.execute(
+            "UPDATE units SET stack = NULL, tier = NULL WHERE number = ?", (number,)
+        )
+        self.conn.execute(
+            "UPDATE units SET tier = tier - 1 WHERE stack = ? AND tier > ?", row
+        )
+
+    def record(self, operation: str, **payload: Any) -> None:
+        with self.lock, self.conn:
+            if operation == "add_to_crane":
+                self._remove_from_stack(payload["unit"])
+                self.conn.execute(
+                    "UPDATE units SET on_crane = 1 WHERE number = ?",
+                    (payload["unit"],),
+                )
+            elif operation == "add_to_stack":
+                self._remove_from_stack(payload["unit"])
+                self.conn.execute("UPDATE units SET on_crane = 0 WHERE on_crane = 1")
+                self.conn.execute(
+                    "UPDATE units SET stack = ?, tier ="
+                    " (SELECT COUNT(*) FROM units WHERE stack = ?) WHERE number = ?",
+                    (payload["stack"], payload["stack"], payload["unit"]),
+                )
+            elif operation == "set_stack_pos":
+                coordinates = payload["coordinates"]
+                self.conn.execute(
+                    "UPDATE stacks SET x = ?, y = ?, z = ? WHERE name = ?",
+                    (
+                        coordinates["x"],
+                        coordinates["y"],
+                        coordinates["z"],
+                        payload["stack"],
+                    ),
+                )
+            else:
+                print(f"[SQLITE][record]: unknown operation {operation=}")
+
+    def unit_location(self, number: str) -> tuple[str, int] | None:
+        with self.lock:
+            return unit_location(self.conn, number)
+
+    def free_slots_near(
+        self, pos_x: int, pos_y: int, radius: int, limit: int = 10
+    ) -> list[tuple[str, int]]:
+        with self.lock:
+            return free_slots_near(self.conn, pos_x, pos_y, radius, limit)
+
+    def sync(self) -> None:
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    # same interface as StorageJournal.compact, the tables are always current
+    def compact(  # pylint: disable=unused-argument
+        self, storage: "TamsStorage"
+    ) -> None:
+        # nothing to compact, only fold the write ahead log into the database
+        with self.lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
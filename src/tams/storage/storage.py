@@ -1,16 +1,26 @@
 import json
-from dataclasses import asdict, dataclass, field
+import sys
+from copy import deepcopy
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, List, Optional
+from threading import RLock
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional
 
 from dataclasses_json import dataclass_json
 
+from tams.ccs.codec import from_dict, to_dict
 from tams.ccs.enums import CCSJobType
 from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.event.event import EventBus
+from tams.storage.spatial import GridIndex
+
+if TYPE_CHECKING:
+    from tams.storage.journal import StorageJournal
+    from tams.storage.sqlite import SqliteStore
 
 
 @dataclass_json
-@dataclass
+@dataclass(slots=True)
 class ContainerStack:
     name: str
     coordinates: CCSCoordinates = field(default_factory=CCSCoordinates)
@@ -18,6 +28,116 @@ class ContainerStack:
     height: int = 3
 
 
+class Slot(NamedTuple):
+    stack: str
+    # 0 is the ground
+    tier: int
+
+
+def stack_block(name: str) -> str:
+    """block (row) of a stack, its name without the trailing number: A12 -> A"""
+    return name.rstrip("0123456789") or name
+
+
+class YardIndex:
+    """lookups and slot aggregates of the yard
+
+    Rebuilt with the whole yard and kept current per changed stack by
+    TamsStorage, so a query costs a dict lookup instead of a scan.
+    """
+
+    def __init__(self, tolerance: int) -> None:
+        self.units: dict[str, CCSUnit] = {}
+        # unit number -> stack holding the unit, None if the unit is on the crane
+        self.unit_locations: dict[str, ContainerStack | None] = {}
+        self.stacks_by_name: dict[str, ContainerStack] = {}
+        self.stacks_by_position: GridIndex[ContainerStack] = GridIndex(tolerance)
+        # slot aggregates, updated with every changed stack (see update_slots)
+        self.unit_tiers: dict[str, int] = {}
+        self.free_by_stack: dict[str, int] = {}
+        self.free_by_block: dict[str, int] = {}
+        self.free_total = 0
+        self.stack_tops: dict[str, str] = {}
+        # units on top of a stack, they can be picked without a rehandle
+        self.top_units: set[str] = set()
+
+    def rebuild(
+        self,
+        stacks: List[ContainerStack],
+        container: List[CCSUnit],
+        crane: Optional[CCSUnit],
+    ) -> Optional[CCSUnit]:
+        """indexes the yard, returns the crane unit shared with the container"""
+        self.units = {}
+        self.unit_locations = {}
+        self.stacks_by_name = {}
+        self.stacks_by_position.clear()
+        sizes: dict[int, int] = {}
+        for unit in container:
+            # a handful of types and sizes, one object each instead of one per unit
+            unit.type = sys.intern(unit.type)
+            unit.height = sizes.setdefault(unit.height, unit.height)
+            unit.width = sizes.setdefault(unit.width, unit.width)
+            unit.length = sizes.setdefault(unit.length, unit.length)
+            unit.weight = sizes.setdefault(unit.weight, unit.weight)
+            self.units.setdefault(unit.number, unit)
+        if crane is not None:
+            crane = self.units.get(crane.number, crane)
+        for stack in stacks:
+            # a restored yard has a copy of every unit in its stack, share one
+            stack.container = [
+                self.units.get(unit.number, unit) for unit in stack.container
+            ]
+            if stack.name not in self.stacks_by_name:
+                self.stacks_by_name[stack.name] = stack
+                self.stacks_by_position.insert(
+                    stack.name, stack.coordinates.x, stack.coordinates.y, stack
+                )
+            for unit in stack.container:
+                self.unit_locations.setdefault(unit.number, stack)
+        if crane is not None:
+            self.unit_locations[crane.number] = None
+        self.unit_tiers = {}
+        self.free_by_stack = {}
+        self.free_by_block = {}
+        self.free_total = 0
+        self.stack_tops = {}
+        self.top_units = set()
+        for stack in self.stacks_by_name.values():
+            self.update_slots(stack)
+        return crane
+
+    def update_slots(self, stack: ContainerStack) -> None:
+        """updates the slot aggregates of a changed stack, costs its height"""
+        for tier, unit in enumerate(stack.container):
+            self.unit_tiers[unit.number] = tier
+        free = max(0, stack.height - len(stack.container))
+        delta = free - self.free_by_stack.get(stack.name, 0)
+        self.free_by_stack[stack.name] = free
+        block = stack_block(stack.name)
+        self.free_by_block[block] = self.free_by_block.get(block, 0) + delta
+        self.free_total += delta
+        top = stack.container[-1].number if stack.container else None
+        old_top = self.stack_tops.pop(stack.name, None)
+        if old_top is not None and old_top != top:
+            self.top_units.discard(old_top)
+        if top is not None:
+            self.stack_tops[stack.name] = top
+            self.top_units.add(top)
+
+
+class ViewVersions:
+    """storage versions of the last change of each part of the yard views"""
+
+    def __init__(self) -> None:
+        self.stacks: dict[str, int] = {}
+        self.crane = 0
+        # stack positions, a change moves stacks in the yard view
+        self.layout = 0
+        # serialized views by name, valid for the storage version they were built at
+        self.json: dict[str, tuple[int, str]] = {}
+
+
 class TamsStorage:
 
     stacks = [
@@ -37,119 +157,315 @@ class TamsStorage:
 
     crane: Optional[CCSUnit] = None
 
-    def __init__(self) -> None:
+    def __init__(self, events: EventBus | None = None, tolerance: int = 500) -> None:
+        self.events = events
+        # max x/y deviation in mm of a crane target from the stack position
+        self.tolerance = tolerance
+        # records every mutation, see StorageJournal and SqliteStore
+        self.journal: "StorageJournal | SqliteStore | None" = None
+        # the production server handles requests on several threads
+        self.lock = RLock()
+        # bumped on every mutation, serialized views are cached per version
+        self.version = 0
+        self.views = ViewVersions()
+        # copy the defaults so instances don't share (and mutate) the class lists
+        self.stacks, self.container = deepcopy((self.stacks, self.container))
+        self.index = YardIndex(tolerance)
+        self._rebuild_indexes()
         self._add_container_to_stack("Container1", "A1")
         self._add_container_to_stack("Container2", "A3")
         self._add_container_to_stack("Container3", "A3")
         self._add_container_to_stack("Container4", "LKW")
 
-    def export_json(self, path: Path) -> None:
-        json_dict: dict[str, list[dict[str, Any]] | dict[str, Any] | str] = {
-            "container": [asdict(dx) for dx in self.container],
-            "stacks": [asdict(dx) for dx in self.stacks],
-            "crane": "" if self.crane is None else asdict(self.crane),
-        }
-        path.write_text(json.dumps(json_dict))
-
-    def import_json(self, path: Path) -> None:
-        text = path.read_text()
-        json_data = json.loads(text)
-        self.container = [CCSUnit.from_dict(dx) for dx in json_data["container"]]  # type: ignore[attr-defined]
-        self.stacks = [ContainerStack.from_dict(dx) for dx in json_data["stacks"]]  # type: ignore[attr-defined]
-        self.crane = (
-            None if json_data["crane"] == "" else CCSUnit.from_dict(json_data["crane"])  # type: ignore[attr-defined]
-        )
+    def export_json(self, path: Path, journal_seq: int = 0) -> None:
+        """`journal_seq` is the last journal entry contained in the export"""
+        with self.lock:
+            json_dict: dict[str, list[dict[str, Any]] | dict[str, Any] | str | int] = {
+                "container": [to_dict(dx) for dx in self.container],
+                "stacks": [to_dict(dx) for dx in self.stacks],
+                "crane": "" if self.crane is None else to_dict(self.crane),
+                "journal_seq": journal_seq,
+            }
+            path.write_text(json.dumps(json_dict))
+
+    def import_json(self, path: Path) -> int:
+        """imports the yard and returns the journal_seq of the export"""
+        with self.lock:
+            text = path.read_text()
+            json_data = json.loads(text)
+            # the compiled codec, dataclasses_json takes seconds on a large yard
+            self.set_yard(
+                [from_dict(ContainerStack, dx) for dx in json_data["stacks"]],
+                [from_dict(CCSUnit, dx) for dx in json_data["container"]],
+                (
+                    None
+                    if json_data["crane"] == ""
+                    else from_dict(CCSUnit, json_data["crane"])
+                ),
+            )
+            return int(json_data.get("journal_seq", 0))
+
+    def set_yard(
+        self,
+        stacks: List[ContainerStack],
+        container: List[CCSUnit],
+        crane: Optional[CCSUnit],
+    ) -> None:
+        """replaces the whole yard, e.g. when restoring it"""
+        with self.lock:
+            self.stacks = stacks
+            self.container = container
+            self.crane = crane
+            self._rebuild_indexes()
+            self.version += 1
+            self.views.stacks = {}
+            self.views.crane = self.views.layout = self.version
+            if self.events is not None:
+                self.events.publish("reset", {})
+
+    def _rebuild_indexes(self) -> None:
+        self.crane = self.index.rebuild(self.stacks, self.container, self.crane)
+
+    @property
+    def crane_version(self) -> int:
+        return self.views.crane
+
+    @property
+    def layout_version(self) -> int:
+        return self.views.layout
+
+    @property
+    def free_total(self) -> int:
+        return self.index.free_total
+
+    def stack_version(self, name: str) -> int:
+        return self.views.stacks.get(name, self.views.layout)
+
+    def _touch_stack(self, stack: ContainerStack | None) -> None:
+        if stack is not None:
+            self.views.stacks[stack.name] = self.version
+            if self.index.stacks_by_name.get(stack.name) is stack:
+                self.index.update_slots(stack)
+
+    def has_unit(self, unit_number: str) -> bool:
+        return unit_number in self.index.units
+
+    def stack_at(self, coordinates: CCSCoordinates) -> ContainerStack | None:
+        """the stack a job target refers to"""
+        with self.lock:
+            return self._get_stack_by_coordinated(coordinates)
+
+    def unit_slot(self, unit_number: str) -> Slot | None:
+        """stack and tier of the unit, None if it is on the crane or unknown"""
+        stack = self.index.unit_locations.get(unit_number)
+        if stack is None:
+            return None
+        return Slot(stack.name, self.index.unit_tiers[unit_number])
+
+    def dig_depth(self, unit_number: str) -> int | None:
+        """number of units on top of the unit, the rehandles to pick it"""
+        with self.lock:
+            stack = self.index.unit_locations.get(unit_number)
+            if stack is None:
+                return 0 if unit_number in self.index.unit_locations else None
+            return len(stack.container) - 1 - self.index.unit_tiers[unit_number]
+
+    def free_slots(self, stack_name: str) -> int | None:
+        return self.index.free_by_stack.get(stack_name)
+
+    def free_slots_in_block(self, block: str) -> int | None:
+        return self.index.free_by_block.get(block)
+
+    def top_units(self) -> list[str]:
+        """units that can be picked without a rehandle"""
+        with self.lock:
+            return sorted(self.index.top_units)
+
+    def capacity(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "total": self.index.free_total,
+                "blocks": dict(self.index.free_by_block),
+                "stacks": dict(self.index.free_by_stack),
+            }
 
     def _get_item_with_name(self, name: str) -> ContainerStack | None:
-        for item in self.stacks:
-            if item.name == name:
-                return item
+        item = self.index.stacks_by_name.get(name)
+        if item is not None:
+            return item
         print(f"[STORAGE][_get_item_with_name]: item not found {name=}")
         return None
 
     def _get_stack_by_coordinated(
         self, coordinates: CCSCoordinates
     ) -> ContainerStack | None:
-        for item in self.stacks:
-            if (
-                item.coordinates.x == coordinates.x
-                and item.coordinates.y == coordinates.y
-            ):
-                return item
-        return None
+        """nearest stack within the tolerance, targets deviate a few mm"""
+        return self.index.stacks_by_position.nearest(
+            coordinates.x, coordinates.y, self.tolerance
+        )
+
+    def _publish_stack(self, stack: ContainerStack | None) -> None:
+        if self.events is not None and stack is not None:
+            self.events.publish("stack", self._stack_dict(stack))
+
+    def _stack_dict(self, stack: ContainerStack) -> dict[str, Any]:
+        stack_dict = to_dict(stack)
+        stack_dict["free"] = max(0, stack.height - len(stack.container))
+        return stack_dict
+
+    def _publish_unit(self, unit: CCSUnit) -> None:
+        if self.events is None:
+            return
+        if unit.number not in self.index.unit_locations:
+            self.events.publish("container_removed", {"number": unit.number})
+            return
+        stack = self.index.unit_locations[unit.number]
+        unit_dict = to_dict(unit)
+        unit_dict["stack"] = "crane" if stack is None else stack.name
+        self.events.publish("container", unit_dict)
 
     def _delete_container_from_stacks(self, unit: CCSUnit) -> None:
-        for stack in self.stacks:
-            try:
-                stack.container.remove(unit)
-            except ValueError:
-                pass
+        stack = self.index.unit_locations.get(unit.number)
+        if stack is None:
+            return
+        try:
+            stack.container.remove(unit)
+        except ValueError:
+            pass
+        del self.index.unit_locations[unit.number]
+
+    def _clear_crane(self) -> None:
+        if self.crane is not None:
+            if self.index.unit_locations.get(self.crane.number, False) is None:
+                del self.index.unit_locations[self.crane.number]
+            self.crane = None
 
     def _add_container_to_crane(self, unit_number: str) -> None:
-        for unit in self.container:
-            if unit.number == unit_number:
-                if self.crane is None:
-                    self._delete_container_from_stacks(unit)
-                    self.crane = unit
+        with self.lock:
+            unit = self.index.units.get(unit_number)
+            if unit is not None and self.crane is None:
+                old_stack = self.index.unit_locations.get(unit.number)
+                self._delete_container_from_stacks(unit)
+                self.crane = unit
+                self.index.unit_locations[unit.number] = None
+                self.version += 1
+                self._touch_stack(old_stack)
+                self.views.crane = self.version
+                if self.journal is not None:
+                    self.journal.record("add_to_crane", unit=unit_number)
+                self._publish_stack(old_stack)
+                self._publish_unit(unit)
 
     def _add_container_to_stack(self, unit_number: str, stack_name: str) -> str:
-        stack = self._get_item_with_name(stack_name)
-        if stack:
-            for unit in self.container:
-                if unit.number == unit_number:
-                    if len(stack.container) < stack.height:
-                        self._delete_container_from_stacks(unit)
-                        self.crane = None
-                        stack.container.append(unit)
-                        return "success"
-        return "failed"
+        with self.lock:
+            stack = self._get_item_with_name(stack_name)
+            if stack:
+                unit = self.index.units.get(unit_number)
+                if unit is not None and len(stack.container) < stack.height:
+                    old_stack = self.index.unit_locations.get(unit.number)
+                    old_crane = self.crane
+                    self._delete_container_from_stacks(unit)
+                    self._clear_crane()
+                    stack.container.append(unit)
+                    self.index.unit_locations[unit.number] = stack
+                    self.version += 1
+                    self._touch_stack(old_stack)
+                    self._touch_stack(stack)
+                    if old_crane is not None:
+                        self.views.crane = self.version
+                    if self.journal is not None:
+                        self.journal.record(
+                            "add_to_stack", unit=unit_number, stack=stack_name
+                        )
+                    if old_stack is not stack:
+                        self._publish_stack(old_stack)
+                    self._publish_stack(stack)
+                    if old_crane is not None and old_crane.number != unit.number:
+                        self._publish_unit(old_crane)
+                    self._publish_unit(unit)
+                    return "success"
+            return "failed"
 
     def set_stack_pos(self, stack_name: str, coordinates: CCSCoordinates) -> None:
-        for stack in self.stacks:
-            if stack.name == stack_name:
-                stack.coordinates = coordinates
-                print("[STORAGE][set_stack_pos]: {stack_name=} {coordinates=}")
+        with self.lock:
+            stack = self.index.stacks_by_name.get(stack_name)
+            if stack is None:
+                return
+            stack.coordinates = coordinates
+            self.index.stacks_by_position.insert(
+                stack_name, coordinates.x, coordinates.y, stack
+            )
+            self.version += 1
+            self._touch_stack(stack)
+            self.views.layout = self.version
+            if self.journal is not None:
+                self.journal.record(
+                    "set_stack_pos", stack=stack_name, coordinates=to_dict(coordinates)
+                )
+            self._publish_stack(stack)
+            print(f"[STORAGE][set_stack_pos]: {stack_name=} {coordinates=}")
 
     def container_moved(  # pylint: disable=too-many-return-statements
         self, job: CCSJob
     ) -> bool:
-        if job.type == CCSJobType.DROP:
-            if self.crane is None:
-                print("[STORAGE][container_moved]: drop but crane has no unit")
+        with self.lock:
+            if job.type == CCSJobType.DROP:
+                if self.crane is None:
+                    print("[STORAGE][container_moved]: drop but crane has no unit")
+                    return False
+                    # DARF NICHT SEIN
+                stack = self._get_stack_by_coordinated(job.target)
+                if stack:
+                    self._add_container_to_stack(job.unit.number, stack.name)
+                    return True
                 return False
-                # DARF NICHT SEIN
-            stack = self._get_stack_by_coordinated(job.target)
-            if stack:
-                self._add_container_to_stack(job.unit.number, stack.name)
+            if job.type == CCSJobType.PICK:
+                if self.crane is not None:
+                    print("[STORAGE][container_moved]: pick but crane has unit")
+                    return False
+                    # DARF NICHT SEIN
+                self._add_container_to_crane(job.unit.number)
+                return True
+            if job.type == CCSJobType.MOVE:
+                # kein einfluss auf den storage
                 return True
             return False
-        if job.type == CCSJobType.PICK:
-            if self.crane is not None:
-                print("[STORAGE][container_moved]: pick but crane has unit")
-                return False
-                # DARF NICHT SEIN
-            self._add_container_to_crane(job.unit.number)
-            return True
-        if job.type == CCSJobType.MOVE:
-            # kein einfluss auf den storage
-            return True
-        return False
+
+    def _get_cached_json(self, key: str) -> str | None:
+        cached = self.views.json.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        return None
 
     def get_stacks_as_json(self) -> str:
-        temp_list = []
-        for stack in self.stacks:
-            temp_list.append(asdict(stack))
-        return json.dumps(temp_list)
+        with self.lock:
+            cached = self._get_cached_json("stacks")
+            if cached is not None:
+                return cached
+            version = self.version
+            temp_list = []
+            for stack in self.stacks:
+                temp_list.append(self._stack_dict(stack))
+            stacks_json = json.dumps(temp_list)
+            self.views.json["stacks"] = (version, stacks_json)
+            return stacks_json
 
     def get_container_as_json(self) -> str:
-        temp_list = []
-        for stack in self.stacks:
-            for unit in stack.container:
-                unit_dict = asdict(unit)
-                unit_dict["stack"] = stack.name
+        with self.lock:
+            cached = self._get_cached_json("container")
+            if cached is not None:
+                return cached
+            version = self.version
+            temp_list = []
+            for stack in self.stacks:
+                for unit in stack.container:
+                    unit_dict = to_dict(unit)
+                    unit_dict["stack"] = stack.name
+                    temp_list.append(unit_dict)
+            if self.crane is not None:
+                unit_dict = to_dict(self.crane)
+                unit_dict["stack"] = "crane"
                 temp_list.append(unit_dict)
-        if self.crane is not None:
-            unit_dict = asdict(self.crane)
-            unit_dict["stack"] = "crane"
-            temp_list.append(unit_dict)
-        return json.dumps(temp_list)
+            container_json = json.dumps(temp_list)
+            self.views.json["container"] = (version, container_json)
+            return container_json
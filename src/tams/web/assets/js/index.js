@@ -23,43 +23,88 @@ let pos_x = 0
 let pos_y = 0
 let pos_z = 0
 let running_job = null
+let message_seq = 0
+let yard_version = 0
+let yard_layout = ""
+let yard_loading = false
+let yard_stale = false
 
 function get_container() {
     $.getJSON("/container", function (data) {
         if (JSON.stringify(data) !== JSON.stringify(container)) {
             container = data
-            console.log("container", container)
-            select = $("#FormUnitSelect")
-            crane = $("#crane-details-container")
-            select.empty()
-            for (id in container) {
-                if (container[id].stack === "crane") {
-                    crane.text("Container: " + container[id].number)
-                } else {
-                    crane.text("Container: none")
-                }
-                select.append($("<option></option>").attr("value", id).text(container[id].number + " [" + container[id].stack + "]"))
-            }
-            select.append($("<option></option>").attr("value", -1).text(""))
-            update_stack_table()
+            render_container()
         }
     })
 }
 
+function render_container() {
+    console.log("container", container)
+    select = $("#FormUnitSelect")
+    crane = $("#crane-details-container")
+    select.empty()
+    crane.text("Container: none")
+    for (id in container) {
+        if (container[id].stack === "crane") {
+            crane.text("Container: " + container[id].number)
+        }
+        select.append($("<option></option>").attr("value", id).text(container[id].number + " [" + container[id].stack + "]"))
+    }
+    select.append($("<option></option>").attr("value", -1).text(""))
+    update_yard()
+    set_form()
+}
+
 function get_stacks() {
     $.getJSON("/stacks", function (data) {
         if (JSON.stringify(data) !== JSON.stringify(stacks)) {
             stacks = data
-            console.log("stacks", stacks)
-            select = $("#FormTargetSelect")
-            select.empty()
-            for (id in stacks) {
-                space = stacks[id].height - stacks[id].container.length
-                select.append($("<option></option>").attr("value", id).text(stacks[id].name + " [" + stacks[id].container.length + "]" + " [" + space + "]"))
-            }
-            update_stack_table()
+            render_stacks()
+        }
+    })
+}
+
+function render_stacks() {
+    console.log("stacks", stacks)
+    select = $("#FormTargetSelect")
+    select.empty()
+    for (id in stacks) {
+        space = stacks[id].free
+        select.append($("<option></option>").attr("value", id).text(stacks[id].name + " [" + stacks[id].container.length + "]" + " [" + space + "]"))
+    }
+    update_yard()
+    set_form()
+}
+
+function on_stack_event(stack) {
+    for (id in stacks) {
+        if (stacks[id].name === stack.name) {
+            stacks[id] = stack
+            render_stacks()
+            return
+        }
+    }
+    stacks.push(stack)
+    render_stacks()
+}
+
+function on_container_event(unit) {
+    for (id in container) {
+        if (container[id].number === unit.number) {
+            container[id] = unit
+            render_container()
+            return
         }
+    }
+    container.push(unit)
+    render_container()
+}
+
+function on_container_removed_event(unit) {
+    container = container.filter(function (item) {
+        return item.number !== unit.number
     })
+    render_container()
 }
 
 function get_details() {
@@ -78,88 +123,105 @@ function get_details() {
 }
 
 function get_messages() {
-    $.getJSON("/messages", function (data) {
-        if (data["msg"].length !== 0) {
-            for (msg in data["msg"]) {
-                color = "<span>"
-                if (data["msg"][msg].type !== "OK") {
-                    color = '<span class="text-danger">'
-                }
-                $("#messages-console").prepend(
-                    color + '$> <b>' + data["msg"][msg].title + ':</b> ' + data["msg"][msg].text + '</span><br>'
-                );
-            }
+    $.getJSON("/messages", {since: message_seq}, function (data) {
+        if (data["seq"] < message_seq) {
+            // server restarted, its sequence numbers start over
+            message_seq = 0
+            get_messages()
+            return
+        }
+        for (msg in data["msg"]) {
+            render_message(data["msg"][msg])
         }
+        message_seq = Math.max(message_seq, data["seq"])
     })
 }
 
+function render_message(msg) {
+    if (msg.seq <= message_seq) {
+        return
+    }
+    message_seq = msg.seq
+    color = "<span>"
+    if (msg.type !== "OK") {
+        color = '<span class="text-danger">'
+    }
+    $("#messages-console").prepend(
+        color + '$> <b>' + msg.title + ':</b> ' + msg.text + '</span><br>'
+    );
+}
+
 function get_metrics() {
-    $.getJSON("/metric", function (data) {
-        //console.log(data)
-        if ("metrics" in data && data["metrics"].length !== 0) {
-            //console.log(data["metrics"])
-            for (id in data["metrics"]) {
-                if (data["metrics"][id].name === "CraneCoordinatesX") {
-                    $("#crane_position").text(data["metrics"][id].value)
-                    pos_x = data["metrics"][id].value
-                }
-                if (data["metrics"][id].name === "CraneCoordinatesY") {
-                    $("#katz_position").text(data["metrics"][id].value)
-                    pos_y = data["metrics"][id].value
-                }
-                if (data["metrics"][id].name === "CraneCoordinatesZ") {
-                    $("#spreader_position").text(data["metrics"][id].value)
-                    pos_z = data["metrics"][id].value
-                }
-                if (data["metrics"][id].name === "StatusPowerOn") {
-                    $("#crane-status-power").prop('checked', data["metrics"][id].value);
-                }
+    $.getJSON("/metric", render_metrics)
+}
 
-                if (data["metrics"][id].name === "StatusManuelMode") {
-                    $("#crane-status-manual").prop('checked', data["metrics"][id].value);
-                }
+function render_metrics(data) {
+    //console.log(data)
+    if ("metrics" in data && data["metrics"].length !== 0) {
+        //console.log(data["metrics"])
+        for (id in data["metrics"]) {
+            if (data["metrics"][id].name === "CraneCoordinatesX") {
+                $("#crane_position").text(data["metrics"][id].value)
+                pos_x = data["metrics"][id].value
+            }
+            if (data["metrics"][id].name === "CraneCoordinatesY") {
+                $("#katz_position").text(data["metrics"][id].value)
+                pos_y = data["metrics"][id].value
+            }
+            if (data["metrics"][id].name === "CraneCoordinatesZ") {
+                $("#spreader_position").text(data["metrics"][id].value)
+                pos_z = data["metrics"][id].value
+            }
+            if (data["metrics"][id].name === "StatusPowerOn") {
+                $("#crane-status-power").prop('checked', data["metrics"][id].value);
+            }
 
-                if (data["metrics"][id].name === "StatusAutomaticMode") {
-                    $("#crane-status-automatic").prop('checked', data["metrics"][id].value);
-                }
-                if (data["metrics"][id].name === "StatusSandFusion") {
-                    $("#fusion-status").prop('checked', data["metrics"][id].value);
-                }
-                if (data["metrics"][id].name === "JobCancel") {
-                    $("#job-cancel-status").prop('checked', data["metrics"][id].value);
-                }
+            if (data["metrics"][id].name === "StatusManuelMode") {
+                $("#crane-status-manual").prop('checked', data["metrics"][id].value);
+            }
+
+            if (data["metrics"][id].name === "StatusAutomaticMode") {
+                $("#crane-status-automatic").prop('checked', data["metrics"][id].value);
+            }
+            if (data["metrics"][id].name === "StatusSandFusion") {
+                $("#fusion-status").prop('checked', data["metrics"][id].value);
+            }
+            if (data["metrics"][id].name === "JobCancel") {
+                $("#job-cancel-status").prop('checked', data["metrics"][id].value);
             }
         }
-    })
+    }
 }
 
 function get_job() {
-    $.getJSON("/job", function (data) {
-        jobcard = $("#running-job")
-        //console.log("JOB:", data)
-        jobcard.empty()
-        if ($.isEmptyObject(data)) {
-            jobcard.append("<ul>" +
-                "<li><b>type:</b> </li>" +
-                "<li><b>x:</b>  </li>" +
-                "<li><b>y:</b>  </li>" +
-                "<li><b>z:</b>  </li>" +
-                "<li><b>unit nr:</b>  </li>" +
-                "<li><b>unit id:</b>  </li>" +
-                "<li><b>unit type:</b> </li>" +
-                "</ul>")
-        } else {
-            jobcard.append("<ul>" +
-                "<li><b>type:</b> " + data.type + "</li>" +
-                "<li><b>x:</b> " + data.target.x + "</li>" +
-                "<li><b>y:</b> " + data.target.y + "</li>" +
-                "<li><b>z:</b> " + data.target.z + "</li>" +
-                "<li><b>unit nr:</b> " + data.unit.number + "</li>" +
-                "<li><b>unit id:</b> " + data.unit.unit_id + "</li>" +
-                "<li><b>unit type:</b> " + data.unit.type + "</li>" +
-                "</ul>")
-        }
-    })
+    $.getJSON("/job", render_job)
+}
+
+function render_job(data) {
+    jobcard = $("#running-job")
+    //console.log("JOB:", data)
+    jobcard.empty()
+    if ($.isEmptyObject(data)) {
+        jobcard.append("<ul>" +
+            "<li><b>type:</b> </li>" +
+            "<li><b>x:</b>  </li>" +
+            "<li><b>y:</b>  </li>" +
+            "<li><b>z:</b>  </li>" +
+            "<li><b>unit nr:</b>  </li>" +
+            "<li><b>unit id:</b>  </li>" +
+            "<li><b>unit type:</b> </li>" +
+            "</ul>")
+    } else {
+        jobcard.append("<ul>" +
+            "<li><b>type:</b> " + data.type + "</li>" +
+            "<li><b>x:</b> " + data.target.x + "</li>" +
+            "<li><b>y:</b> " + data.target.y + "</li>" +
+            "<li><b>z:</b> " + data.target.z + "</li>" +
+            "<li><b>unit nr:</b> " + data.unit.number + "</li>" +
+            "<li><b>unit id:</b> " + data.unit.unit_id + "</li>" +
+            "<li><b>unit type:</b> " + data.unit.type + "</li>" +
+            "</ul>")
+    }
 }
 
 function get_crane_container() {
@@ -180,88 +242,55 @@ function get_crane_container_id() {
     return ""
 }
 
-function update_stack_table(url, element_id = "output") {
-    $.ajax({
-        url: "ajax_stack_table",
-        success: function (data) {
-            document.getElementById("stack_table").innerHTML = data;
-        }
-
-    });
-}
-
-function update_stack_table_obs() {
-    return
-    stacks_table = $("#stacks table tbody")
-    stacks_table_head = $("#stacks table thead")
-    stacks_table.empty()
-    stacks_table_head.empty()
-    crane_container = get_crane_container()
-
-    stacks_table_head.append('<tr style="font-size: 14px;" class="table-dark"></tr>')
-    last = stacks_table_head.children("tr:last")
-    for (id in stacks) {
-        last.append("<td>" + stacks[id].name + "</td>")
+function update_yard() {
+    // only the stacks changed since yard_version are sent, or the whole table
+    // if the stack positions or the mode changed
+    if (yard_loading) {
+        yard_stale = true
+        return
     }
-    last.append("<td>crane</td>")
-
-    indexes = [2, 1, 0]
-    for (idx in indexes) {
-        stacks_table.append("<tr></tr>")
-
-        last = stacks_table.children("tr:last")
-        for (ids in stacks) {
-            if (stacks[ids].container.length > indexes[idx]) {
-                last.append("<td class='bg-secondary'>" + stacks[ids].container[indexes[idx]].number + "</td>")
-            } else {
-                last.append("<td>-</td>")
-            }
+    yard_loading = true
+    $.getJSON("/yard", {since: yard_version, layout: yard_layout}, function (data) {
+        if ("html" in data) {
+            document.getElementById("stack_table").innerHTML = data["html"]
         }
-        if (indexes[idx] === 0) {
-            if (crane_container === "") {
-                last.append("<td>-</td>")
-            } else {
-                last.append("<td class='bg-danger'>" + crane_container + "</td>")
+        for (name in data["stacks"]) {
+            const cell = document.getElementById("stack-" + name)
+            if (cell !== null) {
+                cell.outerHTML = data["stacks"][name]
             }
-        } else {
-            last.append("<td>-</td>")
         }
-    }
-
-    stacks_table.append('<tr></tr>')
-    last = stacks_table.children("tr:last")
-    for (id in stacks) {
-        last.append('<td class="text-center">' + stacks[id].coordinates.x + "/" + stacks[id].coordinates.y + "/" + stacks[id].coordinates.z + "</td>")
-    }
-    last.append("<td></td>")
+        if ("crane" in data) {
+            document.getElementById("yard-crane").outerHTML = data["crane"]
+        }
+        yard_version = data["version"]
+        yard_layout = data["layout"]
+    }).always(function () {
+        yard_loading = false
+        if (yard_stale) {
+            yard_stale = false
+            update_yard()
+        }
+    })
+}
 
-    stacks_table.append("<tr></tr>")
-    last = stacks_table.children("tr:last")
-    for (id in stacks) {
-        last.append('<td class="text-center"><button data-stack-name="' + stacks[id].name + '" style="font-size: 10px" type="button" class="btn btn-primary set-pos ">set pos</button></td>')
+function set_stack_pos(stack_name) {
+    data = {
+        "x": pos_x,
+        "y": pos_y,
+        "z": pos_z,
     }
-    last.append("<td></td>")
-
-    $(".set-pos").click(function () {
-        stack_name = $(this).attr("data-stack-name");
-        console.log(stack_name);
-        data = {
-            "x": pos_x,
-            "y": pos_y,
-            "z": pos_z,
+    console.log(stack_name, data);
+    $.ajax({
+        url: "stacks/setpos/" + stack_name,
+        type: "POST",
+        data: JSON.stringify(data),
+        contentType: "application/json; charset=utf-8",
+        dataType: "json",
+        success: function (data) {
+            console.log(data)
         }
-        console.log(data);
-        $.ajax({
-            url: "stacks/setpos/" + stack_name,
-            type: "POST",
-            data: JSON.stringify(data),
-            contentType: "application/json; charset=utf-8",
-            dataType: "json",
-            success: function (data) {
-                console.log(data)
-            }
-        })
-    });
+    })
 }
 
 function set_form() {
@@ -385,15 +414,15 @@ function cancel_job() {
     })
 }
 
-$(document).ready(function () {
-    $.getJSON("/state", function (data) {
-        console.log("state", data)
-    })
-
-    get_details()
+function load_all() {
+    get_messages()
+    get_job()
     get_container()
     get_stacks()
+    get_metrics()
+}
 
+function poll_all() {
     setInterval(function () {
         get_messages()
     }, 500);
@@ -405,9 +434,60 @@ $(document).ready(function () {
         get_metrics()
         set_form()
     }, 1000);
+}
+
+function subscribe_events() {
+    if (typeof (EventSource) === "undefined") {
+        poll_all()
+        return
+    }
+    let connected = false
+    const source = new EventSource("/events")
+    source.onopen = function () {
+        // events may have been missed while reconnecting
+        if (connected) {
+            load_all()
+        }
+        connected = true
+    }
+    source.addEventListener("stack", function (e) {
+        on_stack_event(JSON.parse(e.data))
+    })
+    source.addEventListener("container", function (e) {
+        on_container_event(JSON.parse(e.data))
+    })
+    source.addEventListener("container_removed", function (e) {
+        on_container_removed_event(JSON.parse(e.data))
+    })
+    source.addEventListener("job", function (e) {
+        render_job(JSON.parse(e.data))
+    })
+    source.addEventListener("message", function (e) {
+        render_message(JSON.parse(e.data))
+    })
+    source.addEventListener("metric", function (e) {
+        render_metrics(JSON.parse(e.data))
+    })
+    source.addEventListener("reset", function () {
+        load_all()
+    })
+}
+
+$(document).ready(function () {
+    $.getJSON("/state", function (data) {
+        console.log("state", data)
+    })
+
+    get_details()
+    load_all()
+    subscribe_events()
 
     $(".not-clickable").on("click", false);
 
+    $("#stack_table").on("click", ".set-pos", function () {
+        set_stack_pos($(this).attr("data-stack-name"))
+    })
+
     $('#FormTypeSelect').on('change', function () {
         set_form()
     });
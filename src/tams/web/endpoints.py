@@ -0,0 +1,319 @@
+"""endpoints of the web app grouped by what they serve
+
+Every group adds its url rules to the app of `Web` when created.
+"""
+
+import json
+import math
+from dataclasses import asdict
+from queue import Empty
+from threading import Event
+from typing import Any, Callable, Iterator
+
+from flask import Flask, Response, make_response, request
+
+from tams.alarm.alarm import AlarmStore
+from tams.event.event import EventBus
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.msg import Messages
+
+# served while the yard is restored
+STARTUP_ENDPOINTS = {"frontend", "static", "health", "ready"}
+
+
+def versioned_response(etag: str, body: Callable[[], Any]) -> Any:
+    """304 if the client has `etag`, the response of `body` otherwise"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(body())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def parse_jobs(data: bytes, mimetype: str = "") -> list[Any]:
+    """entries of a json array or of ndjson, a broken ndjson line becomes None
+
+    Raises ValueError if the body is neither.
+    """
+    if mimetype != "application/x-ndjson" and data.lstrip().startswith(b"["):
+        entries = json.loads(data)
+        if not isinstance(entries, list):
+            raise ValueError("expected a json array")
+        return entries
+    if not data.strip():
+        raise ValueError("no jobs")
+    entries = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            entries.append(None)
+    return entries
+
+
+class Health:
+    """start and shutdown of the web app, with /health and /ready
+
+    Until `ready` is set only these and the ui answer.
+    """
+
+    def __init__(self, app: Flask, ready: bool = True) -> None:
+        # cleared while the yard is restored
+        self.ready = Event()
+        if ready:
+            self.ready.set()
+        self.shutdown_event = Event()
+        app.before_request(self.check_ready)
+        app.add_url_rule("/health", "health", self.health_get, methods=["get"])
+        app.add_url_rule("/ready", "ready", self.ready_get, methods=["get"])
+
+    def check_ready(self) -> Any:
+        if self.ready.is_set() or request.endpoint in STARTUP_ENDPOINTS:
+            return None
+        return Response("starting", status=503, headers={"Retry-After": "1"})
+
+    def health_get(self) -> Any:
+        """process is up, answers before the yard is restored"""
+        status = "ready" if self.ready.is_set() else "starting"
+        return Response(json.dumps({"status": status}), mimetype="application/json")
+
+    def ready_get(self) -> Any:
+        if not self.ready.is_set():
+            return "starting", 503
+        return "OK", 200
+
+
+class EventStream:
+    """/events, the events of the bus as server-sent events"""
+
+    def __init__(self, app: Flask, events: EventBus, shutdown_event: Event) -> None:
+        self.events = events
+        self.shutdown_event = shutdown_event
+        app.add_url_rule("/events", "events_get", self.events_get, methods=["get"])
+
+    def events_get(self) -> Any:
+        queue = self.events.subscribe()
+
+        def stream() -> Iterator[str]:
+            try:
+                yield ": connected\n\n"
+                while not self.shutdown_event.is_set():
+                    try:
+                        yield queue.get(timeout=15).encode()
+                    except Empty:
+                        # keep proxies from closing an idle connection
+                        yield ": keepalive\n\n"
+            finally:
+                self.events.unsubscribe(queue)
+
+        return Response(
+            stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+
+class MetricEndpoints:
+    """/metric as json, /metrics for prometheus and the endpoint timings"""
+
+    def __init__(self, app: Flask, metric: Metric, etag_prefix: str) -> None:
+        self.metric = metric
+        self.etag_prefix = etag_prefix
+        app.add_url_rule("/metric", "metric_get", self.metric_get, methods=["get"])
+        app.add_url_rule(
+            "/metric/<string:name>",
+            "metric_aggregate_get",
+            self.metric_aggregate_get,
+            methods=["get"],
+        )
+        app.add_url_rule("/metrics", "metrics_get", self.metrics_get, methods=["get"])
+        app.add_url_rule(
+            "/debug/timings", "timings_get", self.timings_get, methods=["get"]
+        )
+
+    def metric_get(self) -> Any:
+        return versioned_response(
+            f"metric-{self.etag_prefix}-{self.metric.version}",
+            lambda: (self.metric.get_metrics(), 200),
+        )
+
+    def metric_aggregate_get(self, name: str) -> Any:
+        window = request.args.get("window", 60.0, type=float)
+        aggregate = self.metric.aggregate(name, window)
+        if aggregate is None:
+            return "not found", 404
+        # an empty window is NaN, which json can't express
+        body = {
+            key: None if isinstance(value, float) and math.isnan(value) else value
+            for key, value in asdict(aggregate).items()
+        }
+        return body, 200
+
+    def metrics_get(self) -> Any:
+        return Response(
+            self.metric.get_prometheus(), mimetype="text/plain; version=0.0.4"
+        )
+
+    def timings_get(self) -> Any:
+        return self.metric.timings.as_dict(), 200
+
+
+class CapacityEndpoints:
+    """free slots of the yard and where a unit is"""
+
+    def __init__(self, app: Flask, storage: TamsStorage) -> None:
+        self.storage = storage
+        app.add_url_rule(
+            "/capacity", "capacity_get", self.capacity_get, methods=["get"]
+        )
+        app.add_url_rule(
+            "/capacity/<string:block>",
+            "capacity_block_get",
+            self.capacity_block_get,
+            methods=["get"],
+        )
+        app.add_url_rule(
+            "/units/accessible",
+            "units_accessible_get",
+            self.units_accessible_get,
+            methods=["get"],
+        )
+        app.add_url_rule(
+            "/units/<string:number>", "unit_get", self.unit_get, methods=["get"]
+        )
+
+    def capacity_get(self) -> Any:
+        """free slots in total, per block and per stack"""
+        return Response(
+            json.dumps(self.storage.capacity()), mimetype="application/json"
+        )
+
+    def capacity_block_get(self, block: str) -> Any:
+        free = self.storage.free_slots_in_block(block)
+        if free is None:
+            return "unknown block", 404
+        body = {"block": block, "free": free}
+        return Response(json.dumps(body), mimetype="application/json")
+
+    def units_accessible_get(self) -> Any:
+        """units that can be picked without a rehandle"""
+        return Response(
+            json.dumps(self.storage.top_units()), mimetype="application/json"
+        )
+
+    def unit_get(self, number: str) -> Any:
+        with self.storage.lock:
+            depth = self.storage.dig_depth(number)
+            if depth is None:
+                return "unknown unit", 404
+            slot = self.storage.unit_slot(number)
+        body = {
+            "number": number,
+            "stack": "crane" if slot is None else slot.stack,
+            "tier": None if slot is None else slot.tier,
+            "dig_depth": depth,
+        }
+        return Response(json.dumps(body), mimetype="application/json")
+
+
+class QueueEndpoints:
+    """bulk jobs and changes to single pending jobs"""
+
+    def __init__(self, app: Flask, state: TamsJobState, msgs: Messages) -> None:
+        self.state = state
+        self.msgs = msgs
+        app.add_url_rule("/jobs", "jobs_post", self.jobs_post, methods=["post"])
+        app.add_url_rule(
+            "/jobs_pending/<string:job_id>",
+            "jobs_pending_delete",
+            self.jobs_pending_delete,
+            methods=["delete"],
+        )
+        app.add_url_rule(
+            "/jobs_pending/<string:job_id>/priority",
+            "jobs_pending_priority",
+            self.jobs_pending_priority,
+            methods=["post"],
+        )
+
+    def jobs_post(self) -> Any:
+        """bulk job_post, a json array or ndjson (one job per line)"""
+        try:
+            entries = parse_jobs(request.get_data(), request.mimetype)
+        except ValueError:
+            self.msgs.add_error_msg("WEB jobs_post", "invalid")
+            return "Invalid input", 405
+        results = self.state.set_new_jobs(
+            entries, priority=request.args.get("priority", 0, type=int)
+        )
+        accepted = sum(result["result"] == "OK" for result in results)
+        self.msgs.add_msg(
+            "WEB jobs_post", f"accepted {accepted} of {len(results)} jobs"
+        )
+        body = {
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "results": results,
+        }
+        return Response(json.dumps(body), mimetype="application/json")
+
+    def jobs_pending_delete(self, job_id: str) -> Any:
+        if self.state.cancel_pending_job(job_id):
+            self.msgs.add_msg("WEB jobs_pending_delete", f"removed {job_id}")
+            return "OK", 200
+        return "not found", 404
+
+    def jobs_pending_priority(self, job_id: str) -> Any:
+        try:
+            priority = int(request.get_data())
+        except ValueError:
+            return "Invalid input", 405
+        if self.state.set_pending_job_priority(job_id, priority):
+            return "OK", 200
+        return "not found", 404
+
+
+class RecordEndpoints:
+    """the job history and the alarms"""
+
+    def __init__(self, app: Flask, state: TamsJobState, alarms: AlarmStore) -> None:
+        self.state = state
+        self.alarms = alarms
+        app.add_url_rule("/history", "history_get", self.history_get, methods=["get"])
+        app.add_url_rule("/alarms", "alarms_get", self.alarms_get, methods=["get"])
+
+    def history_get(self) -> Any:
+        """a page of the job history, filter by unit, crane, job, since/until
+
+        Pass `next` of the response as `before` for the next page.
+        """
+        if self.state.observers.history is None:
+            return "history disabled", 404
+        page = self.state.observers.history.query(
+            unit=request.args.get("unit"),
+            crane=request.args.get("crane"),
+            job=request.args.get("job"),
+            since=request.args.get("since", type=float),
+            until=request.args.get("until", type=float),
+            before=request.args.get("before", type=int),
+            limit=request.args.get("limit", 100, type=int),
+        )
+        return Response(json.dumps(page), mimetype="application/json")
+
+    def alarms_get(self) -> Any:
+        body = {
+            "alarms": self.alarms.query(
+                source=request.args.get("source"),
+                code=request.args.get("code"),
+                since=request.args.get("since", type=float),
+                limit=request.args.get("limit", 100, type=int),
+            ),
+            "suppressed": self.alarms.suppressed,
+        }
+        return Response(json.dumps(body), mimetype="application/json")
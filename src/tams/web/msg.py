@@ -1,41 +1,54 @@
-from dataclasses import dataclass
+import json
+from dataclasses import asdict, dataclass
 from threading import Lock
-from typing import List
 
-from dataclasses_json import dataclass_json
+from tams.event.event import EventBus
 
 
-@dataclass_json
 @dataclass
 class Msg:
     title: str
     text: str
     type: str
-
-
-@dataclass_json
-@dataclass
-class Msgs:
-    msg: List[Msg]
+    seq: int = 0
 
 
 class Messages:
-    __messages = Msgs([])
+    """fixed size log of the latest messages, read by sequence number
+
+    Every message gets the next sequence number and is serialized once when
+    added. Readers pass the sequence number they have seen and get only the
+    newer messages, so any number of browser tabs can follow the log. When
+    more than `capacity` messages arrive between two reads, the oldest are lost.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, events: EventBus | None = None, capacity: int = 1000) -> None:
         self.lock = Lock()
+        self.events = events
+        self.capacity = capacity
+        self._slots: list[str] = [""] * capacity
+        # sequence number of the last added message, the first one gets 1
+        self.seq = 0
 
     def add_msg(self, title: str, text: str) -> None:
-        with self.lock:
-            self.__messages.msg.append(Msg(title, text, "OK"))
+        self._add(title, text, "OK")
 
     def add_error_msg(self, title: str, text: str) -> None:
-        with self.lock:
-            self.__messages.msg.append(Msg(title, text, "ERROR"))
+        self._add(title, text, "ERROR")
 
-    def get_msgs_json(self, clear: bool = False) -> str:
+    def _add(self, title: str, text: str, type_: str) -> None:
+        with self.lock:
+            self.seq += 1
+            msg_json = json.dumps(asdict(Msg(title, text, type_, self.seq)))
+            self._slots[self.seq % self.capacity] = msg_json
+        if self.events is not None:
+            self.events.publish("message", msg_json)
+
+    def get_msgs_json(self, since: int = 0) -> str:
+        """messages after sequence number `since` and the sequence number to pass next"""
         with self.lock:
-            json: str = self.__messages.to_json()  # type: ignore[attr-defined]
-            if clear:
-                self.__messages.msg.clear()
-            return json
+            first = max(since, self.seq - self.capacity, 0) + 1
+            msgs = [
+                self._slots[seq % self.capacity] for seq in range(first, self.seq + 1)
+            ]
+            return f'{{"msg": [{", ".join(msgs)}], "seq": {self.seq}}}'
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+from argparse import ArgumentParser
+from os import getcwd
+from pathlib import Path
+from threading import local
+from typing import Any
+
+from flask import Flask, Response, request
+
+from tams.storage.snapshot import Snapshot, SnapshotReader
+from tams.web.server import SERVER_MODES, ServerConfig, serve
+
+
+class Replica:
+    """read-only /stacks and /container served from a yard snapshot file
+
+    Runs in its own process next to tams (--snapshot), start as many as
+    needed behind a proxy. The bodies are the json published by tams and
+    the etags use the etag prefix of its web app, so a cached response is
+    valid for tams and every replica. Writes still go to tams. Every request
+    thread maps the file with its own reader, a reader is not thread safe.
+    """
+
+    def __init__(
+        self, snapshot_path: Path, port: int = 7100, server: ServerConfig | None = None
+    ) -> None:
+        self.snapshot_path = snapshot_path
+        self.readers = local()
+        self.port = port
+        self.server = server
+        self.app = Flask("tams replica", root_path=getcwd())
+        self.app.add_url_rule("/health", "health", self.health_get, methods=["get"])
+        self.app.add_url_rule("/stacks", "stacks_get", self.stacks_get, methods=["get"])
+        self.app.add_url_rule(
+            "/container", "container_get", self.container_get, methods=["get"]
+        )
+
+    def reader(self) -> SnapshotReader:
+        reader: SnapshotReader | None = getattr(self.readers, "reader", None)
+        if reader is None:
+            reader = self.readers.reader = SnapshotReader(self.snapshot_path)
+        return reader
+
+    def snapshot(self) -> Snapshot | None:
+        try:
+            return self.reader().read()
+        except FileNotFoundError:
+            return None
+
+    def versioned_response(self, name: str, snapshot: Snapshot, body: bytes) -> Any:
+        etag = f"{name}-{self.reader().generation:x}-{snapshot.version}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    def health_get(self) -> Any:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return "no snapshot", 503
+        return {"status": "ready", "version": snapshot.version}
+
+    def stacks_get(self) -> Any:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return "no snapshot", 503
+        return self.versioned_response("stacks", snapshot, snapshot.stacks)
+
+    def container_get(self) -> Any:
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return "no snapshot", 503
+        return self.versioned_response("container", snapshot, snapshot.container)
+
+    def serve(self) -> None:
+        serve(self.app, self.port, self.server)
+
+
+def run() -> None:
+    parser = ArgumentParser(description="read-only replica of the tams yard")
+    parser.add_argument(
+        "--snapshot",
+        type=Path,
+        default=Path("export.snap"),
+        help="snapshot file written by tams --snapshot",
+    )
+    parser.add_argument("--port", type=int, default=7100)
+    parser.add_argument("--server", choices=SERVER_MODES, default="dev")
+    args = parser.parse_args()
+    replica = Replica(args.snapshot, args.port, ServerConfig(args.server))
+    print(f"[REPLICA][run] {args.snapshot} on port {args.port}")
+    try:
+        replica.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
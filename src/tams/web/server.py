@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # main imports the config before flask is needed
+    from flask import Flask
+
+SERVER_MODES = ("dev", "waitress")
+
+
+@dataclass
+class ServerConfig:
+    # dev: werkzeug development server, waitress: production wsgi server
+    mode: str = "dev"
+    # request threads per app, every open /events stream occupies one
+    threads: int = 16
+    connection_limit: int = 200
+    # seconds an idle keep-alive connection stays open
+    keepalive_timeout: int = 120
+
+
+def serve(app: "Flask", port: int, config: ServerConfig | None = None) -> None:
+    """blocks serving the app, all requests share the state of this process"""
+    config = config if config is not None else ServerConfig()
+    if config.mode == "dev":
+        app.run(host="0.0.0.0", port=port, threaded=True)
+        return
+    if config.mode != "waitress":
+        raise ValueError(f"unknown server mode {config.mode}")
+    try:
+        # pylint: disable=import-outside-toplevel
+        from waitress import serve as waitress_serve
+    except ImportError as error:
+        raise RuntimeError(
+            "server mode waitress needs the waitress package: pip install waitress"
+        ) from error
+    print(f"[SERVER][serve] {app.name} on port {port} with {config}")
+    waitress_serve(
+        app,
+        host="0.0.0.0",
+        port=port,
+        threads=config.threads,
+        connection_limit=config.connection_limit,
+        channel_timeout=config.keepalive_timeout,
+        ident="tams",
+    )
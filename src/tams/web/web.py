@@ -1,18 +1,33 @@
 import json
+import time
 from enum import Enum
 from os import getcwd
 from pathlib import Path
-from threading import Event, Thread
+from threading import Thread
 from typing import Any
 
-from flask import Flask, render_template, request
+from flask import Flask, Response, render_template, request
 from flask_cors import CORS
 
+from tams.alarm.alarm import AlarmStore
+from tams.ccs.codec import to_json
 from tams.ccs.types import CCSCoordinates
+from tams.event.event import EventBus
 from tams.metric.metric import Metric
 from tams.state.state import TamsJobState
 from tams.storage.storage import TamsStorage
+from tams.web.endpoints import (
+    CapacityEndpoints,
+    EventStream,
+    Health,
+    MetricEndpoints,
+    QueueEndpoints,
+    RecordEndpoints,
+    versioned_response,
+)
 from tams.web.msg import Messages
+from tams.web.server import ServerConfig, serve
+from tams.web.yard import YardRenderer
 
 
 class WebState(Enum):
@@ -32,16 +47,22 @@ class Web:
         storage: TamsStorage,
         metric: Metric,
         verbose: bool = False,
-    ):
-        self.metric = metric
+        events: EventBus | None = None,
+        port: int = 7000,
+        server: ServerConfig | None = None,
+        alarms: AlarmStore | None = None,
+        ready: bool = True,
+    ):  # pylint: disable=too-many-arguments
+        events = events if events is not None else EventBus()
         self.state = state
         self.verbose = verbose
         self.mode = WebState("init")
         template_folder = Path(__file__).parent.joinpath("template")
         static_folder = Path(__file__).parent.joinpath("assets")
-        self.shutdown_event = Event()
-        self.msgs = Messages()
+        self.msgs = Messages(events)
         self.storage = storage
+        # part of every etag, so caches from an earlier process never match
+        self.etag_prefix = f"{int(time.time()):x}"
         self.app = Flask(
             "tams web",
             root_path=getcwd(),
@@ -49,10 +70,19 @@ class Web:
             static_folder=static_folder.as_posix(),
         )
         CORS(self.app)
+        self.yard = YardRenderer(self.storage, self.app.jinja_env, self.etag_prefix)
+        metric.timings.instrument(self.app, "web")
+        self.health = Health(self.app, ready)
         self.add_endpoints()
+        EventStream(self.app, events, self.health.shutdown_event)
+        MetricEndpoints(self.app, metric, self.etag_prefix)
+        CapacityEndpoints(self.app, storage)
+        QueueEndpoints(self.app, state, self.msgs)
+        # alarms are shared with the CCS, which fills them
+        RecordEndpoints(self.app, state, alarms if alarms is not None else AlarmStore())
         self.worker_rest: Thread = Thread(
-            target=self.rest,
-            args=(),
+            target=serve,
+            args=(self.app, port, server),
             name="CCS Worker",
             daemon=True,
         )
@@ -85,7 +115,6 @@ class Web:
             methods=["post"],
         )
         self.app.add_url_rule("/state", "state_get", self.state_get, methods=["get"])
-        self.app.add_url_rule("/metric", "metric_get", self.metric_get, methods=["get"])
         self.app.add_url_rule(
             "/details", "details_get", self.details_get, methods=["get"]
         )
@@ -111,9 +140,7 @@ class Web:
             self.ajax_stack_table,
             methods=["get"],
         )
-
-    def rest(self) -> None:
-        self.app.run(host="0.0.0.0", port=7000)
+        self.app.add_url_rule("/yard", "yard_get", self.yard_get, methods=["get"])
 
     def frontend(self) -> Any:
         if self.verbose:
@@ -121,7 +148,10 @@ class Web:
         return render_template("index.html", active_link="/")
 
     def stacks_get(self) -> Any:
-        return self.storage.get_stacks_as_json()
+        return versioned_response(
+            f"stacks-{self.etag_prefix}-{self.storage.version}",
+            self.storage.get_stacks_as_json,
+        )
 
     def mode_post(self) -> Any:
         if str(request.data) in WebState.__members__:
@@ -130,12 +160,15 @@ class Web:
         return "Invalid input", 405
 
     def ajax_stack_table(self) -> Any:
-        stacks = self.storage.stacks
-        if self.mode.name == "init":
-            return render_template("ajax/stacks_init.html", active_link="/")
-        if self.mode.name == "manual":
-            return render_template("ajax/stacks_manual.html", active_link="/")
-        return render_template("ajax/stacks.html", active_link="/")
+        return self.yard.table(self.mode.name)
+
+    def yard_get(self) -> Any:
+        body = self.yard.render(
+            self.mode.name,
+            since=request.args.get("since", 0, type=int),
+            layout=request.args.get("layout", ""),
+        )
+        return Response(json.dumps(body), mimetype="application/json")
 
     def stacks_setpos_post(self, stack_name: str) -> Any:
         data = json.loads(request.get_data())
@@ -146,14 +179,18 @@ class Web:
         return "OK", 200
 
     def container_get(self) -> Any:
-        return self.storage.get_container_as_json()
+        return versioned_response(
+            f"container-{self.etag_prefix}-{self.storage.version}",
+            self.storage.get_container_as_json,
+        )
 
     def job_post(self) -> Any:
-        job_json = str(request.json).replace("'", '"')
-        job_json = job_json.replace("False", "false")
+        job_json = request.get_data()
         if self.verbose:
             print(f"[WEB][job_post] {job_json=}")
-        ret = self.state.set_new_job(job_json)
+        ret = self.state.set_new_job(
+            job_json, priority=request.args.get("priority", 0, type=int)
+        )
         if ret == "invalid":
             self.msgs.add_error_msg("WEB job_post", "invalid")
             return "Invalid input", 405
@@ -170,12 +207,13 @@ class Web:
         return self.state.get_pending_jobs_as_json(), 200
 
     def job_get(self) -> Any:
-        if self.state.has_job():
-            return self.state.get_job_as_json(), 200
-        return {}, 200
+        return versioned_response(
+            f"job-{self.etag_prefix}-{self.state.version}",
+            lambda: Response(self.state.get_job_as_json(), mimetype="application/json"),
+        )
 
     def job_cancel(self) -> Any:
-        self.state.cancel_job = True
+        self.state.request_cancel()
         self.msgs.add_msg("WEB job_cancel", "ok")
         return "OK", 200
 
@@ -183,19 +221,19 @@ class Web:
         return self.state.get_state_as_json(), 200
 
     def details_get(self) -> Any:
-        return self.state.details.to_json(), 200  # type: ignore[attr-defined]
-
-    def metric_get(self) -> Any:
-        return self.metric.get_metrics(), 200
+        return to_json(self.state.details), 200
 
     def job_clear_running(self) -> Any:
-        return self.state.clear_running_job(), 200
+        self.state.clear_running_job()
+        return "OK", 200
 
     def job_clear_pending(self) -> Any:
-        return self.state.clear_pending_jobs(), 200
+        self.state.clear_pending_jobs()
+        return "OK", 200
 
     def messages_get(self) -> Any:
-        return self.msgs.get_msgs_json(clear=True), 200
+        since = request.args.get("since", 0, type=int)
+        return Response(self.msgs.get_msgs_json(since), mimetype="application/json")
 
     def shutdown(self) -> None:
-        self.shutdown_event.set()
+        self.health.shutdown_event.set()
@@ -0,0 +1,126 @@
+from typing import Any, Iterable
+
+from jinja2 import Environment
+from markupsafe import Markup
+
+from tams.storage.storage import ContainerStack, TamsStorage
+
+
+def _buckets(values: Iterable[int], tolerance: int) -> dict[int, int]:
+    """row/column index of every coordinate
+
+    A bucket starts at its smallest coordinate and takes all coordinates
+    within the tolerance, so the few mm a set pos deviates don't open a new
+    row or column per stack.
+    """
+    index: dict[int, int] = {}
+    start: int | None = None
+    bucket = -1
+    for value in sorted(set(values)):
+        if start is None or value - start > tolerance:
+            start = value
+            bucket += 1
+        index[value] = bucket
+    return index
+
+
+class YardRenderer:
+    """html of the yard view, generated from the stacks of the storage
+
+    The stacks are laid out in a grid by their coordinates (rows by y, columns
+    by x, bucketed by the storage tolerance). Stacks sharing a cell with an
+    earlier stack, like stacks not positioned yet, follow in extra rows below
+    the grid. Every stack is a table cell fragment that is cached until the
+    stack changes, so an update only renders and sends the stacks changed since
+    the version the client already has. The whole table is sent if the layout
+    (stack positions or the web mode) changed.
+    """
+
+    def __init__(
+        self, storage: TamsStorage, env: Environment, prefix: str = ""
+    ) -> None:
+        self.storage = storage
+        # part of the layout key, a client of an earlier process starts over
+        self.prefix = prefix
+        self.stack_template = env.get_template("ajax/stack.html")
+        self.crane_template = env.get_template("ajax/crane.html")
+        self.yard_template = env.get_template("ajax/yard.html")
+        # stack name -> (stack version, mode, html)
+        self._fragments: dict[str, tuple[int, str, Markup]] = {}
+        self._layout: tuple[int, list[list[ContainerStack | None]]] = (-1, [])
+
+    def layout_key(self, mode: str) -> str:
+        return f"{self.prefix}-{self.storage.layout_version}-{mode}"
+
+    def layout(self) -> list[list[ContainerStack | None]]:
+        if self._layout[0] == self.storage.layout_version:
+            return self._layout[1]
+        tolerance = self.storage.tolerance
+        column = _buckets(
+            (stack.coordinates.x for stack in self.storage.stacks), tolerance
+        )
+        row = _buckets(
+            (stack.coordinates.y for stack in self.storage.stacks), tolerance
+        )
+        columns = max(column.values(), default=-1) + 1
+        rows: list[list[ContainerStack | None]] = [
+            [None] * columns for _ in range(max(row.values(), default=-1) + 1)
+        ]
+        shared: list[ContainerStack] = []
+        for stack in self.storage.stacks:
+            cells = rows[row[stack.coordinates.y]]
+            if cells[column[stack.coordinates.x]] is None:
+                cells[column[stack.coordinates.x]] = stack
+            else:
+                shared.append(stack)
+        for start in range(0, len(shared), columns):
+            extra: list[ContainerStack | None] = [*shared[start : start + columns]]
+            rows.append(extra + [None] * (columns - len(extra)))
+        self._layout = (self.storage.layout_version, rows)
+        names = {stack.name for stack in self.storage.stacks}
+        self._fragments = {
+            name: cached for name, cached in self._fragments.items() if name in names
+        }
+        return rows
+
+    def fragment(self, stack: ContainerStack, mode: str) -> Markup:
+        version = self.storage.stack_version(stack.name)
+        cached = self._fragments.get(stack.name)
+        if cached is not None and cached[0] == version and cached[1] == mode:
+            return cached[2]
+        html = Markup(
+            self.stack_template.render(stack=stack, mode=mode, version=version)
+        )
+        self._fragments[stack.name] = (version, mode, html)
+        return html
+
+    def crane_fragment(self) -> Markup:
+        columns = max((len(row) for row in self.layout()), default=1)
+        return Markup(
+            self.crane_template.render(crane=self.storage.crane, columns=columns)
+        )
+
+    def table(self, mode: str) -> str:
+        with self.storage.lock:
+            rows = [
+                [None if stack is None else self.fragment(stack, mode) for stack in row]
+                for row in self.layout()
+            ]
+            return self.yard_template.render(rows=rows, crane=self.crane_fragment())
+
+    def render(self, mode: str, since: int = 0, layout: str = "") -> dict[str, Any]:
+        """the changes since `since` for a client showing layout `layout`"""
+        with self.storage.lock:
+            key = self.layout_key(mode)
+            body: dict[str, Any] = {"version": self.storage.version, "layout": key}
+            if layout != key:
+                body["html"] = self.table(mode)
+                return body
+            body["stacks"] = {
+                stack.name: self.fragment(stack, mode)
+                for stack in self.storage.stacks
+                if self.storage.stack_version(stack.name) > since
+            }
+            if self.storage.crane_version > since:
+                body["crane"] = self.crane_fragment()
+            return body
@@ -0,0 +1,53 @@
+import json
+
+from tams.alarm.alarm import AlarmStore, RateLimiter, parse_alarm
+from tams.ccs.ccs import CCS
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.msg import Messages
+
+
+def test_parse_alarm() -> None:
+    alarm = parse_alarm(
+        b'{"alarmCode": 17, "message": "spreader fault", "level": "warning"}',
+        "K1",
+        now=5.0,
+    )
+    assert (alarm.code, alarm.source, alarm.severity) == ("17", "K1", "warning")
+    assert alarm.text == "spreader fault" and alarm.first == alarm.last == 5.0
+    raw = parse_alarm(b"power \xff low\n", "K1")
+    assert raw.code == "unknown" and raw.text == "power � low"
+
+
+def test_alarm_store_dedups_and_rate_limits() -> None:
+    store = AlarmStore(window=10.0, limiter=RateLimiter(rate=1.0, burst=2))
+    assert store.add(parse_alarm('{"code": "a"}', "K1", now=0.0))
+    for now in range(1, 100):
+        assert not store.add(parse_alarm('{"code": "a"}', "K1", now=now / 10))
+    alarms = store.query()
+    assert len(alarms) == 1 and alarms[0]["count"] == 100
+    # a burst of two new alarms, then one per second
+    assert store.add(parse_alarm('{"code": "b"}', "K1", now=10.0))
+    assert store.add(parse_alarm('{"code": "c"}', "K1", now=10.0))
+    assert not store.add(parse_alarm('{"code": "d"}', "K1", now=10.0))
+    assert store.add(parse_alarm('{"code": "e"}', "K1", now=11.0))
+    assert store.suppressed == 1
+    # after the window a repeat is a new alarm
+    assert store.add(parse_alarm('{"code": "a"}', "K1", now=30.0))
+    assert [alarm["code"] for alarm in store.query()] == ["a", "e", "d", "c", "b"]
+    assert [alarm["code"] for alarm in store.query(since=10.5)] == ["a", "e"]
+    assert store.query(code="d")[0]["count"] == 1
+
+
+def test_alarm_post_floods_one_message() -> None:
+    messages = Messages()
+    ccs = CCS(TamsJobState(TamsStorage()), messages, Metric(), name="K1")
+    client = ccs.app.test_client()
+    for _ in range(50):
+        client.post("/alarm", data='{"code": 3, "text": "door open"}')
+    msgs = json.loads(messages.get_msgs_json())["msg"]
+    assert [(msg["title"], msg["text"]) for msg in msgs] == [
+        ("CCS alarm K1 3", "door open")
+    ]
+    assert ccs.alarms.query()[0]["count"] == 50
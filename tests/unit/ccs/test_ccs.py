@@ -0,0 +1,55 @@
+import time
+from threading import Thread
+from unittest.mock import MagicMock
+
+import requests
+from pytest_mock import MockerFixture
+
+from tams.ccs.ccs import CCS
+from tams.ccs.types import CCSCraneDetails, CCSJob
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.msg import Messages
+
+
+def ccs_with_mocked_client(mocker: MockerFixture) -> tuple[CCS, MagicMock]:
+    ccs = CCS(TamsJobState(TamsStorage()), Messages(), Metric(), details_interval=60.0)
+    client = mocker.patch.object(ccs.dispatch, "client")
+    client.get.return_value = MagicMock(
+        status_code=200, text=CCSCraneDetails().to_json()
+    )
+    client.post.return_value = MagicMock(status_code=200, text="OK")
+    return ccs, client
+
+
+def test_new_job_is_dispatched_without_waiting_for_tick(
+    mocker: MockerFixture,
+) -> None:
+    ccs, client = ccs_with_mocked_client(mocker)
+    worker = Thread(target=ccs.worker_state, daemon=True)
+    worker.start()
+    time.sleep(0.05)
+    assert client.get.call_count == 1
+
+    start = time.monotonic()
+    ccs.state.set_new_job(CCSJob().to_json())
+    while not ccs.state.has_job() and time.monotonic() - start < 2:
+        time.sleep(0.001)
+    assert ccs.state.has_job()
+    assert time.monotonic() - start < 0.5
+    # details keep their own cadence
+    assert client.get.call_count == 1
+
+    ccs.shutdown()
+    worker.join(1)
+    assert not worker.is_alive()
+
+
+def test_tick_backs_off_after_connection_error(mocker: MockerFixture) -> None:
+    ccs, client = ccs_with_mocked_client(mocker)
+    client.get.side_effect = requests.ConnectionError
+    delay = ccs.tick()
+    assert delay >= 1.0
+    assert ccs.tick() > 0
+    assert client.get.call_count == 1
@@ -0,0 +1,11 @@
+from tams.ccs.client import Backoff
+
+
+def test_backoff_grows_with_jitter_and_resets() -> None:
+    backoff = Backoff(base=1.0, cap=8.0)
+    delays = [backoff.failure() for _ in range(5)]
+    assert 1.0 <= delays[0] <= 2.0
+    assert 2.0 <= delays[1] <= 4.0
+    assert all(4.0 <= delay <= 8.0 for delay in delays[2:])
+    assert backoff.success() == 1.0
+    assert 1.0 <= backoff.failure() <= 2.0
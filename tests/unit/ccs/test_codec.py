@@ -0,0 +1,50 @@
+from marshmallow import ValidationError
+from pytest import mark, raises
+
+from tams.ccs.codec import from_json, to_json
+from tams.ccs.types import CCSCraneDetails, CCSFeature, CCSJob, CCSJobState
+
+
+@mark.parametrize(
+    "obj",
+    [
+        CCSJob(),
+        CCSJob(type="pick"),
+        CCSJobState(),
+        CCSCraneDetails(),
+        CCSCraneDetails(features=[CCSFeature(), CCSFeature(vendor="Kranbau")]),
+    ],
+)
+def test_codec_matches_dataclasses_json(obj: object) -> None:
+    assert to_json(obj) == obj.to_json()  # type: ignore[attr-defined]
+    assert from_json(type(obj), obj.to_json()) == obj  # type: ignore[attr-defined]
+
+
+def test_codec_defaults_and_unknown_fields() -> None:
+    job = from_json(CCSJob, '{"type": "drop", "metadata": {"guid": "x"}}')
+    assert job.type == "drop"
+    assert job.target == CCSJob().target
+    assert from_json(CCSJob, '{"target": {"x": "7", "y": 2.0}}').target.x == 7
+
+
+@mark.parametrize(
+    "text",
+    [
+        "[]",
+        '{"type": 5}',
+        '{"type": null}',
+        '{"target": 5}',
+        '{"target": {"x": 1.5}}',
+        '{"target": {"x": true}}',
+        '{"unit": {"piggyBack": "maybe"}}',
+    ],
+)
+def test_codec_raises_validation_error(text: str) -> None:
+    with raises(ValidationError):
+        from_json(CCSJob, text)
+
+
+def test_codec_nested_list_errors() -> None:
+    with raises(ValidationError) as error:
+        from_json(CCSCraneDetails, '{"features": [{}, {"type": 1}]}')
+    assert error.value.messages == {"features": {1: {"type": ["Not a valid string."]}}}
@@ -0,0 +1,113 @@
+import asyncio
+from threading import Event
+
+from pytest import raises
+
+from tams.ccs.ccs import CCS
+from tams.ccs.supervisor import CCSSupervisor
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.msg import Messages
+
+
+def crane(supervisor: CCSSupervisor, name: str) -> CCS:
+    return CCS(
+        TamsJobState(TamsStorage()),
+        Messages(),
+        Metric(),
+        ccs_url=f"http://{name}:9999",
+        name=name,
+        app=supervisor.app,
+    )
+
+
+def test_supervisor_ticks_all_cranes_on_one_loop() -> None:
+    supervisor = CCSSupervisor()
+    ticks: dict[str, int] = {"a": 0, "b": 0}
+    for name in ticks:
+        ccs = crane(supervisor, name)
+
+        def tick(name: str = name) -> float:
+            ticks[name] += 1
+            if min(ticks.values()) >= 3:
+                supervisor.shutdown()
+            return 0.001
+
+        ccs.tick = tick  # type: ignore[method-assign]
+        supervisor.add_crane(ccs)
+
+    asyncio.run(asyncio.wait_for(supervisor.supervise(), 5))
+    assert min(ticks.values()) >= 3
+
+
+def test_supervisor_routes_callbacks_per_crane() -> None:
+    supervisor = CCSSupervisor()
+    supervisor.add_crane(crane(supervisor, "a"))
+    supervisor.add_crane(crane(supervisor, "b"))
+    client = supervisor.app.test_client()
+    assert client.post("/crane/a/alarm", data=b"fault").status_code == 200
+    assert client.post("/crane/b/alarm", data=b"fault").status_code == 200
+    assert client.post("/crane/c/alarm", data=b"fault").status_code == 404
+
+
+def test_supervisor_rejects_duplicate_crane() -> None:
+    supervisor = CCSSupervisor()
+    supervisor.add_crane(crane(supervisor, "a"))
+    with raises(ValueError):
+        supervisor.add_crane(supervisor.cranes["a"])
+    with raises(ValueError):
+        supervisor.add_crane(CCS(TamsJobState(TamsStorage()), Messages(), Metric()))
+
+
+def test_supervisor_keeps_running_when_a_crane_fails() -> None:
+    supervisor = CCSSupervisor()
+    ticks: dict[str, int] = {"bad": 0, "good": 0}
+    for name in ticks:
+        ccs = crane(supervisor, name)
+        ccs.dispatch.backoff.base = ccs.dispatch.backoff.cap = 0.001
+
+        def tick(name: str = name) -> float:
+            ticks[name] += 1
+            if min(ticks.values()) >= 3:
+                supervisor.shutdown()
+            if name == "bad":
+                raise ValueError("bad json")
+            return 0.001
+
+        ccs.tick = tick  # type: ignore[method-assign]
+        supervisor.add_crane(ccs)
+
+    asyncio.run(asyncio.wait_for(supervisor.supervise(), 5))
+    assert min(ticks.values()) >= 3
+
+
+def test_supervisor_hung_cranes_do_not_delay_the_others() -> None:
+    supervisor = CCSSupervisor()
+    released = Event()
+    ticks = 0
+
+    def hang() -> float:
+        # a crane not answering until its timeouts
+        released.wait(5)
+        return 0.001
+
+    for index in range(5):
+        ccs = crane(supervisor, f"hung{index}")
+        ccs.tick = hang  # type: ignore[method-assign]
+        supervisor.add_crane(ccs)
+    healthy = crane(supervisor, "healthy")
+
+    def tick() -> float:
+        nonlocal ticks
+        ticks += 1
+        if ticks >= 3:
+            supervisor.shutdown()
+            released.set()
+        return 0.001
+
+    healthy.tick = tick  # type: ignore[method-assign]
+    supervisor.add_crane(healthy)
+
+    asyncio.run(asyncio.wait_for(supervisor.supervise(), 2))
+    assert ticks >= 3
@@ -0,0 +1,49 @@
+import json
+
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSJob, CCSUnit
+from tams.event.event import EventBus, ServerEvent
+from tams.storage.storage import TamsStorage
+
+
+def test_server_event_encode_multiline() -> None:
+    event = ServerEvent("metric", '{\n"a": 1\n}')
+    assert event.encode() == 'event: metric\ndata: {\ndata: "a": 1\ndata: }\n\n'
+
+
+def test_event_bus_fan_out() -> None:
+    bus = EventBus()
+    first = bus.subscribe()
+    second = bus.subscribe()
+    bus.publish("message", {"title": "t"})
+    assert first.get_nowait().data == second.get_nowait().data == '{"title": "t"}'
+    bus.unsubscribe(first)
+    bus.publish("message", "x")
+    assert first.empty()
+    assert second.get_nowait().data == "x"
+
+
+def test_event_bus_resets_slow_subscriber() -> None:
+    bus = EventBus(queue_size=2)
+    queue = bus.subscribe()
+    for i in range(3):
+        bus.publish("message", str(i))
+    assert queue.get_nowait().type == "reset"
+    assert queue.empty()
+
+
+def test_storage_publishes_deltas() -> None:
+    bus = EventBus()
+    storage = TamsStorage(events=bus)
+    queue = bus.subscribe()
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container1"))
+    )
+    stack_event = queue.get_nowait()
+    unit_event = queue.get_nowait()
+    assert stack_event.type == "stack"
+    assert json.loads(stack_event.data)["name"] == "A1"
+    assert json.loads(stack_event.data)["container"] == []
+    assert unit_event.type == "container"
+    assert json.loads(unit_event.data)["stack"] == "crane"
+    assert queue.empty()
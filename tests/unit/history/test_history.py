@@ -0,0 +1,82 @@
+from pathlib import Path
+
+from pytest import fixture
+
+from tams.ccs.codec import to_dict, to_json
+from tams.ccs.enums import CCSJobStatus
+from tams.ccs.types import CCSJob, CCSJobState, CCSUnit
+from tams.history.history import JobHistory
+from tams.metric.metric import Metric
+from tams.state.queue import job_id
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.web import Web
+
+
+@fixture
+def history(tmp_path: Path) -> JobHistory:
+    return JobHistory(tmp_path.joinpath("history.db"))
+
+
+def test_history_records_job_lifecycle(history: JobHistory) -> None:
+    state = TamsJobState(TamsStorage(), history=history, name="K1")
+    job = CCSJob(unit=CCSUnit(number="Container1"))
+    state.set_new_job(to_json(job))
+    state.set_new_job(to_json(CCSJob(unit=CCSUnit(number="Container2"))))
+    state.ack_new_job(job)
+    state.set_new_state(to_json(CCSJobState(jobStatus=CCSJobStatus.INPROGRESS)))
+    state.set_new_state(to_json(CCSJobState(jobStatus=CCSJobStatus.DONE)))
+
+    page = history.query(unit="Container1")
+    assert [item["event"] for item in page["items"]] == [
+        "done",
+        "state",
+        "state",
+        "dispatch",
+        "enqueue",
+    ]
+    assert {item["job_id"] for item in page["items"]} == {job_id(job)}
+    assert page["items"][1]["state"]["jobStatus"] == CCSJobStatus.DONE
+    assert page["items"][0]["job"]["unit"]["number"] == "Container1"
+    assert page["next"] is None
+    assert len(history.query(crane="K1")["items"]) == 6
+    assert history.query(crane="K2")["items"] == []
+
+
+def test_history_pages(history: JobHistory) -> None:
+    for index in range(5):
+        history.record("K1", "enqueue", CCSJob(unit=CCSUnit(number=str(index))))
+    first = history.query(limit=2)
+    assert [item["unit"] for item in first["items"]] == ["4", "3"]
+    second = history.query(limit=2, before=first["next"])
+    assert [item["unit"] for item in second["items"]] == ["2", "1"]
+    last = history.query(limit=2, before=second["next"])
+    assert [item["unit"] for item in last["items"]] == ["0"]
+    assert last["next"] is None
+    until = first["items"][0]["time"]
+    assert len(history.query(since=0, until=until)["items"]) == 4
+
+
+def test_history_get(history: JobHistory) -> None:
+    storage = TamsStorage()
+    web = Web(TamsJobState(storage, history=history), storage, Metric())
+    web.state.set_new_job(to_json(CCSJob(unit=CCSUnit(number="Container3"))))
+    client = web.app.test_client()
+    response = client.get("/history", query_string={"unit": "Container3"})
+    assert response.json["items"][0]["event"] == "enqueue"
+    assert response.json["items"][0]["crane"] == "PSKran"
+    web.state.observers.history = None
+    assert client.get("/history").status_code == 404
+
+
+def test_history_bulk_enqueue_is_one_transaction(history: JobHistory) -> None:
+    state = TamsJobState(TamsStorage(), history=history, name="K1")
+    jobs = [CCSJob(unit=CCSUnit(number=f"Container{index}")) for index in (1, 2, 3)]
+    statements: list[str] = []
+    history.conn.set_trace_callback(statements.append)
+    results = state.set_new_jobs([*map(to_dict, jobs), {"type": 1}])
+    history.conn.set_trace_callback(None)
+    assert [result["result"] for result in results] == ["OK", "OK", "OK", "invalid"]
+    assert sum(statement == "COMMIT" for statement in statements) == 1
+    items = history.query(crane="K1")["items"]
+    assert [item["job_id"] for item in reversed(items)] == [job_id(job) for job in jobs]
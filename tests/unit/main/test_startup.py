@@ -0,0 +1,124 @@
+"""startup benchmark, run with -s to see the timings"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+import tams
+from tams.main import get_args
+
+SRC_PATH = Path(tams.__file__).resolve().parent.parent
+# generous, only catches a regression by an order of magnitude
+IMPORT_BUDGET = 1.0
+FIRST_REQUEST_BUDGET = 10.0
+HEAVY_MODULES = ("flask", "werkzeug", "requests", "marshmallow", "dataclasses_json")
+
+IMPORT_CODE = f"""
+import json, sys, time
+start = time.perf_counter()
+import tams.main
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))
+"""
+
+ARGS_CODE = """
+import json, sys
+sys.argv = ["tams", "--crane", "a=127.0.0.1", "--scheduler", "nearest"]
+import tams.main
+tams.main.get_args()
+# the job state, with its timings, is built before the web apps
+import tams.state.state
+print(json.dumps("flask" in sys.modules))
+"""
+
+
+def port_in_use(port: int) -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def get_status(url: str) -> int | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return int(response.status)
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return None
+
+
+def test_startup_import_is_lazy() -> None:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_CODE],
+        env={**os.environ, "PYTHONPATH": str(SRC_PATH)},
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    elapsed, loaded = json.loads(output.splitlines()[-1])
+    print(f"[STARTUP] import tams.main {elapsed * 1000:.1f} ms")
+    assert not loaded
+    assert elapsed < IMPORT_BUDGET
+
+
+def test_startup_get_args_does_not_import_flask() -> None:
+    output = subprocess.run(
+        [sys.executable, "-c", ARGS_CODE],
+        env={**os.environ, "PYTHONPATH": str(SRC_PATH)},
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert json.loads(output.splitlines()[-1]) is False
+
+
+def test_get_args_rejects_negative_tolerance(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr(sys, "argv", ["tams", "--tolerance", "0"])
+    assert get_args().tolerance == 0
+    monkeypatch.setattr(sys, "argv", ["tams", "--tolerance", "-1"])
+    with pytest.raises(SystemExit):
+        get_args()
+    assert "expected a distance in mm >= 0" in capsys.readouterr().err
+
+
+def test_startup_time_to_first_request(tmp_path: Path) -> None:
+    if port_in_use(7000) or port_in_use(9998):
+        pytest.skip("tams ports are in use")
+    start = time.perf_counter()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "tams.main", "--history", ""],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(SRC_PATH)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        timings = {}
+        for name in ("health", "ready"):
+            while get_status(f"http://127.0.0.1:7000/{name}") != 200:
+                assert process.poll() is None, "tams exited"
+                assert time.perf_counter() - start < FIRST_REQUEST_BUDGET
+                time.sleep(0.01)
+            timings[name] = time.perf_counter() - start
+        print(
+            f"[STARTUP] first /health {timings['health'] * 1000:.0f} ms, "
+            f"/ready {timings['ready'] * 1000:.0f} ms"
+        )
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
@@ -0,0 +1,76 @@
+import json
+import math
+
+from tams.metric.metric import Metric
+from tams.metric.series import MetricSeries, percentile
+
+
+def blob(**values: float) -> bytes:
+    return json.dumps(
+        {"metrics": [{"name": name, "value": value} for name, value in values.items()]}
+    ).encode()
+
+
+def test_series_is_bounded_ring_buffer() -> None:
+    series = MetricSeries(capacity=3)
+    for second in range(5):
+        series.append(float(second), float(second * 10))
+    assert series.count == 3
+    assert series.last() == 40.0
+    assert series.window(0.0) == [20.0, 30.0, 40.0]
+    assert series.window(3.0) == [30.0, 40.0]
+
+
+def test_series_aggregate() -> None:
+    series = MetricSeries()
+    for value in range(1, 101):
+        series.append(float(value), float(value))
+    aggregate = series.aggregate(51.0)
+    assert aggregate.count == 50
+    assert aggregate.min == 51.0
+    assert aggregate.max == 100.0
+    assert aggregate.avg == 75.5
+    assert aggregate.p50 == 75.0
+    assert aggregate.p99 == 100.0
+    assert percentile([1.0], 90) == 1.0
+
+
+def test_metric_records_numeric_values() -> None:
+    metric = Metric()
+    metric.set_metrics(blob(CraneCoordinatesX=100, StatusPowerOn=True))
+    metric.set_metrics(blob(CraneCoordinatesX=300))
+    metric.set_metrics(b"not json")
+    assert metric.get_metrics() == b"not json"
+    aggregate = metric.aggregate("CraneCoordinatesX", 60)
+    assert aggregate is not None and aggregate.avg == 200.0
+    assert metric.aggregate("unknown", 60) is None
+
+
+def test_series_aggregate_of_empty_window_is_nan() -> None:
+    series = MetricSeries()
+    series.append(1.0, 10.0)
+    aggregate = series.aggregate(2.0)
+    assert aggregate.count == 0
+    assert math.isnan(aggregate.min) and math.isnan(aggregate.p99)
+
+
+def test_metric_prometheus_export_of_empty_window() -> None:
+    metric = Metric(windows=(60,))
+    metric.record(blob(CraneCoordinatesX=100), timestamp=0.0)
+    text = metric.get_prometheus()
+    labels = 'metric="CraneCoordinatesX",window="60s"'
+    assert f'tams_metric_window{{{labels},quantile="0.5"}} NaN' in text
+    assert f"tams_metric_window_min{{{labels}}} NaN" in text
+    assert f"tams_metric_window_sum{{{labels}}} 0.0" in text
+    assert f"tams_metric_window_count{{{labels}}} 0" in text
+
+
+def test_metric_prometheus_export() -> None:
+    metric = Metric(windows=(60,))
+    metric.set_metrics(blob(CraneCoordinatesX=100))
+    text = metric.get_prometheus()
+    assert 'tams_metric{metric="CraneCoordinatesX"} 100.0' in text
+    assert 'tams_metric_window_count{metric="CraneCoordinatesX",window="60s"} 1' in text
+    assert text.index("# TYPE tams_metric_window summary") < text.index(
+        "tams_metric_window_sum"
+    )
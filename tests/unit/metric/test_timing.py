@@ -0,0 +1,58 @@
+from flask import Flask
+
+from tams.ccs.types import CCSJob
+from tams.metric.metric import Metric
+from tams.metric.timing import LatencyHistogram, Timings
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+
+
+def test_histogram_quantiles() -> None:
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.05, 0.5, 5.0):
+        histogram.observe(seconds)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(50) == 0.1
+    assert histogram.quantile(75) == 1.0
+    assert histogram.quantile(100) == float("inf")
+
+
+def test_disabled_timings_record_nothing() -> None:
+    timings = Timings()
+    app = Flask("test")
+    app.add_url_rule("/", "index", lambda: "OK")
+    timings.instrument(app, "web")
+    app.test_client().get("/")
+    timings.job_stage("job", "enqueue")
+    assert timings.as_dict()["histograms"] == {}
+    assert not timings.jobs
+
+
+def test_endpoint_latency() -> None:
+    timings = Timings(enabled=True)
+    app = Flask("test")
+    app.add_url_rule("/", "index", lambda: "OK")
+    timings.instrument(app, "web")
+    app.test_client().get("/")
+    assert timings.as_dict()["histograms"]["web index"]["count"] == 1
+
+
+def test_job_lifecycle_spans() -> None:
+    metric = Metric(timings=Timings(enabled=True))
+    state = TamsJobState(TamsStorage(), timings=metric.timings)
+    job = CCSJob()
+    state.set_new_job(job.to_json())
+    metric.timings.job_stage(job.metadata.eventId, "dispatch")
+    state.ack_new_job()
+    state.set_new_state('{"jobStatus": "done"}')
+    histograms = metric.timings.as_dict()["histograms"]
+    assert set(histograms) == {
+        "job enqueue->dispatch",
+        "job dispatch->ack",
+        "job ack->done",
+        "job enqueue->done",
+    }
+    assert not metric.timings.jobs
+    assert 'tams_latency_seconds_count{name="job ack->done"} 1' in (
+        metric.get_prometheus()
+    )
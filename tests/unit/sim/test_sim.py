@@ -0,0 +1,67 @@
+import json
+
+from pytest import fixture
+from pytest_mock import MockerFixture
+
+from tams.ccs.codec import from_json, to_json
+from tams.ccs.enums import CCSJobStatus
+from tams.ccs.types import CCSCoordinates, CCSCraneDetails, CCSJob, CCSJobState
+from tams.sim.sim import CraneSimulator, SimConfig
+from tams.state.queue import job_id
+
+
+@fixture
+def sim() -> CraneSimulator:
+    return CraneSimulator(SimConfig(speed=1000.0, handling_time=0.0))
+
+
+def test_sim_accepts_one_job_at_a_time(sim: CraneSimulator) -> None:
+    client = sim.app.test_client()
+    job = CCSJob(target=CCSCoordinates(1000, 0, 0))
+    assert client.post("/job", data=to_json(job)).status_code == 200
+    assert client.post("/job", data=to_json(CCSJob())).status_code == 409
+    assert client.post("/job", data="{").status_code == 405
+    assert job_id(job) in sim.state.log
+    details = client.get("/details")
+    assert from_json(CCSCraneDetails, details.data).features
+
+
+def test_sim_run_job_reports_done(sim: CraneSimulator, mocker: MockerFixture) -> None:
+    post = mocker.patch.object(sim, "post")
+    job = CCSJob(target=CCSCoordinates(1000, 700, 0))
+    sim.app.test_client().post("/job", data=to_json(job))
+    sim.run_job(job)
+    states = [from_json(CCSJobState, call.args[1]) for call in post.call_args_list]
+    assert [state.jobStatus for state in states] == [
+        CCSJobStatus.INPROGRESS,
+        CCSJobStatus.DONE,
+    ]
+    assert sim.state.job is None and sim.state.jobs_done == 1
+    assert sim.state.position == job.target
+    assert "done" in sim.state.log[job_id(job)]
+
+
+def test_sim_cancel_stops_job(sim: CraneSimulator, mocker: MockerFixture) -> None:
+    post = mocker.patch.object(sim, "post")
+    job = CCSJob(target=CCSCoordinates(1000, 0, 0))
+    client = sim.app.test_client()
+    client.post("/job", data=to_json(job))
+    client.post("/job_cancel")
+    sim.run_job(job)
+    assert json.loads(post.call_args.args[1])["jobStatus"] == CCSJobStatus.STOPPED
+    assert sim.state.jobs_done == 0 and job_id(job) not in sim.state.log
+
+
+def test_sim_metric_uses_ccs_names(mocker: MockerFixture) -> None:
+    simulator = CraneSimulator(SimConfig(metric_interval=0.0))
+    post = mocker.patch.object(
+        simulator, "post", side_effect=lambda *_: simulator.shutdown_event.set()
+    )
+    simulator.state.position = CCSCoordinates(1000, 700, 5)
+    simulator.worker_metric()
+    path, data = post.call_args_list[0].args
+    values = {entry["name"]: entry["value"] for entry in json.loads(data)["metrics"]}
+    assert path == "/metric"
+    assert values["CraneCoordinatesX"] == 1000
+    assert values["CraneCoordinatesY"] == 700
+    assert values["CraneCoordinatesZ"] == 5
@@ -0,0 +1,92 @@
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.state.scheduler import (
+    JobScheduler,
+    NearestJobScheduler,
+    PendingJobs,
+    ScheduleContext,
+    TravelModel,
+)
+
+
+def job(type_: str, x: int, unit: str = "U1") -> CCSJob:
+    return CCSJob(type=type_, target=CCSCoordinates(x, 0, 0), unit=CCSUnit(number=unit))
+
+
+def test_travel_model_gantry_and_trolley_in_parallel() -> None:
+    travel = TravelModel(gantry_speed=1000, trolley_speed=500, hoist_speed=100)
+    assert travel.cost(CCSCoordinates(0, 0, 0), CCSCoordinates(2000, 500, 100)) == 3.0
+
+
+def test_fifo_scheduler_keeps_order() -> None:
+    jobs = [job(CCSJobType.PICK, 9000), job(CCSJobType.PICK, 0)]
+    context = ScheduleContext(CCSCoordinates(0, 0, 0), None)
+    assert JobScheduler().select(jobs, context) is jobs[0]
+
+
+def test_nearest_scheduler_prefers_short_pick_drop_pair() -> None:
+    far_pick = job(CCSJobType.PICK, 1000, "far")
+    far_drop = job(CCSJobType.DROP, 20000, "far")
+    near_pick = job(CCSJobType.PICK, 2000, "near")
+    near_drop = job(CCSJobType.DROP, 3000, "near")
+    jobs = [far_pick, far_drop, near_pick, near_drop]
+    scheduler = NearestJobScheduler()
+    assert scheduler.select(jobs, ScheduleContext(CCSCoordinates(0, 0, 0), None)) is (
+        near_pick
+    )
+    # loaded crane only takes the drop of its unit
+    loaded = ScheduleContext(CCSCoordinates(2000, 0, 0), CCSUnit(number="near"))
+    assert scheduler.select(jobs, loaded) is near_drop
+
+
+def test_nearest_scheduler_does_not_starve_head() -> None:
+    scheduler = NearestJobScheduler(max_skips=2)
+    head = job(CCSJobType.MOVE, 50000)
+    context = ScheduleContext(CCSCoordinates(0, 0, 0), None)
+    for _ in range(2):
+        near = job(CCSJobType.MOVE, 0)
+        assert scheduler.select([head, near], context) is near
+        scheduler.dispatched(near, head)
+    assert scheduler.select([head, job(CCSJobType.MOVE, 0)], context) is head
+
+
+def test_nearest_scheduler_select_does_not_count_skips() -> None:
+    scheduler = NearestJobScheduler(max_skips=2)
+    head, near = job(CCSJobType.MOVE, 50000), job(CCSJobType.MOVE, 0)
+    context = ScheduleContext(CCSCoordinates(0, 0, 0), None)
+    # peeks only, nothing was dispatched past the head
+    for _ in range(5):
+        assert scheduler.select([head, near], context) is near
+    assert scheduler.head_skips == 0
+
+
+def test_nearest_scheduler_without_position_is_fifo() -> None:
+    jobs = [job(CCSJobType.MOVE, 9000), job(CCSJobType.MOVE, 0)]
+    assert NearestJobScheduler().select(jobs, ScheduleContext(None, None)) is jobs[0]
+
+
+def test_nearest_scheduler_forced_head_keeps_pick_drop_pair() -> None:
+    scheduler = NearestJobScheduler(max_skips=2)
+    head = job(CCSJobType.PICK, 50000, "far")
+    context = ScheduleContext(CCSCoordinates(0, 0, 0), None)
+    for _ in range(2):
+        near = job(CCSJobType.MOVE, 0)
+        assert scheduler.select([head, near], context) is near
+        scheduler.dispatched(near, head)
+    # the crane picked "near" meanwhile, its drop goes before the far pick
+    loaded = ScheduleContext(CCSCoordinates(0, 0, 0), CCSUnit(number="near"))
+    near_drop = job(CCSJobType.DROP, 1000, "near")
+    assert scheduler.select([head, near_drop], loaded) is near_drop
+    assert scheduler.select([head, near_drop], context) is head
+
+
+def test_pending_jobs_dispatched_moves_the_crane() -> None:
+    pending = PendingJobs(NearestJobScheduler())
+    far, near = job(CCSJobType.MOVE, 9000, "far"), job(CCSJobType.MOVE, 1000, "near")
+    pending.queue.push(far)
+    pending.queue.push(near)
+    # no position yet, so the oldest job goes first
+    assert pending.next(None) is far
+    pending.dispatched(far)
+    assert pending.position == far.target
+    assert list(pending.queue) == [near]
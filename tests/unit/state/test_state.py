@@ -1,11 +1,14 @@
 from datetime import date
+from threading import Thread
+from typing import Any
 from unittest.mock import MagicMock, patch
 
 from pytest import fixture
 from pytest_mock import MockerFixture
 
-from tams.ccs.enums import CCSJobStatus
-from tams.ccs.types import CCSJob, CCSJobState
+from tams.ccs.enums import CCSJobStatus, CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSJobState, CCSUnit
+from tams.state.queue import job_id
 from tams.state.state import TamsJobState
 from tams.storage.storage import TamsStorage
 
@@ -73,3 +76,135 @@ def test_job_state_get_pending_jobs_as_json(storage: MagicMock) -> None:
     assert state.get_pending_jobs_as_json() == "{}"
     state.set_new_job(job_json=job_json())
     assert state.get_pending_jobs_as_json() != "{}"
+
+
+def test_job_state_priority_before_fifo(storage: MagicMock) -> None:
+    state = TamsJobState(storage)
+    first, second, urgent = CCSJob(), CCSJob(), CCSJob()
+    state.set_new_job(job_json=first.to_json())
+    state.set_new_job(job_json=second.to_json())
+    state.set_new_job(job_json=urgent.to_json(), priority=1)
+    order = [job.metadata.eventId for job in state.get_pending_jobs()]
+    assert order == [
+        urgent.metadata.eventId,
+        first.metadata.eventId,
+        second.metadata.eventId,
+    ]
+
+
+def test_job_state_rejects_duplicate_job_id(storage: MagicMock) -> None:
+    state = TamsJobState(storage)
+    job = job_json()
+    assert state.set_new_job(job_json=job) == "OK"
+    assert state.set_new_job(job_json=job) == "has job"
+
+
+def test_job_state_cancel_and_reprioritize_by_id(storage: MagicMock) -> None:
+    state = TamsJobState(storage)
+    first, second = CCSJob(), CCSJob()
+    state.set_new_job(job_json=first.to_json())
+    state.set_new_job(job_json=second.to_json())
+    assert state.set_pending_job_priority(second.metadata.eventId, 5)
+    peeked = state.peek_new_job()
+    assert peeked is not None and peeked.metadata.eventId == second.metadata.eventId
+    assert state.cancel_pending_job(second.metadata.eventId)
+    assert not state.cancel_pending_job(second.metadata.eventId)
+    assert [job.metadata.eventId for job in state.get_pending_jobs()] == [
+        first.metadata.eventId
+    ]
+
+
+def test_job_state_ack_sent_job_after_clear(storage: MagicMock) -> None:
+    state = TamsJobState(storage)
+    state.set_new_job(job_json=job_json())
+    sent = state.peek_new_job()
+    assert sent is not None
+    state.clear_pending_jobs()
+    state.ack_new_job(sent)
+    assert state.has_job()
+    assert not state.has_pending_jobs()
+
+
+def test_job_state_concurrent_enqueue(storage: MagicMock) -> None:
+    state = TamsJobState(storage)
+
+    def enqueue() -> None:
+        for _ in range(200):
+            state.set_new_job(job_json=job_json())
+
+    threads = [Thread(target=enqueue) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(state.get_pending_jobs()) == 800
+    ids = {job.metadata.eventId for job in state.get_pending_jobs()}
+    assert len(ids) == 800
+
+
+def test_job_state_set_new_jobs_tracks_crane(storage: TamsStorage) -> None:
+    state = TamsJobState(storage)
+    unit = CCSUnit(number="Container1")
+    pick = CCSJob(type=CCSJobType.PICK, unit=unit)
+    drop = CCSJob(type=CCSJobType.DROP, target=CCSCoordinates(2000, 0, 0), unit=unit)
+    entries = [
+        pick.to_dict(),
+        drop.to_dict(),
+        CCSJob(
+            type=CCSJobType.DROP, target=CCSCoordinates(2000, 0, 0), unit=unit
+        ).to_dict(),
+        pick.to_dict(),
+        {"type": 1},
+    ]
+    results = state.set_new_jobs(entries)
+    # the pick loads the crane for the drop, the second drop finds it empty
+    assert [result["result"] for result in results] == [
+        "OK",
+        "OK",
+        "invalid",
+        "has job",
+        "invalid",
+    ]
+    assert results[4]["error"] == {"type": ["Not a valid string."]}
+    assert [job_id(job) for job in state.get_pending_jobs()] == [
+        job_id(pick),
+        job_id(drop),
+    ]
+
+
+def test_job_state_set_new_jobs_checks_storage(storage: TamsStorage) -> None:
+    state = TamsJobState(storage)
+
+    def job(type_: str, number: str, pos_x: int = 0, pos_y: int = 0) -> dict[str, Any]:
+        return CCSJob(
+            type=type_,
+            target=CCSCoordinates(pos_x, pos_y, 0),
+            unit=CCSUnit(number=number),
+        ).to_dict()
+
+    results = state.set_new_jobs(
+        [
+            job(CCSJobType.PICK, "Unknown"),
+            job(CCSJobType.PICK, "Container1"),
+            job(CCSJobType.DROP, "Container1", 9000, 9000),
+            # LKW holds one unit and is full
+            job(CCSJobType.DROP, "Container1", 4000),
+            job(CCSJobType.DROP, "Container1", 0, 2000),
+            job(CCSJobType.PICK, "Container4"),
+            # the pick before freed the slot
+            job(CCSJobType.DROP, "Container4", 4000),
+        ]
+    )
+    assert [result["result"] for result in results] == [
+        "invalid",
+        "OK",
+        "invalid",
+        "invalid",
+        "OK",
+        "OK",
+        "OK",
+    ]
+    assert results[0]["error"] == "unknown unit Unknown"
+    assert results[2]["error"] == "no stack at 9000/9000"
+    assert results[3]["error"] == "stack LKW is full"
+    assert len(state.get_pending_jobs()) == 4
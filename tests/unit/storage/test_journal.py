@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from pytest import fixture
+
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.storage.journal import StorageJournal
+from tams.storage.storage import TamsStorage
+
+
+@fixture
+def journal(tmp_path: Path) -> StorageJournal:
+    return StorageJournal(
+        tmp_path.joinpath("export.journal"), tmp_path.joinpath("export.json")
+    )
+
+
+def move(storage: TamsStorage, number: str, target: CCSCoordinates) -> None:
+    storage.container_moved(CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number=number)))
+    storage.container_moved(
+        CCSJob(type=CCSJobType.DROP, target=target, unit=CCSUnit(number=number))
+    )
+
+
+def move_container1_to_b1(storage: TamsStorage) -> None:
+    move(storage, "Container1", CCSCoordinates(2000, 0, 0))
+
+
+def test_journal_replay_restores_moves(journal: StorageJournal) -> None:
+    storage = TamsStorage()
+    journal.restore(storage)
+    move_container1_to_b1(storage)
+    storage.set_stack_pos("A2", CCSCoordinates(10, 20, 30))
+    # crash: no compaction, no close
+    journal.sync()
+
+    restored = TamsStorage()
+    StorageJournal(journal.path, journal.snapshot_path).restore(restored)
+    assert restored.get_stacks_as_json() == storage.get_stacks_as_json()
+    assert restored.get_container_as_json() == storage.get_container_as_json()
+
+
+def test_journal_compact_writes_snapshot(journal: StorageJournal) -> None:
+    storage = TamsStorage()
+    journal.restore(storage)
+    move_container1_to_b1(storage)
+    journal.compact(storage)
+    assert journal.snapshot_path.is_file()
+    assert journal.path.read_text() == ""
+    storage.set_stack_pos("A2", CCSCoordinates(10, 20, 30))
+    journal.close()
+
+    restored = TamsStorage()
+    StorageJournal(journal.path, journal.snapshot_path).restore(restored)
+    assert restored.get_stacks_as_json() == storage.get_stacks_as_json()
+
+
+def test_journal_compact_crash_before_truncation(journal: StorageJournal) -> None:
+    storage = TamsStorage()
+    journal.restore(storage)
+    move(storage, "Container1", CCSCoordinates(4000, 0, 0))
+    move(storage, "Container4", CCSCoordinates(0, 4000, 0))
+    journal.sync()
+    entries = journal.path.read_text()
+    journal.compact(storage)
+    journal.close()
+    # crash: the new snapshot is in place, the journal not truncated yet
+    journal.path.write_text(entries)
+
+    restored = TamsStorage()
+    StorageJournal(journal.path, journal.snapshot_path).restore(restored)
+    assert restored.crane == storage.crane
+    assert restored.get_stacks_as_json() == storage.get_stacks_as_json()
+    assert restored.get_container_as_json() == storage.get_container_as_json()
+
+
+def test_journal_skips_torn_entry(journal: StorageJournal) -> None:
+    storage = TamsStorage()
+    journal.restore(storage)
+    move_container1_to_b1(storage)
+    journal.close()
+    with journal.path.open("a") as file:
+        file.write('{"op": "add_to_cr')
+
+    restored = TamsStorage()
+    reopened = StorageJournal(journal.path, journal.snapshot_path)
+    reopened.restore(restored)
+    assert restored.get_container_as_json() == storage.get_container_as_json()
+    restored.set_stack_pos("A2", CCSCoordinates(10, 20, 30))
+    reopened.close()
+
+    again = TamsStorage()
+    StorageJournal(journal.path, journal.snapshot_path).restore(again)
+    assert again.get_stacks_as_json() == restored.get_stacks_as_json()
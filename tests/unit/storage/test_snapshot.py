@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import tams
+from tams.storage.snapshot import SnapshotPublisher, SnapshotReader, SnapshotWriter
+from tams.storage.storage import TamsStorage
+
+
+def test_snapshot_read_before_publish(tmp_path: Path) -> None:
+    SnapshotWriter(tmp_path / "export.snap")
+    with pytest.raises(FileNotFoundError):
+        SnapshotReader(tmp_path / "export.snap").read()
+
+
+def test_snapshot_publish_and_read(tmp_path: Path) -> None:
+    writer = SnapshotWriter(tmp_path / "export.snap")
+    reader = SnapshotReader(tmp_path / "export.snap")
+    writer.publish(1, b"[1]", b"[]")
+    first = reader.read()
+    assert first == (1, b"[1]", b"[]")
+    # unchanged versions are not copied again
+    assert reader.read() is first
+    writer.publish(2, b"[2]", b"[2, 2]")
+    writer.publish(3, b"[3]", b"[3, 3, 3]")
+    assert reader.read() == (3, b"[3]", b"[3, 3, 3]")
+
+
+def test_snapshot_grows_and_readers_follow(tmp_path: Path) -> None:
+    writer = SnapshotWriter(tmp_path / "export.snap", capacity=16)
+    reader = SnapshotReader(tmp_path / "export.snap")
+    writer.publish(1, b"[]", b"[]")
+    assert reader.read().version == 1
+    big = json.dumps(list(range(100))).encode()
+    writer.publish(2, big, b"[]")
+    assert writer.capacity >= len(big)
+    assert reader.read() == (2, big, b"[]")
+    # a new writer, e.g. after a restart, retires the file of the old one
+    SnapshotWriter(tmp_path / "export.snap").publish(1, b"[0]", b"[]")
+    assert reader.read() == (1, b"[0]", b"[]")
+
+
+def test_snapshot_publisher_and_other_process(tmp_path: Path) -> None:
+    storage = TamsStorage()
+    publisher = SnapshotPublisher(storage, SnapshotWriter(tmp_path / "export.snap"))
+    assert publisher.writer.publish_storage(storage)
+    assert not publisher.writer.publish_storage(storage)
+    storage._add_container_to_crane("Container1")
+    assert publisher.writer.publish_storage(storage)
+    code = (
+        "import sys\n"
+        "from pathlib import Path\n"
+        "from tams.storage.snapshot import SnapshotReader\n"
+        "snapshot = SnapshotReader(Path(sys.argv[1])).read()\n"
+        "sys.stdout.buffer.write(snapshot.container)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code, str(tmp_path / "export.snap")],
+        env={
+            **os.environ,
+            "PYTHONPATH": str(Path(tams.__file__).resolve().parent.parent),
+        },
+        capture_output=True,
+        check=True,
+    ).stdout
+    assert output == storage.get_container_as_json().encode()
+    publisher.close()
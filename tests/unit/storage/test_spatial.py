@@ -0,0 +1,28 @@
+from tams.storage.spatial import GridIndex
+
+
+def test_grid_nearest_within_radius() -> None:
+    index: GridIndex[str] = GridIndex(500)
+    index.insert("a", 0, 0, "a")
+    index.insert("b", 2000, 0, "b")
+    index.insert("c", 2300, 150, "c")
+    assert index.nearest(12, -7, 500) == "a"
+    assert index.nearest(2200, 100, 500) == "c"
+    assert index.nearest(1000, 0, 500) is None
+    assert index.nearest(-499, 0, 500) == "a"
+    assert index.nearest(-501, 0, 500) is None
+
+
+def test_grid_move_remove_and_ties() -> None:
+    index: GridIndex[str] = GridIndex(100)
+    index.insert("a", 0, 0, "a")
+    index.insert("b", 0, 0, "b")
+    # the first inserted wins a tie, also after it moved back
+    assert index.nearest(0, 0, 10) == "a"
+    index.insert("a", 5000, 5000, "a")
+    assert index.nearest(0, 0, 10) == "b"
+    index.insert("a", 0, 0, "a")
+    assert index.nearest(0, 0, 10) == "a"
+    index.remove("a")
+    index.remove("a")
+    assert index.nearest(0, 0, 10) == "b" and len(index) == 1
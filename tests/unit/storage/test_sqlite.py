@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.storage.sqlite import (
+    SqliteStore,
+    connect_readonly,
+    free_slots_near,
+    unit_location,
+)
+from tams.storage.storage import TamsStorage
+
+
+def yard_of(storage: TamsStorage) -> dict[str, list[str]]:
+    yard = {
+        stack.name: [unit.number for unit in stack.container]
+        for stack in storage.stacks
+    }
+    yard["crane"] = [] if storage.crane is None else [storage.crane.number]
+    return yard
+
+
+def test_sqlite_store_persists_moves(tmp_path: Path) -> None:
+    path = tmp_path.joinpath("export.db")
+    storage = TamsStorage()
+    store = SqliteStore(path)
+    store.restore(storage)
+    # pick the lower of two units, the one above moves down a tier
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container2"))
+    )
+    assert store.unit_location("Container3") == ("A3", 0)
+    assert store.unit_location("Container2") == ("crane", 0)
+    storage.set_stack_pos("B1", CCSCoordinates(2000, 6000, 0))
+    storage.container_moved(
+        CCSJob(
+            type=CCSJobType.DROP,
+            target=CCSCoordinates(2000, 6000, 0),
+            unit=CCSUnit(number="Container2"),
+        )
+    )
+    store.close()
+
+    restored = TamsStorage()
+    SqliteStore(path).restore(restored)
+    assert yard_of(restored) == yard_of(storage)
+    stack = restored._get_stack_by_coordinated(CCSCoordinates(2000, 6000, 0))
+    assert stack is not None and stack.name == "B1"
+    assert restored.container[1] is restored.stacks[3].container[0]
+
+
+def test_sqlite_store_seeded_from_json_and_readable(tmp_path: Path) -> None:
+    json_path = tmp_path.joinpath("export.json")
+    seeded = TamsStorage()
+    seeded._add_container_to_crane("Container4")
+    seeded.export_json(json_path)
+
+    storage = TamsStorage()
+    store = SqliteStore(tmp_path.joinpath("export.db"))
+    store.restore(storage, json_path)
+    assert yard_of(storage) == yard_of(seeded)
+
+    reader = connect_readonly(store.path)
+    assert unit_location(reader, "Container4") == ("crane", 0)
+    assert unit_location(reader, "Container1") == ("A1", 0)
+    assert unit_location(reader, "unknown") is None
+    # A3 is out of range and LKW is full
+    assert free_slots_near(reader, 0, 500, 2500) == [("A1", 2), ("A2", 3), ("B1", 3)]
@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+from threading import Thread
+
+from pytest import fixture
+
+from tams.ccs.enums import CCSJobType
+from tams.ccs.types import CCSCoordinates, CCSJob, CCSUnit
+from tams.storage.storage import TamsStorage
+
+
+@fixture
+def storage() -> TamsStorage:
+    return TamsStorage()
+
+
+def stack_names_of(storage: TamsStorage, unit_number: str) -> list[str]:
+    return [
+        stack.name
+        for stack in storage.stacks
+        for unit in stack.container
+        if unit.number == unit_number
+    ]
+
+
+def test_storage_instances_do_not_share_stacks() -> None:
+    first = TamsStorage()
+    second = TamsStorage()
+    first.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container1"))
+    )
+    assert first.crane is not None
+    assert second.crane is None
+    assert stack_names_of(second, "Container1") == ["A1"]
+
+
+def test_storage_pick_and_drop(storage: TamsStorage) -> None:
+    assert storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container1"))
+    )
+    assert storage.crane is not None and storage.crane.number == "Container1"
+    assert not stack_names_of(storage, "Container1")
+    assert storage.container_moved(
+        CCSJob(
+            type=CCSJobType.DROP,
+            target=CCSCoordinates(2000, 0, 0),
+            unit=CCSUnit(number="Container1"),
+        )
+    )
+    assert storage.crane is None
+    assert stack_names_of(storage, "Container1") == ["B1"]
+
+
+def test_storage_drop_on_unknown_position(storage: TamsStorage) -> None:
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container1"))
+    )
+    assert not storage.container_moved(
+        CCSJob(
+            type=CCSJobType.DROP,
+            target=CCSCoordinates(1234, 0, 0),
+            unit=CCSUnit(number="Container1"),
+        )
+    )
+    assert storage.crane is not None
+
+
+def test_storage_set_stack_pos_updates_lookup(storage: TamsStorage) -> None:
+    storage.set_stack_pos("B1", CCSCoordinates(5000, 5000, 0))
+    assert storage._get_stack_by_coordinated(CCSCoordinates(2000, 0, 0)) is None
+    stack = storage._get_stack_by_coordinated(CCSCoordinates(5000, 5000, 0))
+    assert stack is not None and stack.name == "B1"
+
+
+def test_storage_import_json_rebuilds_indexes(
+    storage: TamsStorage, tmp_path: Path
+) -> None:
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container2"))
+    )
+    storage.set_stack_pos("A2", CCSCoordinates(100, 200, 0))
+    path = tmp_path.joinpath("export.json")
+    storage.export_json(path)
+
+    imported = TamsStorage()
+    imported.import_json(path)
+    assert imported.crane is not None and imported.crane.number == "Container2"
+    assert imported.container_moved(
+        CCSJob(
+            type=CCSJobType.DROP,
+            target=CCSCoordinates(100, 200, 0),
+            unit=CCSUnit(number="Container2"),
+        )
+    )
+    assert stack_names_of(imported, "Container2") == ["A2"]
+
+
+def test_storage_concurrent_moves_and_reads(storage: TamsStorage) -> None:
+    def move() -> None:
+        for _ in range(200):
+            storage._add_container_to_crane("Container1")
+            storage._add_container_to_stack("Container1", "B1")
+
+    def read() -> None:
+        for _ in range(200):
+            units = json.loads(storage.get_container_as_json())
+            assert len(units) == 4
+
+    threads = [Thread(target=move), Thread(target=read), Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stack_names_of(storage, "Container1") == ["B1"]
+
+
+def test_storage_drop_within_tolerance(storage: TamsStorage) -> None:
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container1"))
+    )
+    drop = CCSJob(
+        type=CCSJobType.DROP,
+        target=CCSCoordinates(2000 + 12, -9, 2591),
+        unit=CCSUnit(number="Container1"),
+    )
+    assert storage.container_moved(drop)
+    assert stack_names_of(storage, "Container1") == ["B1"]
+    storage._add_container_to_crane("Container1")
+    drop.target = CCSCoordinates(2000 + 600, 0, 0)
+    assert not storage.container_moved(drop)
+
+
+def recomputed_capacity(storage: TamsStorage) -> dict[str, int]:
+    return {stack.name: stack.height - len(stack.container) for stack in storage.stacks}
+
+
+def test_storage_slot_aggregates(storage: TamsStorage) -> None:
+    assert storage.capacity() == {
+        "total": 9,
+        "blocks": {"A": 6, "B": 3, "LKW": 0},
+        "stacks": recomputed_capacity(storage),
+    }
+    assert storage.top_units() == ["Container1", "Container3", "Container4"]
+    assert storage.unit_slot("Container2") == ("A3", 0)
+    assert storage.dig_depth("Container2") == 1
+    assert storage.dig_depth("unknown") is None
+
+    storage.container_moved(
+        CCSJob(type=CCSJobType.PICK, unit=CCSUnit(number="Container3"))
+    )
+    assert storage.free_total == 10
+    assert storage.top_units() == ["Container1", "Container2", "Container4"]
+    assert storage.unit_slot("Container3") is None
+    assert storage.dig_depth("Container3") == 0
+
+    storage.container_moved(
+        CCSJob(
+            type=CCSJobType.DROP,
+            target=CCSCoordinates(2000, 0, 0),
+            unit=CCSUnit(number="Container3"),
+        )
+    )
+    assert storage.free_slots_in_block("B") == 2
+    assert storage.free_slots("B1") == 2
+    assert storage.unit_slot("Container3") == ("B1", 0)
+    assert "Container3" in storage.top_units()
+    assert storage.capacity()["stacks"] == recomputed_capacity(storage)
+
+
+def test_storage_slot_aggregates_after_import(
+    storage: TamsStorage, tmp_path: Path
+) -> None:
+    storage._add_container_to_stack("Container1", "A3")
+    path = tmp_path / "export.json"
+    storage.export_json(path)
+    restored = TamsStorage()
+    restored.import_json(path)
+    assert restored.capacity() == storage.capacity()
+    assert restored.top_units() == ["Container1", "Container4"]
+    assert restored.dig_depth("Container2") == 2
+
+
+def test_storage_import_shares_unit_objects(
+    storage: TamsStorage, tmp_path: Path
+) -> None:
+    storage._add_container_to_crane("Container1")
+    path = tmp_path / "export.json"
+    storage.export_json(path)
+    restored = TamsStorage()
+    restored.import_json(path)
+    units = {unit.number: unit for unit in restored.container}
+    for stack in restored.stacks:
+        for unit in stack.container:
+            assert unit is units[unit.number]
+    assert restored.crane is units["Container1"]
+    assert restored.container[0].type is restored.container[1].type
+    assert restored.get_container_as_json() == storage.get_container_as_json()
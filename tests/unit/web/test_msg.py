@@ -0,0 +1,36 @@
+import json
+
+from tams.web.msg import Messages
+
+
+def test_messages_since_cursor() -> None:
+    msgs = Messages()
+    assert json.loads(msgs.get_msgs_json()) == {"msg": [], "seq": 0}
+    msgs.add_msg("a", "first")
+    msgs.add_error_msg("b", "second")
+    data = json.loads(msgs.get_msgs_json())
+    assert [msg["text"] for msg in data["msg"]] == ["first", "second"]
+    assert data["msg"][1] == {"title": "b", "text": "second", "type": "ERROR", "seq": 2}
+    # reading does not drain, every reader follows its own cursor
+    assert json.loads(msgs.get_msgs_json())["seq"] == 2
+    assert json.loads(msgs.get_msgs_json(since=1))["msg"][0]["text"] == "second"
+    assert json.loads(msgs.get_msgs_json(since=2))["msg"] == []
+
+
+def test_messages_are_bounded() -> None:
+    msgs = Messages(capacity=3)
+    for index in range(10):
+        msgs.add_msg("t", str(index))
+    data = json.loads(msgs.get_msgs_json())
+    assert [msg["text"] for msg in data["msg"]] == ["7", "8", "9"]
+    assert data["seq"] == 10
+    assert [msg["seq"] for msg in json.loads(msgs.get_msgs_json(since=8))["msg"]] == [
+        9,
+        10,
+    ]
+
+
+def test_messages_not_shared_between_instances() -> None:
+    first = Messages()
+    first.add_msg("a", "b")
+    assert json.loads(Messages().get_msgs_json())["msg"] == []
@@ -0,0 +1,52 @@
+from pathlib import Path
+from threading import Thread
+
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.snapshot import SnapshotReader, SnapshotWriter
+from tams.storage.storage import TamsStorage
+from tams.web.replica import Replica
+from tams.web.web import Web
+
+
+def test_replica_serves_snapshot(tmp_path: Path) -> None:
+    replica = Replica(tmp_path / "export.snap")
+    client = replica.app.test_client()
+    assert client.get("/stacks").status_code == 503
+
+    storage = TamsStorage()
+    writer = SnapshotWriter(tmp_path / "export.snap")
+    writer.publish_storage(storage)
+    first = client.get("/stacks")
+    assert first.status_code == 200
+    assert first.data == storage.get_stacks_as_json().encode()
+    etag = first.headers["ETag"]
+    assert client.get("/stacks", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/container").data == storage.get_container_as_json().encode()
+
+    storage.set_stack_pos("A1", storage.stacks[1].coordinates)
+    writer.publish_storage(storage)
+    assert client.get("/stacks", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/health").json["version"] == storage.version
+
+
+def test_replica_etag_matches_web(tmp_path: Path) -> None:
+    storage = TamsStorage()
+    web = Web(TamsJobState(storage), storage, Metric())
+    SnapshotWriter(
+        tmp_path / "export.snap", generation=int(web.etag_prefix, 16)
+    ).publish_storage(storage)
+    replica = Replica(tmp_path / "export.snap")
+    for path in ("/stacks", "/container"):
+        etag = web.app.test_client().get(path).headers["ETag"]
+        assert replica.app.test_client().get(path).headers["ETag"] == etag
+
+
+def test_replica_reader_per_thread(tmp_path: Path) -> None:
+    replica = Replica(tmp_path / "export.snap")
+    readers: list[SnapshotReader] = []
+    thread = Thread(target=lambda: readers.append(replica.reader()))
+    thread.start()
+    thread.join()
+    assert replica.reader() is replica.reader()
+    assert readers[0] is not replica.reader()
@@ -0,0 +1,17 @@
+import pytest
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from tams.web.server import ServerConfig, serve
+
+
+def test_serve_dev_is_threaded(mocker: MockerFixture) -> None:
+    app = Flask("test")
+    run = mocker.patch.object(app, "run")
+    serve(app, 7000)
+    run.assert_called_once_with(host="0.0.0.0", port=7000, threaded=True)
+
+
+def test_serve_unknown_mode() -> None:
+    with pytest.raises(ValueError):
+        serve(Flask("test"), 7000, ServerConfig(mode="gunicorn"))
@@ -0,0 +1,106 @@
+from flask.testing import FlaskClient
+from pytest import fixture
+
+from tams.ccs.codec import to_json
+from tams.ccs.types import CCSCoordinates, CCSJob
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.web import Web
+
+
+@fixture
+def web() -> Web:
+    storage = TamsStorage()
+    return Web(TamsJobState(storage), storage, Metric())
+
+
+@fixture
+def client(web: Web) -> FlaskClient:
+    return web.app.test_client()
+
+
+def test_stacks_get_not_modified(web: Web, client: FlaskClient) -> None:
+    first = client.get("/stacks")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    second = client.get("/stacks", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+
+    web.storage.set_stack_pos("A1", CCSCoordinates(1, 1, 1))
+    third = client.get("/stacks", headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["ETag"] != etag
+
+
+def test_job_get_changes_etag_on_new_job(web: Web, client: FlaskClient) -> None:
+    first = client.get("/job")
+    assert first.json == {}
+    web.state.set_new_job('{"type": "move"}')
+    web.state.ack_new_job()
+    second = client.get("/job", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json["type"] == "move"
+
+
+def test_jobs_post_array_and_ndjson(web: Web, client: FlaskClient) -> None:
+    jobs = [to_json(CCSJob()), to_json(CCSJob())]
+    response = client.post(
+        "/jobs", data=f"[{jobs[0]}, {jobs[1]}]", content_type="application/json"
+    )
+    assert response.json["accepted"] == 2
+    response = client.post(
+        "/jobs",
+        data=f"{jobs[0]}\n{{broken\n\n{to_json(CCSJob())}\n",
+        content_type="application/x-ndjson",
+    )
+    assert [result["result"] for result in response.json["results"]] == [
+        "has job",
+        "invalid",
+        "OK",
+    ]
+    assert len(web.state.get_pending_jobs()) == 3
+    assert client.post("/jobs", data='{"type": "move"}').status_code == 200
+    assert client.post("/jobs", data="[{").status_code == 405
+    assert client.post("/jobs", data="").status_code == 405
+
+
+def test_capacity_and_units_get(client: FlaskClient) -> None:
+    assert client.get("/capacity").json["total"] == 9
+    assert client.get("/capacity/A").json == {"block": "A", "free": 6}
+    assert client.get("/capacity/Z").status_code == 404
+    assert client.get("/units/accessible").json == [
+        "Container1",
+        "Container3",
+        "Container4",
+    ]
+    assert client.get("/units/Container2").json == {
+        "number": "Container2",
+        "stack": "A3",
+        "tier": 0,
+        "dig_depth": 1,
+    }
+    assert client.get("/units/unknown").status_code == 404
+
+
+def test_web_not_ready_serves_only_health() -> None:
+    storage = TamsStorage()
+    web = Web(TamsJobState(storage), storage, Metric(), ready=False)
+    client = web.app.test_client()
+    assert client.get("/health").json == {"status": "starting"}
+    assert client.get("/ready").status_code == 503
+    assert client.get("/stacks").status_code == 503
+    web.health.ready.set()
+    assert client.get("/health").json == {"status": "ready"}
+    assert client.get("/stacks").status_code == 200
+
+
+def test_metric_aggregate_get_of_empty_window() -> None:
+    storage = TamsStorage()
+    metric = Metric()
+    metric.record(b'{"metrics": [{"name": "busy", "value": 1}]}', timestamp=0.0)
+    client = Web(TamsJobState(storage), storage, metric).app.test_client()
+    assert client.get("/metric/unknown").status_code == 404
+    body = client.get("/metric/busy?window=60").get_json()
+    assert body["count"] == 0 and body["min"] is None and body["p99"] is None
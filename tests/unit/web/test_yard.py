@@ -0,0 +1,82 @@
+from pytest import fixture
+
+from tams.ccs.types import CCSCoordinates
+from tams.metric.metric import Metric
+from tams.state.state import TamsJobState
+from tams.storage.storage import TamsStorage
+from tams.web.web import Web
+from tams.web.yard import YardRenderer
+
+
+@fixture
+def storage() -> TamsStorage:
+    return TamsStorage()
+
+
+@fixture
+def yard(storage: TamsStorage) -> YardRenderer:
+    return Web(TamsJobState(storage), storage, Metric()).yard
+
+
+def test_yard_layout_from_coordinates(yard: YardRenderer) -> None:
+    rows = [
+        [None if stack is None else stack.name for stack in row]
+        for row in yard.layout()
+    ]
+    assert rows == [["A1", "B1", "LKW"], ["A2", None, None], ["A3", None, None]]
+    html = yard.table("auto")
+    assert html.count('class="yard-stack"') == 5
+    assert "Container4" in html
+
+
+def test_yard_sends_changed_stacks_only(
+    yard: YardRenderer, storage: TamsStorage
+) -> None:
+    first = yard.render("auto")
+    assert "html" in first
+    unchanged = yard.render("auto", first["version"], first["layout"])
+    assert unchanged["stacks"] == {} and "crane" not in unchanged
+
+    fragment = yard.fragment(storage.stacks[0], "auto")
+    storage._add_container_to_crane("Container3")
+    changed = yard.render("auto", first["version"], first["layout"])
+    assert list(changed["stacks"]) == ["A3"]
+    assert "Container3" in changed["crane"]
+    # untouched stacks come from the cache
+    assert yard.fragment(storage.stacks[0], "auto") is fragment
+
+    storage.set_stack_pos("B1", CCSCoordinates(0, 6000, 0))
+    moved = yard.render("auto", changed["version"], changed["layout"])
+    assert moved["layout"] != changed["layout"] and "html" in moved
+    assert "html" in yard.render("init", moved["version"], moved["layout"])
+
+
+def test_yard_layout_buckets_positions_by_tolerance(
+    yard: YardRenderer, storage: TamsStorage
+) -> None:
+    # positions taught with set pos deviate a few mm from the grid
+    storage.set_stack_pos("A2", CCSCoordinates(12, 2003, 0))
+    storage.set_stack_pos("B1", CCSCoordinates(1990, 7, 0))
+    storage.set_stack_pos("LKW", CCSCoordinates(4004, -5, 0))
+    rows = [
+        [None if stack is None else stack.name for stack in row]
+        for row in yard.layout()
+    ]
+    assert rows == [["A1", "B1", "LKW"], ["A2", None, None], ["A3", None, None]]
+
+
+def test_yard_layout_shows_stacks_sharing_a_position(
+    yard: YardRenderer, storage: TamsStorage
+) -> None:
+    # not positioned yet and within the tolerance of A1
+    storage.set_stack_pos("A2", CCSCoordinates(0, 0, 0))
+    storage.set_stack_pos("A3", CCSCoordinates(0, 300, 0))
+    rows = [
+        [None if stack is None else stack.name for stack in row]
+        for row in yard.layout()
+    ]
+    assert rows == [["A1", "B1", "LKW"], ["A2", "A3", None]]
+    html = yard.table("init")
+    assert html.count('class="yard-stack"') == 5
+    assert html.count('data-stack-name="A2"') == 1
+    assert html.count('data-stack-name="A3"') == 1